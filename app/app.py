@@ -1,5 +1,7 @@
+import io
 import os
 import sys
+import uuid
 import streamlit as st
 
 # Ensure repo root on path
@@ -23,13 +25,54 @@ def safe_load(func_import):
     except Exception as e:
         return None, e
 
+@st.cache_resource
+def get_model_registry():
+    """One registry per process: each pipeline is loaded once and shared by all sessions."""
+    from modules.model_registry import get_registry
+    return get_registry()
+
 def get_sentiment_model():
-    from transformers import pipeline
-    return pipeline("sentiment-analysis", model="distilbert-base-uncased-finetuned-sst-2-english")
+    return get_model_registry().predictor("sentiment")
 
 def get_zero_shot_classifier():
-    from transformers import pipeline
-    return pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
+    return get_model_registry().predictor("zero_shot")
+
+@st.cache_resource
+def get_verse_classifier():
+    """TF-IDF first; zero-shot is only loaded and run for verses it is unsure about."""
+    from modules.verse_classifier import cascade_from_artifacts
+    return cascade_from_artifacts(zero_shot_factory=get_zero_shot_classifier)
+
+@st.cache_resource
+def get_batch_result_cache():
+    """Per-verse results shared across sessions, keyed by content hash."""
+    from modules.batch_classify import ResultCache
+    return ResultCache()
+
+def verse_batch_ui(clf):
+    from modules.batch_classify import BatchStats, classify_records, detect_format, read_records, rows_to_csv
+    upload = st.file_uploader("Upload verses (CSV with a 'verse' column, or JSONL)", type=["csv", "jsonl", "ndjson"])
+    batch_size = st.slider("Batch size", 8, 256, 32, step=8)
+    if upload is None or not st.button("Classify all"):
+        return
+
+    fmt = detect_format(upload.name)
+    records = read_records(io.StringIO(upload.getvalue().decode("utf-8-sig")), fmt)
+    stats, rows = BatchStats(), []
+    status, table = st.empty(), st.empty()
+    with st.spinner("Classifying..."):
+        for row in classify_records(records, clf, batch_size, get_batch_result_cache(), stats):
+            rows.append(row)
+            if len(rows) % batch_size == 0:
+                status.caption(f"{stats.verses} verses · {stats.verses_per_sec:.1f} verses/s")
+                table.dataframe(rows, use_container_width=True)
+    table.dataframe(rows, use_container_width=True)
+    status.caption(
+        f"✅ {stats.verses} verses in {stats.seconds:.2f}s ({stats.verses_per_sec:.1f} verses/s) · "
+        f"{stats.cached} cached · {stats.zero_shot} via zero-shot"
+    )
+    if rows:
+        st.download_button("⬇️ Download results (CSV)", rows_to_csv(rows), file_name="verse_themes.csv", mime="text/csv")
 
 def main_app():
     if "user_id" not in st.session_state:
@@ -44,7 +87,10 @@ def main_app():
         st.header("Welcome to Tukuza!")
         st.info("Login/Profiles coming next — for now we’ll use a session-based user.")
         if st.button("Continue"):
-            st.session_state.user_id = st.session_state.get("session_id", "demo")
+            # Each guest gets their own id so history and rate limits are not shared
+            if "session_id" not in st.session_state:
+                st.session_state.session_id = f"guest-{uuid.uuid4().hex[:12]}"
+            st.session_state.user_id = st.session_state.session_id
             st.session_state.user_name = "Guest"
         st.stop()
 
@@ -69,6 +115,17 @@ def main_app():
     if tool == "🏠 Dashboard":
         st.title("Tukuza Yesu AI Toolkit")
         st.write("Select a tool from the sidebar.")
+        registry = get_model_registry()
+        model_stats = registry.stats()
+        if model_stats:
+            with st.expander("🧠 Loaded models"):
+                summary = registry.summary()
+                budget = f" of {summary['budget_mb']} MB" if summary["budget_mb"] is not None else ""
+                st.caption(
+                    f"{summary['used_mb']} MB{budget} · {summary['hits']} hits · {summary['misses']} misses · "
+                    f"{summary['loads']} loads · {summary['evictions']} evictions"
+                )
+                st.dataframe(model_stats, use_container_width=True)
 
     elif tool == "📖 BibleBot":
         try:
@@ -85,27 +142,33 @@ def main_app():
             st.error("Growth Tracker failed to load.")
             st.exception(err)
         else:
-            # load sentiment only when needed
-            with st.spinner("Loading sentiment model..."):
-                sentiment = get_sentiment_model()
-            ui(sentiment)
+            # sentiment is scored in the background; the model loads in the worker, not here
+            ui()
 
     elif tool == "🔖 Verse Classifier":
         st.subheader("Classify a Bible Verse")
-        verse = st.text_area("Paste a Bible verse here:")
-        if st.button("Classify"):
-            if not verse.strip():
-                st.warning("Please enter a verse.")
-            else:
-                with st.spinner("Loading classifier..."):
-                    clf = get_zero_shot_classifier()
-                labels = ["faith","love","hope","salvation","guidance","suffering","peace","justice","community","forgiveness"]
-                result = clf(verse, candidate_labels=labels, multi_label=False)
-                st.success(f"Predicted Topic: **{result['labels'][0]}** (Confidence: {result['scores'][0]:.2f})")
+        mode = st.radio("Mode", ["Single verse", "Batch upload"], horizontal=True)
+        if mode == "Single verse":
+            verse = st.text_area("Paste a Bible verse here:")
+            if st.button("Classify"):
+                if not verse.strip():
+                    st.warning("Please enter a verse.")
+                else:
+                    clf = get_verse_classifier()
+                    with st.spinner("Classifying..."):
+                        result = clf.classify(verse)
+                    st.success(f"Predicted Topic: **{result.label}** (Confidence: {result.score:.2f})")
+                    tier = "⚡ fast TF-IDF model" if result.tier == "tfidf" else "🧠 zero-shot model"
+                    st.caption(f"Answered by the {tier} in {result.latency_ms:.0f} ms")
+        else:
+            verse_batch_ui(get_verse_classifier())
+        with st.expander("📊 Classifier metrics"):
+            st.json(get_verse_classifier().metrics())
 
     elif tool == "🌅 Daily Verse":
         st.subheader("🌞 Your Daily Verse")
-        st.success("“This is the day that the Lord has made; let us rejoice and be glad in it.” – Psalm 118:24")
+        from modules.scripture import daily_verse
+        st.success(daily_verse() or "“This is the day that the Lord has made; let us rejoice and be glad in it.” – Psalm 118:24")
 
     elif tool == "🧪 Spiritual Gifts Assessment":
         ui, err = safe_load(lambda: __import__("modules.gift_assessment", fromlist=["gift_assessment_ui"]).gift_assessment_ui)
@@ -1,56 +1,37 @@
 import streamlit as st
 import os
-import joblib
-import numpy as np
-import pandas as pd
 import sqlite3
 import sys
-import json
-from openai import OpenAI # Assuming you use this for something not shown here
 from langdetect import detect
 from deep_translator import GoogleTranslator
-from transformers import pipeline # For the verse classifier and sentiment analysis
 
 # --- 1. Appending module path ---
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # --- 2. Custom modules ---
 # Ensure these files and functions exist in their respective paths
-from modules.biblebot_ui import biblebot_ui
+# (BibleBot is imported when opened: it pulls in the OpenAI SDK and tokenizer)
 # Assuming you'll uncomment these and they contain the UI functions
-from modules.gift_assessment import gift_assessment_ui , sentiment_analyzer # Assuming this is used in gift_assessment_ui
+from modules.gift_assessment import gift_assessment_ui
 from modules.growth_tracker_ui import growth_tracker_ui # Assuming this module exists
+from modules.model_registry import get_registry
 
 # Assuming these are in db.py and correctly handle their logic
 from db import get_db_connection, run_schema_upgrades
 
-# --- 3. Initialize OpenAI Client (if used) ---
-# Assuming you have OPENAI_API_KEY set in Streamlit secrets or environment
-# client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+# --- 3. Hugging Face models ---
+# Loaded through the shared registry on first use, not at import time
+def classifier(*args, **kwargs):
+    return get_registry().run("zero_shot", *args, **kwargs)
 
-# --- 4. Hugging Face Model Loaders (Enhanced with @st.cache_resource) ---
-@st.cache_resource
-def load_classifier_model():
-    # Zero-shot classification is more flexible for custom topics
-    return pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
 
-@st.cache_resource
-def load_sentiment_model():
-    # Using a sentiment analysis model for journal entries
-    return pipeline("sentiment-analysis", model="distilbert-base-uncased-finetuned-sst-2-english")
-
-# Load models once at app startup
-classifier = load_classifier_model()
-sentiment_analyzer = load_sentiment_model() # This was used in your previous journal code
-
-
-# --- 5. Database Initialization and Schema Upgrade ---
+# --- 4. Database Initialization and Schema Upgrade ---
 # This ensures the DB connection is established and schema is up-to-date
 # run_schema_upgrades() itself is decorated with @st.cache_resource in db.py
 run_schema_upgrades()
 
 
-# --- 6. Translation Functions ---
+# --- 5. Translation Functions ---
 def translate_user_input(text, target_lang="en"):
     detected_lang = detect(text)
     if detected_lang != 'en':
@@ -63,10 +44,10 @@ def translate_bot_response(text, target_lang):
         return GoogleTranslator(source='en', target=target_lang).translate(text)
     return text
 
-# --- 7. App Configuration ---
+# --- 6. App Configuration ---
 st.set_page_config(page_title="Tukuza Yesu AI Toolkit", page_icon="📖", layout="wide")
 
-# --- 8. Main Streamlit Application Function ---
+# --- 7. Main Streamlit Application Function ---
 # Encapsulating the UI logic ensures session state and DB calls are handled well
 def main_app():
     # --- Session State Initialization ---
@@ -161,12 +142,13 @@ def main_app():
             # You can add summary information here later if you want
 
         elif tool == "📖 BibleBot":
+            from modules.biblebot_ui import biblebot_ui
             biblebot_ui() # Calls the UI from modules/biblebot_ui.py
 
         elif tool == "📘 Spiritual Growth Tracker":
             # This is where your journaling and growth tracking UI would be
             # Assuming growth_tracker_ui handles all DB interaction internally
-            growth_tracker_ui(sentiment_analyzer) # Pass sentiment_analyzer if it needs it
+            growth_tracker_ui() # Sentiment is scored in the background
 
         elif tool == "🔖 Verse Classifier":
             st.subheader("Classify a Bible Verse")
@@ -219,10 +201,10 @@ def main_app():
             # # This is why moving it to its own module and passing necessary data is cleaner.
 
 
-# --- 9. Entry Point for the App ---
+# --- 8. Entry Point for the App ---
 if __name__ == "__main__":
     main_app()
 
-# --- 10. Credit (Always show) ---
+# --- 9. Credit (Always show) ---
 st.markdown("---")
 st.caption("Built with faith by **Sammy Karuri ✡** | Tukuza Yesu AI Toolkit 🌐")
\ No newline at end of file
@@ -1,6 +1,7 @@
-from transformers import pipeline
 import streamlit as st
 
+from modules.model_registry import get_registry
+
 # ---------------------------
 # 🤗 Hugging Face Pipelines
 # ---------------------------
@@ -10,20 +11,25 @@ def load_classifier_model():
     """
     Loads a zero-shot classification model from Hugging Face.
     """
-    return pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
+    return get_registry().predictor("zero_shot")
 
 @st.cache_resource
 def load_sentiment_model():
     """
     Loads a sentiment analysis model from Hugging Face.
     """
-    return pipeline("sentiment-analysis", model="distilbert-base-uncased-finetuned-sst-2-english")
+    return get_registry().predictor("sentiment")
+
+def __getattr__(name):
+    # `classifier` / `sentiment_analyzer` load on first use instead of at import
+    if name == "classifier":
+        return load_classifier_model()
+    if name == "sentiment_analyzer":
+        return load_sentiment_model()
+    raise AttributeError(name)
 
-# Initialize once for global use
-classifier = load_classifier_model()
-sentiment_analyzer = load_sentiment_model()
 def classify_text(text, candidate_labels):
     """
     Classifies the input text into one of the candidate labels.
     """
-    return classifier(text, candidate_labels)
\ No newline at end of file
+    return load_classifier_model()(text, candidate_labels)
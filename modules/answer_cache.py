@@ -0,0 +1,239 @@
+# modules/answer_cache.py
+"""
+Process-wide answer cache for BibleBot.
+
+Answers are cached in English and keyed on the normalized English question
+plus a fingerprint of the context it was asked in (system prompt, summary and
+the turns it does not cover yet), so a follow-up question is never answered
+with a reply meant for a different conversation.
+
+Two tiers:
+  1. exact  – normalized question text, O(1) dict lookup
+  2. near   – optional; cosine similarity of local sentence embeddings
+              (the registry's "embedding" model, so warmup and MODEL_OFFLINE
+              cover it; shared with the journal's related entries)
+
+Entries expire after a TTL and the least recently used ones are evicted once
+the cache is full. Hit/miss counters are kept for the hit-rate metric.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 2000
+DEFAULT_SIMILARITY = 0.92
+EMBEDDING_MODEL = "embedding"  # in modules.model_registry.MODEL_SPECS
+
+_PUNCT = re.compile(r"[^\w\s:]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_question(text: str) -> str:
+    """Lowercase, strip accents and punctuation (keeping verse colons), collapse whitespace."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = _PUNCT.sub(" ", text.lower())
+    return _SPACES.sub(" ", text).strip()
+
+
+def context_fingerprint(messages: List[dict], model: str = "") -> str:
+    """Stable hash of everything sent before the question (system prompt, summary, earlier turns)."""
+    h = hashlib.sha1(model.encode("utf-8"))
+    for m in messages:
+        h.update(b"\x00")
+        h.update(m.get("role", "").encode("utf-8"))
+        h.update(b"\x01")
+        h.update((m.get("content") or "").encode("utf-8"))
+    return h.hexdigest()
+
+
+def replay(answer: str, chunk_words: int = 3) -> Iterator[str]:
+    """Yield a cached answer in small word chunks so it goes through the same streaming UI."""
+    words = re.split(r"(\s+)", answer)
+    for i in range(0, len(words), chunk_words * 2):
+        yield "".join(words[i:i + chunk_words * 2])
+
+
+@dataclass
+class CacheEntry:
+    answer: str
+    created_at: float
+    question: str
+    fingerprint: str
+    hits: int = 0
+    vector: Optional[object] = None
+
+
+@dataclass
+class CacheStats:
+    lookups: int = 0
+    exact_hits: int = 0
+    near_hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return (self.exact_hits + self.near_hits) / self.lookups if self.lookups else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "lookups": self.lookups,
+            "exact_hits": self.exact_hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round(self.hit_rate, 4),
+        }
+
+
+class _Embedder:
+    """Lazy local sentence embedder; disabled if the registry cannot load the model."""
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self._extractor = None
+        self.available = True
+        self._lock = threading.Lock()
+
+    def encode(self, text: str):
+        if not self.available:
+            return None
+        with self._lock:
+            if self._extractor is None:
+                try:
+                    from modules.model_registry import get_registry
+                    self._extractor = get_registry().predictor(self.model_name)
+                except Exception:
+                    self.available = False
+                    return None
+        from modules.journal_embeddings import embed
+        return embed([text], self._extractor)[0]
+
+
+class AnswerCache:
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        semantic: bool = False,
+        similarity: float = DEFAULT_SIMILARITY,
+        embedding_model: str = EMBEDDING_MODEL,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[Tuple[str, str], CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._embedder = _Embedder(embedding_model) if semantic else None
+
+    # ---- helpers ----
+    def _expired(self, entry: CacheEntry, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - entry.created_at > self.ttl_seconds
+
+    def _near_match(self, fingerprint: str, vector, now: float) -> Optional[CacheEntry]:
+        import numpy as np
+
+        best, best_score = None, self.similarity
+        for (fp, _), entry in self._entries.items():
+            if fp != fingerprint or entry.vector is None or self._expired(entry, now):
+                continue
+            score = float(np.dot(entry.vector, vector))
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    # ---- public API ----
+    def get(self, question_en: str, fingerprint: str) -> Optional[str]:
+        key = (fingerprint, normalize_question(question_en))
+        now = time.time()
+        with self._lock:
+            self.stats.lookups += 1
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._expired(entry, now):
+                    del self._entries[key]
+                    self.stats.expirations += 1
+                else:
+                    self._entries.move_to_end(key)
+                    entry.hits += 1
+                    self.stats.exact_hits += 1
+                    return entry.answer
+
+        # Embedding is computed outside the lock; it is the slow part
+        if self._embedder is not None:
+            vector = self._embedder.encode(key[1])
+            if vector is not None:
+                with self._lock:
+                    entry = self._near_match(fingerprint, vector, now)
+                    if entry is not None:
+                        self._entries.move_to_end((entry.fingerprint, entry.question))
+                        entry.hits += 1
+                        self.stats.near_hits += 1
+                        return entry.answer
+
+        with self._lock:
+            self.stats.misses += 1
+        return None
+
+    def put(self, question_en: str, fingerprint: str, answer: str) -> None:
+        if not answer or not answer.strip():
+            return
+        question = normalize_question(question_en)
+        vector = self._embedder.encode(question) if self._embedder is not None else None
+        key = (fingerprint, question)
+        with self._lock:
+            self._entries[key] = CacheEntry(
+                answer=answer, created_at=time.time(), question=question, fingerprint=fingerprint, vector=vector
+            )
+            self._entries.move_to_end(key)
+            self.stats.stores += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.evictions += 1
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            stale = [k for k, e in self._entries.items() if self._expired(e, now)]
+            for k in stale:
+                del self._entries[k]
+            self.stats.expirations += len(stale)
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def metrics(self) -> Dict[str, float]:
+        with self._lock:
+            out = self.stats.as_dict()
+            out["entries"] = len(self._entries)
+            return out
+
+
+def cache_from_env() -> AnswerCache:
+    """Build a cache configured by BIBLEBOT_CACHE_SIZE / _TTL / _SEMANTIC / _SIMILARITY."""
+    return AnswerCache(
+        max_entries=int(os.getenv("BIBLEBOT_CACHE_SIZE", DEFAULT_MAX_ENTRIES)),
+        ttl_seconds=float(os.getenv("BIBLEBOT_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+        semantic=os.getenv("BIBLEBOT_CACHE_SEMANTIC", "0").lower() in ("1", "true", "yes"),
+        similarity=float(os.getenv("BIBLEBOT_CACHE_SIMILARITY", DEFAULT_SIMILARITY)),
+    )
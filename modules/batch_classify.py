@@ -0,0 +1,192 @@
+# modules/batch_classify.py
+"""
+Batch verse classification for whole books or sermon-series lists.
+
+Input is CSV (a `verse` or `text` column) or JSONL (one object per line with
+the same key); any other fields, such as a reference, are passed through to
+the output. Verses are classified `batch_size` at a time through the cascade
+classifier and results are yielded as soon as each batch finishes, so callers
+can write or display them incrementally.
+
+Results are cached by a hash of the normalized verse text plus a tag of the
+classifier configuration, so repeated verses (and re-runs of the same list)
+skip the model entirely. The cache can persist to a JSONL file.
+"""
+from __future__ import annotations
+
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO
+
+DEFAULT_BATCH_SIZE = 32
+TEXT_FIELDS = ("verse", "text")
+RESULT_FIELDS = ["label", "score", "tier", "cached"]
+
+_SPACES = re.compile(r"\s+")
+
+
+def verse_hash(text: str) -> str:
+    return hashlib.sha1(_SPACES.sub(" ", text.strip().lower()).encode("utf-8")).hexdigest()
+
+
+def classifier_tag(clf) -> str:
+    """Identifies the labels/threshold a cached result was produced under."""
+    return f"{clf.threshold}:{','.join(clf.labels)}:{int(clf.zero_shot_available)}"
+
+
+# ---------------------------
+# 📥 Input
+# ---------------------------
+def detect_format(name: str) -> str:
+    return "jsonl" if name.lower().endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+
+def read_records(stream: TextIO, fmt: str) -> Iterator[Dict]:
+    """Yield input rows as dicts with a `verse` key; rows without text are skipped."""
+    if fmt == "jsonl":
+        rows = (json.loads(line) for line in stream if line.strip())
+    else:
+        rows = csv.DictReader(stream)
+    for row in rows:
+        text = next((row.get(k) for k in TEXT_FIELDS if row.get(k)), None)
+        if text and str(text).strip():
+            row = dict(row)
+            row.pop("text", None)
+            row["verse"] = str(text).strip()
+            yield row
+
+
+# ---------------------------
+# 💾 Result cache
+# ---------------------------
+class ResultCache:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._results: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        item = json.loads(line)
+                        self._results[item["key"]] = item["result"]
+                    except (ValueError, KeyError):
+                        continue
+
+    def get(self, key: str) -> Optional[Dict]:
+        return self._results.get(key)
+
+    def put_many(self, items: Dict[str, Dict]):
+        with self._lock:
+            self._results.update(items)
+            if self.path:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    for key, result in items.items():
+                        f.write(json.dumps({"key": key, "result": result}, ensure_ascii=False) + "\n")
+
+    def __len__(self):
+        return len(self._results)
+
+
+# ---------------------------
+# ⚙️ Classification
+# ---------------------------
+@dataclass
+class BatchStats:
+    verses: int = 0
+    cached: int = 0
+    zero_shot: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+
+    @property
+    def verses_per_sec(self) -> float:
+        return self.verses / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> Dict:
+        return dict(asdict(self), verses_per_sec=round(self.verses_per_sec, 1))
+
+
+def _batches(records: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def classify_records(
+    records: Iterable[Dict],
+    clf,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    cache: Optional[ResultCache] = None,
+    stats: Optional[BatchStats] = None,
+) -> Iterator[Dict]:
+    """Yield each input row with label/score/tier/cached added, in input order, one batch at a time."""
+    cache = cache if cache is not None else ResultCache()
+    stats = stats if stats is not None else BatchStats()
+    tag = classifier_tag(clf)
+    t0 = time.perf_counter()
+
+    for batch in _batches(records, max(1, batch_size)):
+        keys = [f"{tag}:{verse_hash(r['verse'])}" for r in batch]
+        found = [cache.get(k) for k in keys]
+        # Duplicates inside a batch are only sent to the model once
+        missing = list(dict.fromkeys(k for k, f in zip(keys, found) if f is None))
+        fresh: Dict[str, Dict] = {}
+        if missing:
+            texts = {k: r["verse"] for k, r in zip(keys, batch)}
+            for key, result in zip(missing, clf.classify_many([texts[k] for k in missing])):
+                fresh[key] = {"label": result.label, "score": round(result.score, 4), "tier": result.tier}
+            cache.put_many(fresh)
+
+        for record, key, hit in zip(batch, keys, found):
+            result = hit or fresh[key]
+            stats.verses += 1
+            stats.cached += hit is not None
+            stats.zero_shot += hit is None and result["tier"] == "zero_shot"
+            yield dict(record, **result, cached=hit is not None)
+        stats.batches += 1
+        stats.seconds = time.perf_counter() - t0
+
+
+# ---------------------------
+# 📤 Output
+# ---------------------------
+class ResultWriter:
+    """Writes result rows as they arrive; CSV columns are fixed by the first row."""
+
+    def __init__(self, stream: TextIO, fmt: str):
+        self.stream = stream
+        self.fmt = fmt
+        self._csv = None
+
+    def write(self, row: Dict):
+        if self.fmt == "jsonl":
+            self.stream.write(json.dumps(row, ensure_ascii=False) + "\n")
+        else:
+            if self._csv is None:
+                fields = [k for k in row if k not in RESULT_FIELDS] + RESULT_FIELDS
+                self._csv = csv.DictWriter(self.stream, fieldnames=fields, extrasaction="ignore")
+                self._csv.writeheader()
+            self._csv.writerow(row)
+        self.stream.flush()
+
+
+def rows_to_csv(rows: List[Dict]) -> str:
+    buf = io.StringIO()
+    writer = ResultWriter(buf, "csv")
+    for row in rows:
+        writer.write(row)
+    return buf.getvalue()
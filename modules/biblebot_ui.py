@@ -1,6 +1,8 @@
 # 📦 MODULE: biblebot_ui.py
+import time
+import uuid
+
 import streamlit as st
-from openai import OpenAI
 from langdetect import detect
 from deep_translator import GoogleTranslator
 try:
@@ -12,6 +14,235 @@ except Exception:
 
 import os
 
+from modules.answer_cache import cache_from_env, context_fingerprint, replay
+from modules.chat_context import build_context, summary_prompt, unsummarized_context
+from modules.db import fetch_chat_messages, insert_chat_message, iter_chat_messages
+from modules.llm_client import LLMBusyError, LLMClient
+from modules.rate_limit import RequestCoalescer, limiter_from_env, request_key
+from modules.scripture import format_context, get_index
+from modules.stream_translate import text_stream, translate_stream
+
+MODEL = "gpt-3.5-turbo"
+
+# Only the most recent messages are kept in session memory; older ones stay in
+# the database and are paged in on request.
+SESSION_WINDOW = 40
+HISTORY_PAGE = 20
+
+
+# -------------------------
+# 🔁 Turn handling
+# -------------------------
+# Every submitted question becomes a user turn with its own id. A completion
+# is requested exactly once for a new turn (tracked by `pending_turn`); every
+# other rerun only re-renders stored history, with no network calls.
+
+def _remember(msg):
+    """Append to the session window, dropping the oldest messages beyond SESSION_WINDOW."""
+    st.session_state.messages.append(msg)
+    overflow = len(st.session_state.messages) - SESSION_WINDOW
+    if overflow > 0:
+        del st.session_state.messages[:overflow]
+
+
+def _new_turn(content):
+    turn_id = uuid.uuid4().hex
+    _remember({"role": "user", "content": content, "turn_id": turn_id})
+    st.session_state.pending_turn = turn_id
+    return turn_id
+
+
+def _on_text_submit():
+    text = (st.session_state.get("text_question") or "").strip()
+    if text:
+        _new_turn(text)
+    # Clear the box so the same question is not re-submitted on the next rerun
+    st.session_state.text_question = ""
+
+
+def _translate_turn(msg):
+    """Detect language and translate a user turn to English once, storing the result on the message."""
+    if "content_en" in msg:
+        return msg
+    try:
+        lang = detect(msg["content"])
+    except Exception:
+        lang = "en"
+    if lang != "en":
+        try:
+            msg["content_en"] = GoogleTranslator(source="auto", target="en").translate(msg["content"])
+        except Exception:
+            msg["content_en"] = msg["content"]
+    else:
+        msg["content_en"] = msg["content"]
+    msg["lang"] = lang
+    return msg
+
+
+def _history_for_model(messages):
+    """English-only message list for the LLM, built from stored turns."""
+    return [
+        {"role": m["role"], "content": m.get("content_en", m["content"]), "turn_id": m.get("turn_id")}
+        for m in messages
+    ]
+
+
+def _summarizer(client):
+    def summarize(previous_summary, turns):
+        resp = client.complete(
+            model=MODEL,
+            messages=summary_prompt(previous_summary, turns),
+            max_tokens=250,
+        )
+        return resp.choices[0].message.content or previous_summary
+    return summarize
+
+
+@st.cache_resource
+def get_llm_client(api_key, base_url=None):
+    """One pooled, instrumented LLM client shared by every session in this process."""
+    return LLMClient(api_key=api_key, base_url=base_url)
+
+
+@st.cache_resource
+def get_rate_limiter():
+    """Per-user and global token buckets shared by every session in this process."""
+    return limiter_from_env()
+
+
+@st.cache_resource
+def get_coalescer():
+    """Lets identical in-flight requests share a single upstream call."""
+    return RequestCoalescer()
+
+
+@st.cache_resource
+def get_answer_cache():
+    """One answer cache shared by every session in this process."""
+    return cache_from_env()
+
+
+def _retrieve_scripture(question_en):
+    """Grounding verses from the local Bible index; empty if the index is unavailable."""
+    try:
+        return format_context(get_index().retrieve(question_en))
+    except Exception:
+        return ""
+
+
+# -------------------------
+# 💾 Persisted history
+# -------------------------
+def _persistence_on():
+    return st.session_state.get("chat_persist", True) and st.session_state.get("user_id") is not None
+
+
+def _persist(msg):
+    """Append a message to the user's stored history; falls back to memory-only on DB errors."""
+    if not _persistence_on() or msg.get("id"):
+        return
+    try:
+        msg["id"] = insert_chat_message(
+            st.session_state.user_id, msg["turn_id"], msg["role"], msg["content"],
+            content_en=msg.get("content_en"), lang=msg.get("lang"),
+        )
+    except Exception:
+        st.session_state.chat_persist = False
+
+
+def _from_row(row):
+    msg = {"id": row["id"], "turn_id": row["turn_id"], "role": row["role"], "content": row["content"]}
+    if row.get("content_en"):
+        msg["content_en"] = row["content_en"]
+    if row.get("lang"):
+        msg["lang"] = row["lang"]
+    return msg
+
+
+def _load_recent_history():
+    if not _persistence_on():
+        return []
+    try:
+        return [_from_row(r) for r in fetch_chat_messages(st.session_state.user_id, limit=SESSION_WINDOW)]
+    except Exception:
+        st.session_state.chat_persist = False
+        return []
+
+
+def _render_older_history(messages):
+    """Earlier messages are fetched page by page from the DB only when asked for, and never kept in session."""
+    if not _persistence_on():
+        return
+    oldest_id = next((m["id"] for m in messages if m.get("id")), None)
+    if oldest_id is None:
+        return
+    shown = st.session_state.get("history_older_shown", 0)
+    older = []
+    if shown:
+        try:
+            older = fetch_chat_messages(st.session_state.user_id, before_id=oldest_id, limit=shown)
+        except Exception:
+            older = []
+    if len(older) >= shown and st.button("⬆️ Load earlier messages", key="load_older_history"):
+        st.session_state.history_older_shown = shown + HISTORY_PAGE
+        st.rerun()
+    for row in older:
+        with st.chat_message(row["role"]):
+            st.markdown(row["content"])
+
+
+def _chat_export_bytes(user_id, messages):
+    """The full transcript as text; a stored history is streamed from the database page by page."""
+    rows = iter_chat_messages(user_id) if user_id is not None else messages
+    parts = ["Tukuza Yesu BibleBot Chat\n\n"]
+    for row in rows:
+        stamp = row["created_at"].strftime("%Y-%m-%d %H:%M") + " " if row.get("created_at") else ""
+        parts.append(f"{stamp}{row['role'].upper()}: {row['content']}\n\n")
+    return "".join(parts).encode("utf-8")
+
+
+def _render_download():
+    # The callable runs only when the button is clicked, on another thread, so
+    # everything it needs from the session is captured here
+    user_id = st.session_state.user_id if _persistence_on() else None
+    messages = list(st.session_state.messages)
+    st.download_button(
+        "⬇️ Download Chat",
+        lambda: _chat_export_bytes(user_id, messages),
+        file_name="biblebot_chat.txt",
+        mime="text/plain",
+        key="download_chat",
+    )
+
+
+def _limiter_key():
+    if "limiter_key" not in st.session_state:
+        st.session_state.limiter_key = uuid.uuid4().hex
+    user_id = st.session_state.get("user_id")
+    return str(user_id) if user_id is not None else st.session_state.limiter_key
+
+
+def _render_throttled():
+    """A throttled question stays unanswered until the user asks again; it is never retried automatically."""
+    throttled = st.session_state.get("throttled_turn")
+    if not throttled:
+        return
+    turn_id, ready_at = throttled
+    remaining = ready_at - time.time()
+    if remaining > 0:
+        st.info(f"⏳ You're asking quickly — please wait about {int(remaining) + 1}s, then ask again.")
+    if st.button("🔁 Ask again", key=f"retry_{turn_id}"):
+        st.session_state.throttled_turn = None
+        st.session_state.pending_turn = turn_id
+        st.rerun()
+
+
+def _render_history(messages):
+    _render_older_history(messages)
+    for msg in messages:
+        with st.chat_message(msg["role"]):
+            st.markdown(msg["content"])
+
 
 def biblebot_ui():
     # ✅ Setup OpenAI Client
@@ -19,23 +250,28 @@ def biblebot_ui():
     if not api_key:
         st.error("❌ OPENAI_API_KEY not found in environment.")
         return
-
-    client = OpenAI(api_key=api_key)
+    # Point at any OpenAI-compatible server (e.g. the local stub for load tests)
+    base_url = st.secrets.get("OPENAI_BASE_URL") or os.getenv("OPENAI_BASE_URL")
 
     # 📖 Title and caption
     st.subheader("📖 BibleBot (Multilingual + Voice)")
     st.caption("🙋 Ask anything related to the Bible — type or speak")
 
     if "messages" not in st.session_state:
-        st.session_state.messages = []
+        # Restore the most recent window of this user's stored conversation
+        st.session_state.messages = _load_recent_history()
+    if "pending_turn" not in st.session_state:
+        st.session_state.pending_turn = None
+    if "chat_context" not in st.session_state:
+        st.session_state.chat_context = {"summary": "", "covered_turn": None}
+
 
-   
     # -------------------------
 # 📥 Input + 🎙️ Mic in Same Row
 # -------------------------
     col1, col2 = st.columns([7, 1])
     with col1:
-        user_input = st.text_input("Ask your question:", key="text_question")
+        st.text_input("Ask your question:", key="text_question", on_change=_on_text_submit)
 
     with col2:
         if SR_AVAILABLE:
@@ -56,49 +292,85 @@ def biblebot_ui():
                     audio = recognizer.listen(source, timeout=5)
                 voice_text = recognizer.recognize_google(audio)
                 st.success(f"🗣️ Recognized: {voice_text}")
-                st.session_state.messages.append({"role": "user", "content": voice_text})
+                _new_turn(voice_text)
             except Exception as e:
                 st.error(f"Voice error: {e}")
 
+    # 🗂️ Previous turns are re-rendered from stored history only
+    _render_history(st.session_state.messages)
 
-    # 📝 Handle text input
-    if user_input:
-        st.session_state.messages.append({"role": "user", "content": user_input})
+    _render_throttled()
 
-    # 🔁 Translate and Process
     if st.session_state.messages:
-        translated_messages = []
-        original_lang = None
-
-        for msg in st.session_state.messages:
-            if msg["role"] == "user":
-                detected_lang = detect(msg["content"])
-                original_lang = detected_lang
-                if detected_lang != 'en':
-                    translated = GoogleTranslator(source='auto', target='en').translate(msg["content"])
-                else:
-                    translated = msg["content"]
-                translated_messages.append({"role": "user", "content": translated})
-            else:
-                translated_messages.append(msg)
+        _render_download()
 
-        try:
-            stream = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=translated_messages,
-                stream=True,
-            )
+    # 🔁 Translate and Process — only for a new, unanswered turn
+    turn_id = st.session_state.pending_turn
+    if not turn_id:
+        return
+    # Consume the turn before any network call so a rerun mid-stream never re-requests it
+    st.session_state.pending_turn = None
 
-            with st.chat_message("user"):
-                st.markdown(st.session_state.messages[-1]["content"])
+    user_msg = next((m for m in st.session_state.messages if m.get("turn_id") == turn_id and m["role"] == "user"), None)
+    if user_msg is None:
+        return
+    _translate_turn(user_msg)
+    _persist(user_msg)
+    original_lang = user_msg.get("lang", "en")
 
-            with st.chat_message("assistant"):
-                reply = st.write_stream(stream)
+    try:
+        client = get_llm_client(api_key, base_url)
+        history = _history_for_model(st.session_state.messages)
+        retrieved = _retrieve_scripture(user_msg["content_en"])
+        # ⚡ Recurring questions are answered from the shared cache. The key is
+        # known before any summarization, so a hit never pays for a summary call.
+        cache = get_answer_cache()
+        fingerprint = context_fingerprint(
+            unsummarized_context(history, st.session_state.chat_context, retrieved), MODEL
+        )
+        cached = cache.get(user_msg["content_en"], fingerprint)
+        if cached is not None:
+            stream = replay(cached)
+        else:
+            # 🚦 Per-user and global limits; a throttled turn waits for the user to ask again.
+            # Taken before the context is built, so the turn's summary call is covered too.
+            wait = get_rate_limiter().acquire(_limiter_key())
+            if wait:
+                st.session_state.throttled_turn = (turn_id, time.time() + wait)
+                st.rerun()
+            context = build_context(
+                history,
+                st.session_state.chat_context,
+                summarize=_summarizer(client),
+                model=MODEL,
+                retrieved=retrieved,
+            )
+            # 🔀 Identical requests already in flight share one upstream call
+            stream, _ = get_coalescer().stream(
+                request_key(MODEL, context),
+                lambda: client.stream(context, model=MODEL),
+            )
 
+        with st.chat_message("assistant"):
             if original_lang and original_lang != 'en':
-                reply = GoogleTranslator(source='en', target=original_lang).translate(reply)
+                # 🌍 Show the user's language as sentences complete; keep the English for history
+                english = []
+                reply = st.write_stream(translate_stream(stream, original_lang, english_sink=english))
+                reply_en = "".join(english)
+            else:
+                reply_en = st.write_stream(text_stream(stream))
+                reply = reply_en
+            if cached is not None:
+                st.caption("⚡ Answered from cache")
+
+        if cached is None:
+            cache.put(user_msg["content_en"], fingerprint, reply_en)
 
-            st.session_state.messages.append({"role": "assistant", "content": reply})
+        reply_msg = {"role": "assistant", "content": reply, "content_en": reply_en, "turn_id": turn_id}
+        _persist(reply_msg)
+        _remember(reply_msg)
 
-        except Exception as e:
-            st.error(f"⚠️ Error: {e}")
+    except LLMBusyError as e:
+        st.info(f"⏳ {e}")
+    except Exception as e:
+        st.error(f"⚠️ Error: {e}")
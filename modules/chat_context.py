@@ -0,0 +1,217 @@
+# modules/chat_context.py
+"""
+Token-budgeted context for BibleBot.
+
+Every request is built as:
+    [pinned system prompt] + [running summary of older turns]
+    + [retrieved scripture] + [recent turns]
+
+Tokens are counted locally (tiktoken when installed, otherwise a character
+estimate). When the recent turns no longer fit the model's budget, the oldest
+ones are rolled into a running summary. The summary is cached in the caller's
+state together with the id of the last turn it covers, so it is only
+re-generated when the cut point moves.
+"""
+from __future__ import annotations
+
+import os
+from typing import Callable, Dict, List, Optional
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except Exception:
+    tiktoken = None
+    TIKTOKEN_AVAILABLE = False
+
+SYSTEM_PROMPT = (
+    "You are BibleBot, a warm and faithful Bible study assistant for the Tukuza Yesu community. "
+    "Answer questions about the Bible, Christian faith and discipleship clearly and kindly. "
+    "Quote scripture accurately with book, chapter and verse, and say so when you are unsure. "
+    "Keep answers concise unless the user asks for depth."
+)
+
+# Prompt budget per model (tokens reserved for the request, excluding the reply).
+MODEL_BUDGETS: Dict[str, int] = {
+    "gpt-3.5-turbo": 3000,
+    "gpt-4o-mini": 12000,
+    "gpt-4o": 12000,
+}
+DEFAULT_BUDGET = 3000
+
+# Room left for the reply and for the summary itself.
+REPLY_RESERVE = 600
+SUMMARY_MAX_TOKENS = 300
+
+# After rolling, recent turns are trimmed to this share of the budget so the
+# summary is not re-generated on every following turn.
+ROLL_TARGET = 0.6
+
+# Per-message framing overhead used by the chat format.
+_MESSAGE_OVERHEAD = 4
+_REPLY_PRIMING = 2
+
+_encoders: Dict[str, object] = {}
+
+
+def _encoder(model: str):
+    if not TIKTOKEN_AVAILABLE:
+        return None
+    if model not in _encoders:
+        try:
+            _encoders[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encoders[model] = _fallback_encoding()
+        except Exception:
+            # Encoding files could not be fetched (offline); use the estimate
+            _encoders[model] = None
+    return _encoders[model]
+
+
+def _fallback_encoding():
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    enc = _encoder(model)
+    if enc is None:
+        # ~4 characters per token for English text
+        return max(1, len(text or "") // 4)
+    return len(enc.encode(text or ""))
+
+
+def count_message_tokens(messages: List[dict], model: str = "gpt-3.5-turbo") -> int:
+    total = _REPLY_PRIMING
+    for m in messages:
+        total += _MESSAGE_OVERHEAD + count_tokens(m.get("content", ""), model)
+    return total
+
+
+def get_budget(model: str) -> int:
+    """
+    Prompt token budget for a model.
+    Override with BIBLEBOT_CONTEXT_BUDGET (all models) or
+    BIBLEBOT_CONTEXT_BUDGET_<MODEL> (e.g. BIBLEBOT_CONTEXT_BUDGET_GPT_4O_MINI).
+    """
+    specific = os.getenv("BIBLEBOT_CONTEXT_BUDGET_" + model.upper().replace("-", "_").replace(".", "_"))
+    general = os.getenv("BIBLEBOT_CONTEXT_BUDGET")
+    for value in (specific, general):
+        if value:
+            try:
+                return int(value)
+            except ValueError:
+                pass
+    return MODEL_BUDGETS.get(model, DEFAULT_BUDGET)
+
+
+def _truncate(text: str, max_tokens: int, model: str) -> str:
+    enc = _encoder(model)
+    if enc is None:
+        return text[: max_tokens * 4]
+    tokens = enc.encode(text)
+    return text if len(tokens) <= max_tokens else enc.decode(tokens[:max_tokens])
+
+
+def _system_messages(summary: str, retrieved: str = "") -> List[dict]:
+    msgs = [{"role": "system", "content": SYSTEM_PROMPT}]
+    if summary:
+        msgs.append({"role": "system", "content": f"Summary of the earlier conversation: {summary}"})
+    if retrieved:
+        msgs.append({"role": "system", "content": retrieved})
+    return msgs
+
+
+def unsummarized_turns(messages: List[dict], state: dict) -> List[dict]:
+    """The turns after the last one folded into the running summary (those are never sent again)."""
+    covered = state.get("covered_turn")
+    start = 0
+    if covered is not None:
+        # An assistant reply shares its question's turn id, so skip past both
+        for i, m in enumerate(messages):
+            if m.get("turn_id") == covered:
+                start = i + 1
+    return messages[start:]
+
+
+def unsummarized_context(messages: List[dict], state: dict, retrieved: str = "") -> List[dict]:
+    """
+    What an answer to the latest question depends on, known before any
+    summarization call: the system messages with the current summary and
+    grounding, then every turn the summary does not cover yet, without the
+    question itself. Equal to build_context(...)[:-1] whenever nothing rolls.
+    """
+    earlier = unsummarized_turns(messages, state)[:-1]
+    return _system_messages(state.get("summary", ""), retrieved) + [
+        {"role": m["role"], "content": m["content"]} for m in earlier
+    ]
+
+
+def build_context(
+    messages: List[dict],
+    state: dict,
+    summarize: Optional[Callable[[str, List[dict]], str]] = None,
+    model: str = "gpt-3.5-turbo",
+    retrieved: str = "",
+) -> List[dict]:
+    """
+    messages: English turns oldest->newest, each {role, content, turn_id}
+    state: mutable dict kept by the caller (e.g. in session_state) with
+           {"summary": str, "covered_turn": turn_id or None}
+    summarize: fn(previous_summary, turns_to_roll) -> new summary
+    retrieved: optional grounding block (e.g. scripture) for the latest question
+    returns: message list ready for chat.completions
+    """
+    budget = get_budget(model) - REPLY_RESERVE
+    summary = state.get("summary", "")
+    recent = unsummarized_turns(messages, state)
+
+    def fits(turns, limit):
+        return count_message_tokens(_system_messages(summary, retrieved) + turns, model) <= limit
+
+    if not fits(recent, budget):
+        target = int(budget * ROLL_TARGET)
+        cut = 0
+        while cut < len(recent) - 1 and not fits(recent[cut:], target):
+            cut += 1
+        # never split a turn: keep the assistant reply with its question
+        while 0 < cut < len(recent) and recent[cut]["role"] != "user":
+            cut += 1
+        cut = min(cut, len(recent) - 1)
+        rolled, recent = recent[:cut], recent[cut:]
+
+        if rolled:
+            if summarize is not None:
+                try:
+                    summary = _truncate(summarize(summary, rolled), SUMMARY_MAX_TOKENS, model)
+                except Exception:
+                    # Keep the previous summary; the rolled turns are simply dropped
+                    pass
+            state["summary"] = summary
+            state["covered_turn"] = rolled[-1].get("turn_id")
+
+        # Last resort: drop oldest recent turns until the request fits
+        while len(recent) > 1 and not fits(recent, budget):
+            recent = recent[1:]
+
+    return _system_messages(summary, retrieved) + [{"role": m["role"], "content": m["content"]} for m in recent]
+
+
+def summary_prompt(previous_summary: str, turns: List[dict]) -> List[dict]:
+    """Messages asking the model to extend the running summary with the rolled turns."""
+    transcript = "\n".join(f"{m['role'].upper()}: {m['content']}" for m in turns)
+    return [
+        {
+            "role": "system",
+            "content": (
+                "Summarize this Bible study conversation for later reference. Keep the questions asked, "
+                "scripture references cited and conclusions reached. Use at most 150 words."
+            ),
+        },
+        {
+            "role": "user",
+            "content": f"Existing summary:\n{previous_summary or '(none)'}\n\nNew turns:\n{transcript}",
+        },
+    ]
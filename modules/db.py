@@ -1,3 +1,4 @@
+import io
 import psycopg2
 import json
 import streamlit as st
@@ -50,6 +51,179 @@ def run_schema_upgrades():
                 );
             """)
 
+            # Sentiment is scored in the background: `sentiment` holds a signed score
+            # (-1..1), `sentiment_label` the model's label, `sentiment_status` pending/scoring/done/error
+            cur.execute("""
+                ALTER TABLE journal_entries
+                ADD COLUMN IF NOT EXISTS sentiment_label VARCHAR(20),
+                ADD COLUMN IF NOT EXISTS sentiment_status VARCHAR(10) DEFAULT 'pending',
+                ADD COLUMN IF NOT EXISTS sentiment_claimed_at TIMESTAMP;
+            """)
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_journal_entries_sentiment_pending
+                ON journal_entries (id) WHERE sentiment_status IN ('pending', 'scoring');
+            """)
+
+            # Which model (hub id, revision, backend) produced each score; the backfill
+            # (scripts/backfill_sentiment.py) rescores rows from any other, checkpointing here
+            cur.execute("ALTER TABLE journal_entries ADD COLUMN IF NOT EXISTS sentiment_model VARCHAR(100);")
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS sentiment_backfill_runs (
+                    model_version VARCHAR(100) PRIMARY KEY,
+                    last_id INTEGER NOT NULL DEFAULT 0,
+                    scored BIGINT NOT NULL DEFAULT 0,
+                    failed BIGINT NOT NULL DEFAULT 0,
+                    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    finished_at TIMESTAMP
+                );
+            """)
+
+            # Embeddings for "related entries": float16 vectors as BYTEA, written in the
+            # background; embedding_seq orders writes so readers can fetch only what is new
+            cur.execute("CREATE SEQUENCE IF NOT EXISTS journal_embedding_seq;")
+            cur.execute("""
+                ALTER TABLE journal_entries
+                ADD COLUMN IF NOT EXISTS embedding BYTEA,
+                ADD COLUMN IF NOT EXISTS embedding_model VARCHAR(100),
+                ADD COLUMN IF NOT EXISTS embedding_status VARCHAR(10) DEFAULT 'pending',
+                ADD COLUMN IF NOT EXISTS embedding_claimed_at TIMESTAMP,
+                ADD COLUMN IF NOT EXISTS embedding_seq BIGINT;
+            """)
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_journal_entries_embedding_pending
+                ON journal_entries (id) WHERE embedding_status IN ('pending', 'scoring');
+            """)
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_journal_entries_embedding_seq
+                ON journal_entries (user_id, embedding_seq) WHERE embedding_seq IS NOT NULL;
+            """)
+
+            # Full-text search: weighted entry (A) > reflection (B) > goal (C), kept in sync by Postgres
+            cur.execute("""
+                ALTER TABLE journal_entries
+                ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+                    setweight(to_tsvector('english', coalesce(entry_text, '')), 'A') ||
+                    setweight(to_tsvector('english', coalesce(reflection_text, '')), 'B') ||
+                    setweight(to_tsvector('english', coalesce(faith_goal, '')), 'C')
+                ) STORED;
+            """)
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_journal_entries_search
+                ON journal_entries USING GIN (search_vector);
+            """)
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_journal_entries_user_date
+                ON journal_entries (user_id, entry_date DESC);
+            """)
+
+            # Trends read a per-(user, day, mood) rollup kept current by a trigger, so their
+            # cost follows the number of days shown rather than the number of entries.
+            # journal_rollup_versions.version changes on every write and keys the UI cache.
+            cur.execute("SELECT to_regclass('journal_daily_rollup') IS NULL;")
+            rollup_is_new = cur.fetchone()[0]
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS journal_daily_rollup (
+                    user_id TEXT NOT NULL,
+                    day DATE NOT NULL,
+                    mood VARCHAR(50) NOT NULL DEFAULT '',
+                    entries INT NOT NULL DEFAULT 0,
+                    scored INT NOT NULL DEFAULT 0,
+                    sentiment_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+                    PRIMARY KEY (user_id, day, mood)
+                );
+            """)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS journal_rollup_versions (
+                    user_id TEXT PRIMARY KEY,
+                    version BIGINT NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+            """)
+            cur.execute("""
+                CREATE OR REPLACE FUNCTION journal_rollup_apply() RETURNS trigger AS $$
+                BEGIN
+                    -- e.g. claiming for scoring (pending -> scoring) leaves the rollup as it is
+                    IF TG_OP = 'UPDATE'
+                       AND NEW.user_id = OLD.user_id
+                       AND NEW.entry_date::date = OLD.entry_date::date
+                       AND coalesce(NEW.mood, '') = coalesce(OLD.mood, '')
+                       AND (NEW.sentiment_status = 'done') IS NOT DISTINCT FROM (OLD.sentiment_status = 'done')
+                       AND NEW.sentiment IS NOT DISTINCT FROM OLD.sentiment THEN
+                        RETURN NULL;
+                    END IF;
+                    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                        UPDATE journal_daily_rollup
+                        SET entries = entries - 1,
+                            scored = scored - (OLD.sentiment_status = 'done' AND OLD.sentiment IS NOT NULL)::int,
+                            sentiment_sum = sentiment_sum - CASE WHEN OLD.sentiment_status = 'done'
+                                                                 THEN coalesce(OLD.sentiment, 0) ELSE 0 END
+                        WHERE user_id = OLD.user_id AND day = OLD.entry_date::date AND mood = coalesce(OLD.mood, '');
+                        INSERT INTO journal_rollup_versions (user_id, version) VALUES (OLD.user_id, 1)
+                        ON CONFLICT (user_id) DO UPDATE
+                        SET version = journal_rollup_versions.version + 1, updated_at = CURRENT_TIMESTAMP;
+                    END IF;
+                    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                        INSERT INTO journal_daily_rollup AS r (user_id, day, mood, entries, scored, sentiment_sum)
+                        VALUES (NEW.user_id, NEW.entry_date::date, coalesce(NEW.mood, ''), 1,
+                                (NEW.sentiment_status = 'done' AND NEW.sentiment IS NOT NULL)::int,
+                                CASE WHEN NEW.sentiment_status = 'done' THEN coalesce(NEW.sentiment, 0) ELSE 0 END)
+                        ON CONFLICT (user_id, day, mood) DO UPDATE
+                        SET entries = r.entries + EXCLUDED.entries,
+                            scored = r.scored + EXCLUDED.scored,
+                            sentiment_sum = r.sentiment_sum + EXCLUDED.sentiment_sum;
+                        IF TG_OP = 'INSERT' OR NEW.user_id IS DISTINCT FROM OLD.user_id THEN
+                            INSERT INTO journal_rollup_versions (user_id, version) VALUES (NEW.user_id, 1)
+                            ON CONFLICT (user_id) DO UPDATE
+                            SET version = journal_rollup_versions.version + 1, updated_at = CURRENT_TIMESTAMP;
+                        END IF;
+                    END IF;
+                    RETURN NULL;
+                END;
+                $$ LANGUAGE plpgsql;
+            """)
+            if rollup_is_new:
+                # Backfill with writers paused, so no entry lands between the copy and the trigger
+                cur.execute("LOCK TABLE journal_entries IN SHARE ROW EXCLUSIVE MODE;")
+                cur.execute("""
+                    INSERT INTO journal_daily_rollup (user_id, day, mood, entries, scored, sentiment_sum)
+                    SELECT user_id, entry_date::date, coalesce(mood, ''), count(*),
+                           count(*) FILTER (WHERE sentiment_status = 'done' AND sentiment IS NOT NULL),
+                           coalesce(sum(sentiment) FILTER (WHERE sentiment_status = 'done'), 0)
+                    FROM journal_entries
+                    GROUP BY 1, 2, 3;
+                """)
+            cur.execute("""
+                DO $$
+                BEGIN
+                    IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'journal_entries_rollup') THEN
+                        CREATE TRIGGER journal_entries_rollup
+                        AFTER INSERT OR DELETE OR UPDATE OF user_id, entry_date, mood, sentiment, sentiment_status
+                        ON journal_entries
+                        FOR EACH ROW EXECUTE FUNCTION journal_rollup_apply();
+                    END IF;
+                END;
+                $$;
+            """)
+
+            # ---- BibleBot chat history (append-only) ----
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS chat_messages (
+                    id BIGSERIAL PRIMARY KEY,
+                    user_id TEXT NOT NULL,
+                    turn_id TEXT NOT NULL,
+                    role VARCHAR(20) NOT NULL,
+                    content TEXT NOT NULL,
+                    content_en TEXT,
+                    lang VARCHAR(20),
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+            """)
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_chat_messages_user_id
+                ON chat_messages (user_id, id);
+            """)
+
             # ---- Gift assessments ----
             cur.execute("""
                 CREATE TABLE IF NOT EXISTS gift_assessments (
@@ -146,31 +320,74 @@ def fetch_latest_gift_assessment(session_id):
             row = cur.fetchone()
             if not row:
                 return None
+            return _gift_assessment_row(row)
+    finally:
+        conn.close()
+
+
+def fetch_recent_gift_assessments(session_id, limit=5):
+    """A user's last `limit` assessments, newest first, in the same shape as fetch_latest_gift_assessment."""
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(
+                """
+                SELECT id, created_at, session_id, language, answers_json, results_json
+                FROM gift_assessments
+                WHERE session_id = %s
+                ORDER BY created_at DESC
+                LIMIT %s;
+                """,
+                (str(session_id), limit),
+            )
+            return [_gift_assessment_row(row) for row in cur.fetchall()]
+    finally:
+        conn.close()
 
-            def safe_parse(val):
-                if val is None:
-                    return {}
-                if isinstance(val, (dict, list)):
-                    return val
-                if isinstance(val, str):
-                    try:
-                        return json.loads(val)
-                    except Exception:
-                        return {}
-                return {}
 
-            return {
-                "id": row["id"],
-                "created_at": row["created_at"],
-                "session_id": row["session_id"],
-                "language": row["language"],
-                "answers": safe_parse(row["answers_json"]),
-                "results": safe_parse(row["results_json"]),
-            }
+def iter_gift_assessments(batch_size=1000):
+    """Stream every stored assessment oldest->newest through a server-side cursor."""
+    conn = get_db_connection()
+    try:
+        with conn.cursor(name="gift_history", cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.itersize = batch_size
+            cur.execute(
+                """
+                SELECT id, created_at, session_id, language, answers_json, results_json
+                FROM gift_assessments
+                ORDER BY id;
+                """
+            )
+            for row in cur:
+                yield _gift_assessment_row(row)
     finally:
         conn.close()
 
 
+def _safe_json(val):
+    if val is None:
+        return {}
+    if isinstance(val, (dict, list)):
+        return val
+    if isinstance(val, str):
+        try:
+            return json.loads(val)
+        except Exception:
+            return {}
+    return {}
+
+
+def _gift_assessment_row(row):
+    return {
+        "id": row["id"],
+        "created_at": row["created_at"],
+        "session_id": row["session_id"],
+        "language": row["language"],
+        "answers": _safe_json(row["answers_json"]),
+        "results": _safe_json(row["results_json"]),
+    }
+
+
 
 
 def delete_gift_assessment_for_user(session_id):
@@ -210,7 +427,8 @@ def fetch_journal_entries(user_id):
         with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
             cur.execute(
                 """
-                SELECT id, entry_date, entry_text, reflection_text, faith_goal, mood, sentiment
+                SELECT id, entry_date, entry_text, reflection_text, faith_goal, mood,
+                       sentiment, sentiment_label, sentiment_status, embedding_status
                 FROM journal_entries
                 WHERE user_id = %s
                 ORDER BY entry_date DESC;
@@ -222,6 +440,298 @@ def fetch_journal_entries(user_id):
         conn.close()
 
 
+JOURNAL_SEARCH_HEADLINE = "StartSel=**, StopSel=**, MaxFragments=2, MaxWords=25, MinWords=8, FragmentDelimiter=\" … \""
+
+
+def search_journal_entries(user_id, query=None, moods=None, sentiment_min=None, sentiment_max=None,
+                           date_from=None, date_to=None, order="rank", limit=10, offset=0):
+    """
+    Full-text search over a user's entries (entry, reflection and goal).
+
+    `query` uses web-search syntax ("quoted phrase", or, -word); without one every
+    entry matches. Filters: `moods` (list), signed sentiment range, and
+    `date_from`/`date_to` (datetimes, half-open). `order` is "rank" (relevance,
+    then newest) or "recent". Returns {"total": n, "rows": [...]}; each row has a
+    `snippet` with the matches in **bold** and a `rank`. Headlines are built only
+    for the returned page.
+    """
+    query = (query or "").strip() or None
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(
+                f"""
+                WITH page AS (
+                    SELECT id, entry_date, entry_text, reflection_text, faith_goal, mood,
+                           sentiment, sentiment_label, sentiment_status,
+                           CASE WHEN %(q)s IS NULL THEN 0
+                                ELSE ts_rank_cd(search_vector, websearch_to_tsquery('english', %(q)s))
+                           END AS rank,
+                           count(*) OVER () AS total
+                    FROM journal_entries
+                    WHERE user_id = %(user_id)s
+                      AND (%(q)s IS NULL OR search_vector @@ websearch_to_tsquery('english', %(q)s))
+                      AND (%(moods)s IS NULL OR mood = ANY(%(moods)s))
+                      AND (%(s_min)s IS NULL OR sentiment >= %(s_min)s)
+                      AND (%(s_max)s IS NULL OR sentiment <= %(s_max)s)
+                      AND (%(d_from)s IS NULL OR entry_date >= %(d_from)s)
+                      AND (%(d_to)s IS NULL OR entry_date < %(d_to)s)
+                    ORDER BY {"rank DESC, " if order == "rank" else ""}entry_date DESC, id DESC
+                    LIMIT %(limit)s OFFSET %(offset)s
+                )
+                SELECT page.*,
+                       CASE WHEN %(q)s IS NULL THEN left(entry_text, 200)
+                            ELSE ts_headline('english',
+                                             concat_ws(' … ', entry_text, reflection_text, faith_goal),
+                                             websearch_to_tsquery('english', %(q)s),
+                                             %(headline)s)
+                       END AS snippet
+                FROM page
+                ORDER BY {"rank DESC, " if order == "rank" else ""}entry_date DESC, id DESC;
+                """,
+                {
+                    "user_id": user_id,
+                    "q": query,
+                    "moods": list(moods) if moods else None,
+                    "s_min": sentiment_min,
+                    "s_max": sentiment_max,
+                    "d_from": date_from,
+                    "d_to": date_to,
+                    "limit": limit,
+                    "offset": offset,
+                    "headline": JOURNAL_SEARCH_HEADLINE,
+                },
+            )
+            rows = cur.fetchall()
+            return {"total": rows[0]["total"] if rows else 0, "rows": rows}
+    finally:
+        conn.close()
+
+
+def claim_pending_embeddings(limit=32, stale_after_seconds=300):
+    """Like claim_pending_sentiment, for entries still waiting for an embedding."""
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(
+                """
+                UPDATE journal_entries
+                SET embedding_status = 'scoring', embedding_claimed_at = NOW()
+                WHERE id IN (
+                    SELECT id FROM journal_entries
+                    WHERE embedding_status = 'pending'
+                       OR (embedding_status = 'scoring'
+                           AND embedding_claimed_at < NOW() - make_interval(secs => %s))
+                    ORDER BY id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, entry_text, reflection_text;
+                """,
+                (stale_after_seconds, limit),
+            )
+            rows = cur.fetchall()
+            conn.commit()
+            return rows  # list[dict]
+    finally:
+        conn.close()
+
+
+def update_journal_embeddings(results):
+    """results: iterable of (entry_id, float16 vector bytes, model id); each row takes the next embedding_seq."""
+    results = [(entry_id, psycopg2.Binary(blob), model_id) for entry_id, blob, model_id in results]
+    if not results:
+        return 0
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            psycopg2.extras.execute_values(
+                cur,
+                """
+                UPDATE journal_entries AS j
+                SET embedding = v.embedding, embedding_model = v.model, embedding_status = 'done',
+                    embedding_seq = nextval('journal_embedding_seq')
+                FROM (VALUES %s) AS v (id, embedding, model)
+                WHERE j.id = v.id;
+                """,
+                results,
+                template="(%s::int, %s::bytea, %s::varchar)",
+                page_size=len(results),
+            )
+            conn.commit()
+            return cur.rowcount
+    finally:
+        conn.close()
+
+
+def mark_journal_embedding_failed(entry_ids):
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "UPDATE journal_entries SET embedding_status = 'error' WHERE id = ANY(%s);",
+                (list(entry_ids),),
+            )
+            conn.commit()
+            return cur.rowcount
+    finally:
+        conn.close()
+
+
+def fetch_journal_embeddings(user_id, model_id, after_seq=0):
+    """(id, embedding, embedding_seq) for the user's entries embedded after `after_seq`, oldest first."""
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(
+                """
+                SELECT id, embedding, embedding_seq
+                FROM journal_entries
+                WHERE user_id = %s AND embedding_seq > %s AND embedding_model = %s
+                ORDER BY embedding_seq;
+                """,
+                (user_id, after_seq, model_id),
+            )
+            return cur.fetchall()  # list[dict]
+    finally:
+        conn.close()
+
+
+def fetch_journal_entries_by_ids(user_id, entry_ids):
+    """The user's entries among `entry_ids` (deleted ones are simply missing), in no particular order."""
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(
+                """
+                SELECT id, entry_date, entry_text, reflection_text, faith_goal, mood,
+                       sentiment, sentiment_label, sentiment_status
+                FROM journal_entries
+                WHERE user_id = %s AND id = ANY(%s);
+                """,
+                (user_id, list(entry_ids)),
+            )
+            return cur.fetchall()  # list[dict]
+    finally:
+        conn.close()
+
+
+# ---------- Journal trends (read from journal_daily_rollup) ----------
+TREND_PERIODS = ("day", "week", "month")
+
+
+def fetch_journal_rollup_version(user_id):
+    """Changes whenever any of the user's entries is added, edited, scored or deleted."""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT version FROM journal_rollup_versions WHERE user_id = %s;", (user_id,))
+            row = cur.fetchone()
+            return row[0] if row else 0
+    finally:
+        conn.close()
+
+
+def fetch_journal_trends(user_id, period="week", days=365):
+    """
+    Per `period` bucket over the last `days` days: entries, scored entries, mean
+    signed sentiment (None where nothing is scored yet) and the mood mix, as rows
+    (bucket, mood, entries, mood_share, bucket_entries, bucket_scored, avg_sentiment).
+    """
+    if period not in TREND_PERIODS:
+        raise ValueError(f"period must be one of {TREND_PERIODS}")
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(
+                """
+                WITH moods AS (
+                    SELECT date_trunc(%(period)s, day)::date AS bucket, mood,
+                           sum(entries) AS entries, sum(scored) AS scored, sum(sentiment_sum) AS sentiment_sum
+                    FROM journal_daily_rollup
+                    WHERE user_id = %(user_id)s AND day >= current_date - %(days)s AND entries > 0
+                    GROUP BY 1, 2
+                )
+                SELECT bucket, mood, entries,
+                       entries::float / sum(entries) OVER w AS mood_share,
+                       sum(entries) OVER w AS bucket_entries,
+                       sum(scored) OVER w AS bucket_scored,
+                       sum(sentiment_sum) OVER w / nullif(sum(scored) OVER w, 0) AS avg_sentiment
+                FROM moods
+                WINDOW w AS (PARTITION BY bucket)
+                ORDER BY bucket, mood;
+                """,
+                {"user_id": user_id, "period": period, "days": days},
+            )
+            return cur.fetchall()  # list[dict]
+    finally:
+        conn.close()
+
+
+def fetch_rolling_sentiment(user_id, days=90):
+    """Daily mean sentiment with trailing 7- and 30-day means (weighted by scored entries)."""
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(
+                """
+                WITH daily AS (
+                    SELECT day, sum(entries) AS entries, sum(scored) AS scored, sum(sentiment_sum) AS sentiment_sum
+                    FROM journal_daily_rollup
+                    -- 29 extra days so the first windows shown are full
+                    WHERE user_id = %(user_id)s AND day >= current_date - (%(days)s + 29) AND entries > 0
+                    GROUP BY day
+                ),
+                rolling AS (
+                    SELECT day, entries,
+                           sentiment_sum / nullif(scored, 0) AS day_avg,
+                           sum(sentiment_sum) OVER w7 / nullif(sum(scored) OVER w7, 0) AS avg_7d,
+                           sum(sentiment_sum) OVER w30 / nullif(sum(scored) OVER w30, 0) AS avg_30d
+                    FROM daily
+                    WINDOW w7 AS (ORDER BY day RANGE BETWEEN INTERVAL '6 days' PRECEDING AND CURRENT ROW),
+                           w30 AS (ORDER BY day RANGE BETWEEN INTERVAL '29 days' PRECEDING AND CURRENT ROW)
+                )
+                SELECT * FROM rolling
+                WHERE day >= current_date - %(days)s
+                ORDER BY day;
+                """,
+                {"user_id": user_id, "days": days},
+            )
+            return cur.fetchall()  # list[dict]
+    finally:
+        conn.close()
+
+
+def fetch_journal_streaks(user_id):
+    """Consecutive journaling days: {"current": n, "longest": n, "longest_end": date}."""
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(
+                """
+                WITH days AS (
+                    SELECT DISTINCT day FROM journal_daily_rollup WHERE user_id = %s AND entries > 0
+                ),
+                runs AS (
+                    -- gaps and islands: consecutive days share day - row_number()
+                    SELECT min(day) AS first_day, max(day) AS last_day, count(*) AS length
+                    FROM (SELECT day, day - (row_number() OVER (ORDER BY day))::int AS island FROM days) d
+                    GROUP BY island
+                )
+                SELECT
+                    coalesce((SELECT length FROM runs WHERE last_day >= current_date - 1
+                              ORDER BY last_day DESC LIMIT 1), 0) AS current,
+                    coalesce(max(length), 0) AS longest,
+                    (SELECT last_day FROM runs ORDER BY length DESC, last_day DESC LIMIT 1) AS longest_end
+                FROM runs;
+                """,
+                (user_id,),
+            )
+            return cur.fetchone()
+    finally:
+        conn.close()
+
+
 def delete_journal_entry(entry_id):
     conn = get_db_connection()
     try:
@@ -231,3 +741,354 @@ def delete_journal_entry(entry_id):
             return cur.rowcount > 0
     finally:
         conn.close()
+
+
+def claim_pending_sentiment(limit=16, stale_after_seconds=300):
+    """
+    Mark up to `limit` unscored entries as 'scoring' and return them (id, entry_text).
+    SKIP LOCKED lets several workers or processes claim disjoint batches; rows a
+    crashed worker left in 'scoring' are reclaimed after `stale_after_seconds`.
+    """
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(
+                """
+                UPDATE journal_entries
+                SET sentiment_status = 'scoring', sentiment_claimed_at = NOW()
+                WHERE id IN (
+                    SELECT id FROM journal_entries
+                    WHERE sentiment_status = 'pending'
+                       OR (sentiment_status = 'scoring'
+                           AND sentiment_claimed_at < NOW() - make_interval(secs => %s))
+                    ORDER BY id
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, entry_text;
+                """,
+                (stale_after_seconds, limit),
+            )
+            rows = cur.fetchall()
+            conn.commit()
+            return rows  # list[dict]
+    finally:
+        conn.close()
+
+
+def update_journal_sentiments(results):
+    """results: iterable of (entry_id, score, label, model version); marks each entry 'done' in one statement."""
+    results = list(results)
+    if not results:
+        return 0
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            psycopg2.extras.execute_values(
+                cur,
+                """
+                UPDATE journal_entries AS j
+                SET sentiment = v.score, sentiment_label = v.label, sentiment_status = 'done',
+                    sentiment_model = v.model
+                FROM (VALUES %s) AS v (id, score, label, model)
+                WHERE j.id = v.id;
+                """,
+                results,
+                template="(%s::int, %s::float, %s::varchar, %s::varchar)",
+                page_size=len(results),
+            )
+            conn.commit()
+            return cur.rowcount
+    finally:
+        conn.close()
+
+
+def mark_journal_sentiment_failed(entry_ids):
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                "UPDATE journal_entries SET sentiment_status = 'error' WHERE id = ANY(%s);",
+                (list(entry_ids),),
+            )
+            conn.commit()
+            return cur.rowcount
+    finally:
+        conn.close()
+
+
+# ---------- Sentiment backfill ----------
+# Entries whose score is missing, failed, or from another model; 'scoring' rows belong to a worker
+_NEEDS_SENTIMENT = """
+    sentiment_status IS DISTINCT FROM 'scoring'
+    AND (sentiment_status IS DISTINCT FROM 'done' OR sentiment IS NULL
+         OR (NOT %(missing_only)s AND sentiment_model IS DISTINCT FROM %(version)s))
+"""
+
+
+def start_sentiment_backfill(model_version, restart=False):
+    """The checkpoint row for `model_version` (created, or reset with restart=True)."""
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(
+                """
+                INSERT INTO sentiment_backfill_runs (model_version) VALUES (%s)
+                ON CONFLICT (model_version) DO UPDATE
+                SET last_id = CASE WHEN %s THEN 0 ELSE sentiment_backfill_runs.last_id END,
+                    scored = CASE WHEN %s THEN 0 ELSE sentiment_backfill_runs.scored END,
+                    failed = CASE WHEN %s THEN 0 ELSE sentiment_backfill_runs.failed END,
+                    started_at = CASE WHEN %s THEN CURRENT_TIMESTAMP ELSE sentiment_backfill_runs.started_at END,
+                    updated_at = CURRENT_TIMESTAMP,
+                    finished_at = NULL
+                RETURNING *;
+                """,
+                (model_version, restart, restart, restart, restart),
+            )
+            row = cur.fetchone()
+            conn.commit()
+            return row
+    finally:
+        conn.close()
+
+
+def save_sentiment_backfill(model_version, last_id, scored, failed, finished=False):
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE sentiment_backfill_runs
+                SET last_id = %s, scored = %s, failed = %s, updated_at = CURRENT_TIMESTAMP,
+                    finished_at = CASE WHEN %s THEN CURRENT_TIMESTAMP END
+                WHERE model_version = %s;
+                """,
+                (last_id, scored, failed, finished, model_version),
+            )
+            conn.commit()
+    finally:
+        conn.close()
+
+
+def list_sentiment_backfills():
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute("SELECT * FROM sentiment_backfill_runs ORDER BY updated_at DESC;")
+            return cur.fetchall()
+    finally:
+        conn.close()
+
+
+def count_sentiment_backfill(model_version, after_id=0, missing_only=False):
+    """How many entries after `after_id` still need a score from `model_version`."""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"SELECT count(*) FROM journal_entries WHERE id > %(after)s AND {_NEEDS_SENTIMENT};",
+                {"after": after_id, "version": model_version, "missing_only": missing_only},
+            )
+            return cur.fetchone()[0]
+    finally:
+        conn.close()
+
+
+def fetch_sentiment_backfill_chunk(model_version, after_id=0, limit=512, missing_only=False):
+    """The next `limit` entries needing a score, by id after `after_id` (keyset paging over the primary key)."""
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(
+                f"""
+                SELECT id, entry_text, sentiment_status FROM journal_entries
+                WHERE id > %(after)s AND {_NEEDS_SENTIMENT}
+                ORDER BY id
+                LIMIT %(limit)s;
+                """,
+                {"after": after_id, "version": model_version, "missing_only": missing_only, "limit": limit},
+            )
+            return cur.fetchall()  # list[dict]
+    finally:
+        conn.close()
+
+
+# ---------- Journal bulk import/export (COPY) ----------
+JOURNAL_IMPORT_COLUMNS = ("entry_date", "entry_text", "reflection_text", "faith_goal", "mood")
+JOURNAL_EXPORT_COLUMNS = JOURNAL_IMPORT_COLUMNS + ("sentiment", "sentiment_label")
+
+
+class _CopyStream(io.TextIOBase):
+    """Read-only file over an iterator of text chunks, for COPY ... FROM STDIN without buffering it all."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buf = ""
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size is None or size < 0 or len(self._buf) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buf += chunk
+        if size is None or size < 0:
+            out, self._buf = self._buf, ""
+        else:
+            out, self._buf = self._buf[:size], self._buf[size:]
+        return out
+
+
+def copy_journal_entries_in(user_id, csv_lines):
+    """
+    Bulk-insert entries for one user. `csv_lines` is an iterable of CSV lines
+    (JOURNAL_IMPORT_COLUMNS, no header, entry_date may be empty for "now"),
+    streamed through COPY into a temporary table, so memory does not grow with
+    the file. Entries already in the journal or repeated in the file are
+    skipped: a dated row matches on date and text, an undated row on text
+    alone (its "now" differs on every import), so re-importing a file inserts
+    nothing. New entries wait for background sentiment and embeddings like
+    any other. All or nothing; returns the number inserted.
+    """
+    columns = ", ".join(JOURNAL_IMPORT_COLUMNS)
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                CREATE TEMP TABLE journal_import (
+                    line SERIAL,
+                    entry_date TIMESTAMP,
+                    entry_text TEXT NOT NULL,
+                    reflection_text TEXT,
+                    faith_goal TEXT,
+                    mood VARCHAR(50)
+                ) ON COMMIT DROP;
+            """)
+            cur.copy_expert(f"COPY journal_import ({columns}) FROM STDIN WITH (FORMAT csv)", _CopyStream(csv_lines))
+            cur.execute(
+                f"""
+                INSERT INTO journal_entries (user_id, {columns})
+                SELECT %s, COALESCE(s.entry_date, NOW()), s.entry_text, s.reflection_text, s.faith_goal, s.mood
+                FROM (
+                    SELECT DISTINCT ON (entry_date, entry_text) *
+                    FROM journal_import
+                    ORDER BY entry_date, entry_text, line
+                ) AS s
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM journal_entries j
+                    WHERE j.user_id = %s AND j.entry_text = s.entry_text
+                      AND (s.entry_date IS NULL OR j.entry_date = s.entry_date)
+                )
+                AND NOT (s.entry_date IS NULL AND EXISTS (
+                    SELECT 1 FROM journal_import d WHERE d.entry_date IS NOT NULL AND d.entry_text = s.entry_text
+                ))
+                ORDER BY s.line;
+                """,
+                (user_id, user_id),
+            )
+            inserted = cur.rowcount
+            conn.commit()
+            return inserted
+    finally:
+        conn.close()
+
+
+def copy_journal_entries_out(out, user_id=None, fmt="csv"):
+    """
+    Stream entries (JOURNAL_EXPORT_COLUMNS, oldest first) to the file object
+    `out` with COPY ... TO STDOUT: one user's, or with user_id None everyone's
+    (then with a leading user_id column). `fmt` is "csv" (with a header) or
+    "jsonl" (one JSON object per line).
+    """
+    columns = ("user_id",) * (user_id is None) + JOURNAL_EXPORT_COLUMNS
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SET datestyle TO ISO;")
+            select = cur.mogrify(
+                f"""
+                SELECT {", ".join(columns)} FROM journal_entries
+                WHERE (%s IS NULL OR user_id = %s)
+                ORDER BY user_id, entry_date, id
+                """,
+                (user_id, user_id),
+            ).decode()
+            if fmt == "csv":
+                cur.copy_expert(f"COPY ({select}) TO STDOUT WITH (FORMAT csv, HEADER)", out)
+            elif fmt == "jsonl":
+                # CSV with a quote and delimiter that never occur writes each JSON document
+                # verbatim (text format would escape its backslashes)
+                cur.copy_expert(
+                    f"COPY (SELECT row_to_json(e) FROM ({select}) AS e) TO STDOUT "
+                    "WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')",
+                    out,
+                )
+            else:
+                raise ValueError(f"Unknown export format: {fmt}")
+            conn.rollback()  # read-only; also resets datestyle
+    finally:
+        conn.close()
+
+
+# ---------- BibleBot chat history ----------
+def insert_chat_message(user_id, turn_id, role, content, content_en=None, lang=None):
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO chat_messages (user_id, turn_id, role, content, content_en, lang)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                RETURNING id;
+                """,
+                (str(user_id), turn_id, role, content, content_en, lang),
+            )
+            message_id = cur.fetchone()[0]
+            conn.commit()
+            return message_id
+    finally:
+        conn.close()
+
+
+def fetch_chat_messages(user_id, before_id=None, limit=20):
+    """Newest `limit` messages older than `before_id` (keyset page), returned oldest->newest."""
+    conn = get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(
+                """
+                SELECT id, turn_id, role, content, content_en, lang, created_at
+                FROM chat_messages
+                WHERE user_id = %s AND (%s IS NULL OR id < %s)
+                ORDER BY id DESC
+                LIMIT %s;
+                """,
+                (str(user_id), before_id, before_id, limit),
+            )
+            return list(reversed(cur.fetchall()))  # list[dict]
+    finally:
+        conn.close()
+
+
+def iter_chat_messages(user_id, batch_size=500):
+    """Stream a user's whole chat history oldest->newest through a server-side cursor."""
+    conn = get_db_connection()
+    try:
+        with conn.cursor(name="chat_export", cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.itersize = batch_size
+            cur.execute(
+                """
+                SELECT id, role, content, created_at
+                FROM chat_messages
+                WHERE user_id = %s
+                ORDER BY id;
+                """,
+                (str(user_id),),
+            )
+            for row in cur:
+                yield row
+    finally:
+        conn.close()
+
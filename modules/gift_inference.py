@@ -0,0 +1,302 @@
+# modules/gift_inference.py
+"""
+In-process inference service for the legacy spiritual-gifts model
+(models/gift_model.pkl: a RandomForest over 30 answers Q1..Q30, 7 gifts).
+
+The model comes from the model registry, i.e. loaded once per process from
+its memory-mapped export, and takes NumPy rows directly, so no DataFrame is
+built per request. `predict()` is for interactive use: concurrent calls
+from several sessions are collected by one batcher thread for up to
+`max_wait` seconds (or `max_batch` rows) and answered by a single
+predict_proba call. `predict_proba()` is the offline bulk path.
+
+The model and the deterministic engine (modules/gifts_engine.py) ask
+different questionnaires (30 vs 50 items) and name gifts differently.
+`project_core_answers()` maps a stored 50-answer assessment onto the 30
+legacy questions through the closest core item; questions with no
+counterpart (tongues, healing, hospitality, ...) get the neutral answer.
+`compare_with_engine()` scores whole assessment histories with both.
+
+    from modules.gift_inference import get_gift_service
+    prediction = get_gift_service().predict(responses)   # 30 answers, 1..5
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from modules.gifts_engine import QUESTIONS_EN as CORE_QUESTIONS, score_gifts
+
+N_LEGACY = 30
+NEUTRAL = 3.0
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_WAIT = 0.002
+BULK_BATCH = 4096
+
+# Legacy question (0-based, as asked in modules/testa.py) -> closest core question (0-based) or None
+LEGACY_TO_CORE: Dict[int, Optional[int]] = {
+    0: 2,     # explaining Bible truths clearly -> organize biblical ideas into clear explanations
+    1: 33,    # take the lead organizing ministry -> coordinate efforts toward shared outcomes
+    2: 12,    # share the gospel with strangers -> initiate faith conversations outside church
+    3: None,  # prophetic warnings or encouragements
+    4: 15,    # compassion for the suffering
+    5: 28,    # giving even when it costs me -> sacrifice comfort to support kingdom work
+    6: 23,    # behind the scenes -> quietly step in when something needs doing
+    7: 39,    # asked for advice -> counsel has helped others choose well
+    8: 3,     # studying deep concepts -> study Scripture beyond what is required
+    9: None,  # trusting God where others worry
+    10: 42,   # sense deception -> identify error or unhealthy influence quickly
+    11: None,  # hospitality
+    12: 47,   # praying for long periods -> extended time in focused prayer
+    13: 6,    # concern for others' growth -> burdened when believers stagnate
+    14: 8,    # uplift the discouraged -> words that restore confidence
+    15: None,  # healing
+    16: 10,   # pioneering, reaching the unreached -> urgency around people who do not know Christ
+    17: 32,   # managing projects -> organize people and processes
+    18: None,  # tongues
+    19: None,  # interpretation of tongues
+    20: None,  # standing firm in hostile settings
+    21: 4,    # preparing lessons -> people understand the Bible better after I explain
+    22: 11,   # truth in everyday conversations -> think about explaining the gospel
+    23: 17,   # moved by others' pain -> move toward people in pain
+    24: 25,   # giving above the tithe -> joy in resourcing God's work
+    25: 31,   # influence toward a vision -> concerned when vision is unclear
+    26: 40,   # distinguish truth from error -> evaluate teaching carefully
+    27: None,  # accurate dreams and impressions
+    28: 5,    # responsibility for others' welfare -> help people take their next step
+    29: 7,    # encouraging words -> motivate others toward spiritual action
+}
+
+# Model label -> engine label (None: the engine has no such gift)
+MODEL_TO_ENGINE: Dict[str, Optional[str]] = {
+    "Teaching": "Teaching",
+    "Evangelism": "Evangelism",
+    "Mercy": "Mercy",
+    "Giving": "Giving",
+    "Leadership": "Leadership",
+    "Service": "Helps",
+    "Prophecy": None,
+}
+
+_CORE_INDEX = np.array([LEGACY_TO_CORE[i] if LEGACY_TO_CORE[i] is not None else -1 for i in range(N_LEGACY)])
+
+
+@dataclass
+class GiftPrediction:
+    primary: str
+    secondary: str
+    probabilities: Dict[str, float]
+
+
+@dataclass
+class ServiceStats:
+    requests: int = 0
+    batches: int = 0
+    largest_batch: int = 0
+    bulk_rows: int = 0
+    infer_seconds: float = 0.0
+
+    @property
+    def mean_batch(self) -> float:
+        return self.requests / self.batches if self.batches else 0.0
+
+
+def as_rows(answers) -> np.ndarray:
+    """Answers (one list, or a 2-D array of them) as a float64 matrix; checks the width."""
+    rows = np.asarray(answers, dtype=np.float64)
+    if rows.ndim == 1:
+        rows = rows.reshape(1, -1)
+    if rows.shape[1] != N_LEGACY:
+        raise ValueError(f"Expected {N_LEGACY} answers per assessment, got {rows.shape[1]}")
+    return rows
+
+
+def project_core_answers(core: np.ndarray) -> np.ndarray:
+    """(n, 50) core answers -> (n, 30) legacy answers; unmapped questions are NEUTRAL."""
+    core = np.asarray(core, dtype=np.float64).reshape(-1, len(CORE_QUESTIONS))
+    legacy = core[:, np.maximum(_CORE_INDEX, 0)]
+    legacy[:, _CORE_INDEX < 0] = NEUTRAL
+    return legacy
+
+
+class GiftInferenceService:
+    def __init__(self, model_factory: Callable[[], object], max_batch: int = DEFAULT_MAX_BATCH,
+                 max_wait: float = DEFAULT_MAX_WAIT):
+        # Called per batch: a registry lookup, so an evicted model simply reloads
+        self._model_factory = model_factory
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.stats = ServiceStats()
+        self._pending: List[Tuple[np.ndarray, Future]] = []
+        self._cond = threading.Condition()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def classes(self) -> List[str]:
+        return [str(c) for c in self._model_factory().classes_]
+
+    # ---- interactive, micro-batched ----
+    def predict(self, answers: Sequence[float], timeout: Optional[float] = 10.0) -> GiftPrediction:
+        row = as_rows(answers)[0]
+        future: Future = Future()
+        with self._cond:
+            self._ensure_thread()
+            self._pending.append((row, future))
+            self._cond.notify()
+        probs = future.result(timeout)
+        classes = self.classes
+        order = np.argsort(-probs, kind="stable")  # ties go to the first class, as in argmax
+        return GiftPrediction(primary=classes[order[0]], secondary=classes[order[1]],
+                              probabilities={c: round(float(p), 4) for c, p in zip(classes, probs)})
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name="gift-batcher", daemon=True)
+            self._thread.start()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                # Give requests arriving together a moment to join this batch
+                deadline = time.monotonic() + self.max_wait
+                while len(self._pending) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: List[Tuple[np.ndarray, Future]]):
+        t0 = time.perf_counter()
+        try:
+            probs = self._model_factory().predict_proba(np.vstack([row for row, _ in batch]))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), p in zip(batch, probs):
+            future.set_result(p)
+        with self._lock:
+            self.stats.requests += len(batch)
+            self.stats.batches += 1
+            self.stats.largest_batch = max(self.stats.largest_batch, len(batch))
+            self.stats.infer_seconds += time.perf_counter() - t0
+
+    # ---- offline bulk ----
+    def predict_proba(self, rows, batch_size: int = BULK_BATCH) -> np.ndarray:
+        """Probabilities for an (n, 30) matrix, in slices of `batch_size` rows; bypasses the batcher."""
+        rows = as_rows(rows)
+        model = self._model_factory()
+        t0 = time.perf_counter()
+        out = np.vstack([model.predict_proba(rows[i:i + batch_size]) for i in range(0, len(rows), batch_size)]) \
+            if len(rows) else np.zeros((0, len(model.classes_)))
+        with self._lock:
+            self.stats.bulk_rows += len(rows)
+            self.stats.infer_seconds += time.perf_counter() - t0
+        return out
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            return {**asdict(self.stats), "mean_batch": round(self.stats.mean_batch, 2)}
+
+
+_service: Optional[GiftInferenceService] = None
+_service_lock = threading.Lock()
+
+
+def get_gift_service() -> GiftInferenceService:
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                from modules.model_registry import get_registry
+                _service = GiftInferenceService(lambda: get_registry().get("gift_model").model)
+    return _service
+
+
+# ---------------------------
+# ⚖️ Model vs deterministic engine
+# ---------------------------
+@dataclass
+class ComparisonReport:
+    assessments: int = 0
+    compared: int = 0
+    skipped: int = 0  # no usable 50-answer responses
+    agree_primary: int = 0
+    model_in_engine_top3: int = 0
+    model_gift_unmapped: int = 0  # model's pick has no engine counterpart (Prophecy)
+    seconds: float = 0.0
+    confusion: Counter = field(default_factory=Counter)  # (engine primary, model primary) -> count
+
+    @property
+    def agreement(self) -> Optional[float]:
+        return self.agree_primary / self.compared if self.compared else None
+
+    @property
+    def top3_rate(self) -> Optional[float]:
+        return self.model_in_engine_top3 / self.compared if self.compared else None
+
+
+def _core_responses(record: Dict) -> Optional[List[int]]:
+    responses = (record.get("answers") or {}).get("responses")
+    if not isinstance(responses, list) or len(responses) != len(CORE_QUESTIONS):
+        return None
+    try:
+        return [int(r) for r in responses]
+    except (TypeError, ValueError):
+        return None
+
+
+def compare_with_engine(records: Iterable[Dict], service: GiftInferenceService, chunk_size: int = BULK_BATCH,
+                        on_pair: Optional[Callable[[Dict, str, str], None]] = None) -> ComparisonReport:
+    """
+    Score stored assessments ({"answers": {"responses": [50 x 1..5]}, ...}) with
+    the engine and, after projection, the model; chunked so histories stream.
+    `on_pair(record, engine_primary, model_primary)` sees every compared record.
+    """
+    report = ComparisonReport()
+    classes = service.classes
+    t0 = time.perf_counter()
+    chunk: List[Tuple[Dict, List[int]]] = []
+
+    def flush():
+        if not chunk:
+            return
+        probs = service.predict_proba(project_core_answers([r for _, r in chunk]))
+        for (record, responses), p in zip(chunk, probs):
+            engine = score_gifts(responses)
+            model_gift = classes[int(np.argmax(p))]
+            mapped = MODEL_TO_ENGINE.get(model_gift)
+            report.compared += 1
+            report.confusion[(engine.primary, model_gift)] += 1
+            if mapped is None:
+                report.model_gift_unmapped += 1
+            else:
+                report.agree_primary += mapped == engine.primary
+                report.model_in_engine_top3 += mapped in [g for g, _ in engine.top3]
+            if on_pair:
+                on_pair(record, engine.primary, model_gift)
+        chunk.clear()
+
+    for record in records:
+        report.assessments += 1
+        responses = _core_responses(record)
+        if responses is None:
+            report.skipped += 1
+            continue
+        chunk.append((record, responses))
+        if len(chunk) >= chunk_size:
+            flush()
+    flush()
+    report.seconds = round(time.perf_counter() - t0, 3)
+    return report
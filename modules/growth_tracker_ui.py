@@ -1,16 +1,50 @@
+import tempfile
+
+import pandas as pd
 import streamlit as st
-from datetime import datetime
+from datetime import datetime, time, timedelta
 # Import the specific functions from db.py
-from modules.db import insert_journal_entry, fetch_journal_entries, delete_journal_entry, get_db_connection, run_schema_upgrades
-from transformers import pipeline
+from modules.db import insert_journal_entry, fetch_journal_entries, delete_journal_entry, get_db_connection, run_schema_upgrades, search_journal_entries
+from modules.db import fetch_journal_rollup_version, fetch_journal_streaks, fetch_journal_trends, fetch_rolling_sentiment
+from modules.model_registry import get_registry
+from modules.journal_embeddings import EmbeddingWorkerPool, RelatedEntriesIndex
+from modules.journal_io import MOODS, detect_format, export_journal, import_journal
+from modules.sentiment_worker import SentimentWorkerPool
+
+PENDING_REFRESH_SECONDS = 3
+SEARCH_PAGE_SIZE = 10
+SENTIMENT_FILTERS = {"Any": (None, None), "Positive": (0.0, None), "Negative": (None, 0.0)}
+TREND_DAYS = {"week": 365, "month": 730}
+ROLLING_DAYS = 90
+RELATED_K = 3
+EXPORT_SPOOL_BYTES = 8 * 1024 * 1024
+
+
+# Sentiment is scored off the save path by a background pool (one per process)
+@st.cache_resource
+def get_sentiment_pool():
+    return SentimentWorkerPool(lambda: get_registry().predictor("sentiment")).start()
 
 
-# Load sentiment model once
+# Entries are embedded in the background too; related-entry lookups use an in-memory index
 @st.cache_resource
-def load_sentiment_model():
-    return pipeline("sentiment-analysis", model="distilbert-base-uncased-finetuned-sst-2-english")
+def get_embedding_pool():
+    return EmbeddingWorkerPool(lambda: get_registry().predictor("embedding")).start()
+
+
+@st.cache_resource
+def get_related_index():
+    return RelatedEntriesIndex()
+
+
+def _sentiment_text(row):
+    status = row.get("sentiment_status")
+    if status in (None, "pending", "scoring"):
+        return "⏳ analysing…"
+    if status == "error" or row.get("sentiment") is None:
+        return "—"
+    return f"{row['sentiment_label']} ({row['sentiment']:+.2f})"
 
-sentiment_analyzer = load_sentiment_model()
 
 def growth_tracker_ui():
     st.subheader("🧘‍♂️ Spiritual Growth Tracker")
@@ -21,50 +55,224 @@ def growth_tracker_ui():
         st.warning("⚠️ Please log in or create your discipleship profile before continuing.")
         return # Important: return early if no user logged in
 
-    # No need to get conn/cursor here directly, as helper functions handle it
+    pool = get_sentiment_pool()
+    embedding_pool = get_embedding_pool()
 
     with st.form("journal_form", clear_on_submit=True):
         entry = st.text_area("📖 What’s on your heart today?", height=150)
         reflection = st.text_area("🔍 Reflection (optional)")
         goal = st.text_input("🎯 Faith Goal for the Week")
-        mood = st.selectbox("🙂 How do you feel today?", ["Joyful", "Hopeful", "Anxious", "Grateful", "Tired", "Determined", "Other"])
+        mood = st.selectbox("🙂 How do you feel today?", MOODS)
 
         submitted = st.form_submit_button("💾 Save Entry")
 
         if submitted:
             if entry.strip():
                 try:
-                    sentiment = sentiment_analyzer(entry)[0]['label']
-                    # Call the helper function from db.py
-                    insert_journal_entry(st.session_state.user_id, entry, reflection, goal, mood, sentiment)
+                    # Saved straight away; sentiment is filled in by the background pool
+                    insert_journal_entry(st.session_state.user_id, entry, reflection, goal, mood)
+                    pool.notify()
+                    embedding_pool.notify()
+                    st.session_state.journal_pending = 1
                     st.success("📝 Journal entry saved successfully!")
-                    st.rerun()
                 except Exception as e:
                     st.error(f"Error saving entry: {e}")
             else:
                 st.warning("Entry cannot be empty.")
 
+    journal_import_export(st.session_state.user_id, pool, embedding_pool)
+    journal_trends(st.session_state.user_id)
+    journal_search(st.session_state.user_id)
+    journal_entries_view(st.session_state.user_id)
+
+
+def journal_import_export(user_id, pool, embedding_pool):
+    with st.expander("📦 Import / Export"):
+        st.markdown("Import entries from another journal as **CSV** (header row with `entry_date`, `entry_text`, "
+                    "`reflection_text`, `faith_goal`, `mood`) or **JSONL** (one object per line with the same keys). "
+                    "Only `entry_text` is required; dates are `YYYY-MM-DD` or `YYYY-MM-DD HH:MM`.")
+        upload = st.file_uploader("Journal file", type=["csv", "jsonl", "ndjson", "json"], key="journal_import_file")
+        if upload is not None and st.button("📥 Import entries", key="journal_import_go"):
+            try:
+                with st.spinner("Importing…"):
+                    report = import_journal(user_id, upload, detect_format(upload.name))
+            except Exception as e:
+                st.error(f"Import failed, nothing was saved: {e}")
+            else:
+                if report.inserted:
+                    # Sentiment and embeddings for the new entries are batched by the background pools
+                    pool.notify()
+                    embedding_pool.notify()
+                    st.session_state.journal_pending = 1
+                st.success(f"Imported {report.inserted} of {report.rows} entries "
+                           f"({report.duplicates} already in your journal, {report.invalid} invalid).")
+                if report.errors:
+                    st.dataframe(pd.DataFrame(report.errors, columns=["line", "problem"]), hide_index=True)
+                    if report.invalid > len(report.errors):
+                        st.caption(f"Showing the first {len(report.errors)} problems.")
+
+        fmt = st.radio("Export format", ["csv", "jsonl"], format_func=str.upper, horizontal=True,
+                       key="journal_export_format")
+
+        # Runs only when the button is clicked; spills to disk past a few MB
+        def export_bytes():
+            with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES) as out:
+                export_journal(out, user_id=user_id, fmt=fmt)
+                out.seek(0)
+                return out.read()
+
+        st.download_button("📤 Download my journal", data=export_bytes, file_name=f"journal.{fmt}",
+                           mime="text/csv" if fmt == "csv" else "application/jsonl", key="journal_export")
+
+
+# Keyed by the user's rollup version, which a DB trigger bumps on every add, edit,
+# delete or background sentiment score — a stale version is simply never asked for again
+@st.cache_data(max_entries=256, show_spinner=False)
+def _journal_trends(user_id, version, period):
+    trends = pd.DataFrame([dict(r) for r in fetch_journal_trends(user_id, period, TREND_DAYS[period])])
+    rolling = pd.DataFrame([dict(r) for r in fetch_rolling_sentiment(user_id, ROLLING_DAYS)])
+    streaks = dict(fetch_journal_streaks(user_id) or {})
+    return trends, rolling, streaks
+
+
+def journal_trends(user_id):
+    st.markdown("---")
+    st.markdown("### 📊 Trends")
+    period = st.radio("Group by", ["week", "month"], format_func=str.title, horizontal=True, key="journal_trend_period")
+    try:
+        trends, rolling, streaks = _journal_trends(user_id, fetch_journal_rollup_version(user_id), period)
+    except Exception as e:
+        st.error(f"Could not load trends: {e}")
+        return
+    if trends.empty:
+        st.info("Trends appear once you have a few entries.")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("🔥 Current streak", f"{streaks.get('current', 0)} days")
+    col2.metric("🏆 Longest streak", f"{streaks.get('longest', 0)} days")
+    col3.metric(f"📝 Entries, latest {period}", int(trends["bucket_entries"].iloc[-1]))
+
+    per_bucket = trends.drop_duplicates("bucket").set_index("bucket")
+    st.markdown(f"**Average sentiment per {period}** (−1 negative … +1 positive)")
+    st.line_chart(per_bucket["avg_sentiment"].astype(float))
+
+    st.markdown(f"**Mood mix per {period}**")
+    st.bar_chart(trends.pivot_table(index="bucket", columns="mood", values="entries", aggfunc="sum", fill_value=0))
+
+    if not rolling.empty:
+        st.markdown(f"**Rolling sentiment, last {ROLLING_DAYS} days**")
+        st.line_chart(rolling.set_index("day")[["avg_7d", "avg_30d"]].astype(float)
+                      .rename(columns={"avg_7d": "7-day", "avg_30d": "30-day"}))
+
+
+def journal_search(user_id):
+    st.markdown("---")
+    st.markdown("### 🔎 Search Your Journal")
+    query = st.text_input("Search entries, reflections and goals", key="journal_search_query",
+                          placeholder='e.g. forgiveness, "daily bread", prayer -work')
+    with st.expander("Filters"):
+        col1, col2 = st.columns(2)
+        with col1:
+            moods = st.multiselect("Mood", MOODS, key="journal_search_moods")
+            sentiment = st.selectbox("Sentiment", list(SENTIMENT_FILTERS), key="journal_search_sentiment")
+        with col2:
+            dates = st.date_input("Date range", value=(), key="journal_search_dates")
+            order = st.radio("Sort by", ["Best match", "Newest"], horizontal=True, key="journal_search_order")
+
+    filters_set = bool(moods) or sentiment != "Any" or bool(dates)
+    if not query.strip() and not filters_set:
+        return
+
+    # A new search starts from the first page
+    signature = (query, tuple(moods), sentiment, tuple(dates), order)
+    if st.session_state.get("journal_search_signature") != signature:
+        st.session_state.journal_search_signature = signature
+        st.session_state.journal_search_page = 0
+    page = st.session_state.get("journal_search_page", 0)
+
+    date_from = datetime.combine(dates[0], time.min) if len(dates) >= 1 else None
+    # The end date is inclusive: search up to the start of the following day
+    date_to = datetime.combine(dates[1], time.min) + timedelta(days=1) if len(dates) == 2 else None
+    s_min, s_max = SENTIMENT_FILTERS[sentiment]
+    try:
+        result = search_journal_entries(
+            user_id, query, moods=moods, sentiment_min=s_min, sentiment_max=s_max,
+            date_from=date_from, date_to=date_to, order="rank" if order == "Best match" else "recent",
+            limit=SEARCH_PAGE_SIZE, offset=page * SEARCH_PAGE_SIZE,
+        )
+    except Exception as e:
+        st.error(f"Search failed: {e}")
+        return
+
+    total = result["total"]
+    if not total:
+        st.info("No entries match your search." if page == 0 else "No more results.")
+        if page:
+            if st.button("⬅️ Back to first page", key="journal_search_first"):
+                st.session_state.journal_search_page = 0
+                st.rerun()
+        return
+
+    pages = (total + SEARCH_PAGE_SIZE - 1) // SEARCH_PAGE_SIZE
+    st.caption(f"{total} matching entr{'y' if total == 1 else 'ies'} · page {page + 1} of {pages}")
+    for row in result["rows"]:
+        st.markdown(f"**{row['entry_date'].strftime('%Y-%m-%d')}** · {row['mood']} · {_sentiment_text(row)}")
+        st.markdown("> " + " ".join(row["snippet"].split()))
+
+    prev_col, next_col = st.columns(2)
+    with prev_col:
+        if page > 0 and st.button("⬅️ Previous", key="journal_search_prev"):
+            st.session_state.journal_search_page = page - 1
+            st.rerun()
+    with next_col:
+        if page + 1 < pages and st.button("Next ➡️", key="journal_search_next"):
+            st.session_state.journal_search_page = page + 1
+            st.rerun()
+
+
+def _related_entries(user_id, entry_id, latest=False):
+    try:
+        related = get_related_index().related_entries(user_id, entry_id, RELATED_K)
+    except Exception as e:
+        st.caption(f"Related entries unavailable: {e}")
+        return
+    if related is None:
+        st.caption("⏳ Finding related entries…")
+    elif not related and not latest:
+        st.caption("No related entries yet.")
+    for row in related or []:
+        text = " ".join(row["entry_text"].split())
+        st.markdown(f"- **{row['entry_date'].strftime('%Y-%m-%d')}** · {row['mood']} — "
+                    f"{text[:160]}{'…' if len(text) > 160 else ''}")
+
+
+def _journal_entries(user_id):
     st.markdown("---")
     st.markdown("### 📚 Your Past Journal Entries")
     # Call the helper function from db.py
-    journal_entries = fetch_journal_entries(st.session_state.user_id)
+    journal_entries = fetch_journal_entries(user_id)
 
     if not journal_entries:
         st.info("No journal entries found. Start writing today!")
     else:
-        # Ensure that the order of unpacking matches the SELECT query in fetch_journal_entries
-        # SELECT entry_text, reflection_text, faith_goal, mood, timestamp, sentiment, id
-        for i, (entry, reflection, goal, mood, timestamp, sentiment, entry_id) in enumerate(journal_entries, 1):
-            with st.expander(f"{i}. {timestamp.strftime('%Y-%m-%d %H:%M')} | Mood: {mood} | Sentiment: {sentiment}"): # Format timestamp
-                st.markdown(f"**Entry:** {entry}")
-                if reflection:
-                    st.markdown(f"**Reflection:** {reflection}")
-                if goal:
-                    st.markdown(f"**Goal:** {goal}")
+        st.markdown("#### 🔗 Related to your latest entry")
+        _related_entries(user_id, journal_entries[0]["id"], latest=True)
+        for i, row in enumerate(journal_entries, 1):
+            entry_id = row["id"]
+            with st.expander(f"{i}. {row['entry_date'].strftime('%Y-%m-%d %H:%M')} | Mood: {row['mood']} | Sentiment: {_sentiment_text(row)}"): # Format timestamp
+                st.markdown(f"**Entry:** {row['entry_text']}")
+                if row["reflection_text"]:
+                    st.markdown(f"**Reflection:** {row['reflection_text']}")
+                if row["faith_goal"]:
+                    st.markdown(f"**Goal:** {row['faith_goal']}")
+                if st.toggle("🔗 Related entries", key=f"related_{entry_id}"):
+                    _related_entries(user_id, entry_id)
                 # Delete button
                 if st.button("🗑 Delete", key=f"delete_{entry_id}"):
                     try:
                         delete_journal_entry(entry_id) # Call the helper function from db.py
+                        get_related_index().forget(user_id, entry_id)
                         st.success("Entry deleted.")
                         st.rerun()
                     except Exception as e:
@@ -76,9 +284,37 @@ def growth_tracker_ui():
     st.markdown("### 📈 Entry Summary")
     entry_count = len(journal_entries)
     sentiment_counts = {}
-    for _, _, _, _, _, sentiment, _ in journal_entries: # Unpack to get sentiment
-        sentiment_counts[sentiment] = sentiment_counts.get(sentiment, 0) + 1
+    pending = 0
+    for row in journal_entries:
+        if row.get("sentiment_status") == "done" and row.get("sentiment_label"):
+            sentiment_counts[row["sentiment_label"]] = sentiment_counts.get(row["sentiment_label"], 0) + 1
+        elif row.get("sentiment_status") != "error":
+            pending += 1
+            continue
+        if row.get("embedding_status") in ("pending", "scoring"):
+            pending += 1  # keep polling until related entries can be shown
 
     st.markdown(f"**Total Entries:** {entry_count}")
     for sentiment, count in sentiment_counts.items():
-        st.markdown(f"- {sentiment}: {count}")
\ No newline at end of file
+        st.markdown(f"- {sentiment}: {count}")
+    if pending:
+        st.caption(f"⏳ {pending} entr{'y' if pending == 1 else 'ies'} still being analysed")
+    return pending
+
+
+def journal_entries_view(user_id):
+    # While sentiment or embeddings are pending, only the entry list re-renders every few seconds
+    if st.session_state.get("journal_pending") and hasattr(st, "fragment"):
+        _polling_journal_entries(user_id)
+        return
+    st.session_state.journal_pending = _journal_entries(user_id)
+    if st.session_state.journal_pending and not hasattr(st, "fragment") and st.button("🔄 Refresh sentiment"):
+        st.rerun()
+
+
+if hasattr(st, "fragment"):
+    @st.fragment(run_every=PENDING_REFRESH_SECONDS)
+    def _polling_journal_entries(user_id):
+        if not _journal_entries(user_id):
+            st.session_state.journal_pending = 0
+            st.rerun()  # everything scored: switch back to the static view
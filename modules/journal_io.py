@@ -0,0 +1,211 @@
+# modules/journal_io.py
+"""
+Bulk journal import and export, as CSV or JSONL.
+
+Imports are parsed, validated and handed to Postgres COPY one row at a time
+(modules/db.py: copy_journal_entries_in), so memory stays flat however long
+the file is. Columns are entry_date (ISO date or timestamp, empty for now),
+entry_text (required), reflection_text, faith_goal and mood; a few common
+header spellings ("date", "entry", "reflection", "goal") are accepted. Bad
+rows are skipped and reported by line, rows already in the journal are
+skipped silently (undated rows match on text alone), and everything else is
+inserted in one transaction.
+Imported entries start 'pending' and are scored for sentiment in batches by
+the background worker pool, like entries written in the app.
+
+Exports stream COPY ... TO STDOUT straight into a file object.
+
+    from modules.journal_io import import_journal, export_journal
+    report = import_journal(user_id, open("old_journal.csv", "rb"), "csv")
+    with open("backup.jsonl", "wb") as out:
+        export_journal(out, user_id=None, fmt="jsonl")   # every user
+"""
+from __future__ import annotations
+
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from modules import db
+
+MOODS = ["Joyful", "Hopeful", "Anxious", "Grateful", "Tired", "Determined", "Other"]
+FORMATS = ("csv", "jsonl")
+MAX_TEXT_CHARS = 20000
+MAX_MOOD_CHARS = 50
+MAX_REPORTED_ERRORS = 50
+EARLIEST = datetime(1900, 1, 1)
+
+ALIASES = {
+    "date": "entry_date",
+    "timestamp": "entry_date",
+    "entry": "entry_text",
+    "text": "entry_text",
+    "reflection": "reflection_text",
+    "goal": "faith_goal",
+}
+_MOOD_LOOKUP = {m.lower(): m for m in MOODS}
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    valid: int = 0
+    inserted: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)  # (line, message), first MAX_REPORTED_ERRORS
+
+    @property
+    def invalid(self) -> int:
+        return self.rows - self.valid
+
+    @property
+    def duplicates(self) -> int:
+        return self.valid - self.inserted
+
+    def add_error(self, line: int, message: str):
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+def detect_format(filename: str) -> str:
+    return "jsonl" if filename.lower().endswith((".jsonl", ".ndjson", ".json")) else "csv"
+
+
+def _key(name) -> str:
+    key = str(name or "").strip().lower().replace(" ", "_")
+    return ALIASES.get(key, key)
+
+
+def _text(record: Dict, key: str, required: bool = False) -> Optional[str]:
+    value = record.get(key)
+    value = "" if value is None else str(value).replace("\x00", "").strip()
+    if not value:
+        if required:
+            raise ValueError(f"{key} is empty")
+        return None
+    if len(value) > MAX_TEXT_CHARS:
+        raise ValueError(f"{key} is longer than {MAX_TEXT_CHARS} characters")
+    return value
+
+
+def _date(value) -> Optional[datetime]:
+    value = "" if value is None else str(value).strip()
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"entry_date {value!r} is not an ISO date (YYYY-MM-DD[ HH:MM[:SS]])") from None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    if not EARLIEST <= parsed <= datetime.now() + timedelta(days=1):
+        raise ValueError(f"entry_date {value!r} is out of range")
+    return parsed
+
+
+def _mood(value) -> Optional[str]:
+    value = "" if value is None else str(value).strip()
+    if not value:
+        return None
+    if len(value) > MAX_MOOD_CHARS:
+        raise ValueError(f"mood is longer than {MAX_MOOD_CHARS} characters")
+    return _MOOD_LOOKUP.get(value.lower(), value)
+
+
+def clean_record(record: Dict) -> Tuple:
+    """One parsed row -> values in db.JOURNAL_IMPORT_COLUMNS order; ValueError says what is wrong."""
+    if not isinstance(record, dict):
+        raise ValueError("expected an object with entry_text")
+    record = {_key(k): v for k, v in record.items()}
+    entry_date = _date(record.get("entry_date"))
+    return (
+        entry_date.isoformat(sep=" ") if entry_date else None,
+        _text(record, "entry_text", required=True),
+        _text(record, "reflection_text"),
+        _text(record, "faith_goal"),
+        _mood(record.get("mood")),
+    )
+
+
+def read_records(binary_file: BinaryIO, fmt: str) -> Iterator[Tuple[int, object]]:
+    """(line number, parsed row) pairs; rows that do not parse come back as the ValueError."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown import format: {fmt}")
+    text = io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        if "entry_text" not in {_key(name) for name in reader.fieldnames or []}:
+            raise ValueError("The CSV header needs an entry_text (or entry/text) column")
+        return ((reader.line_num, row) for row in reader)
+    return _jsonl_records(text)
+
+
+def _jsonl_records(text) -> Iterator[Tuple[int, object]]:
+    for line_no, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except ValueError as e:
+            yield line_no, ValueError(f"invalid JSON ({e})")
+
+
+def csv_lines(records: Iterator[Tuple[int, object]], report: ImportReport) -> Iterator[str]:
+    """Valid rows as CSV lines for COPY; invalid ones only update `report`."""
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    for line_no, record in records:
+        report.rows += 1
+        try:
+            if isinstance(record, ValueError):
+                raise record
+            values = clean_record(record)
+        except ValueError as e:
+            report.add_error(line_no, str(e))
+            continue
+        report.valid += 1
+        buf.seek(0)
+        buf.truncate()
+        writer.writerow(values)
+        yield buf.getvalue()
+
+
+def import_records(user_id: str, records: Iterator[Tuple[int, object]]) -> ImportReport:
+    report = ImportReport()
+    report.inserted = db.copy_journal_entries_in(user_id, csv_lines(records, report))
+    return report
+
+
+def import_journal(user_id: str, binary_file: BinaryIO, fmt: str = "csv") -> ImportReport:
+    records = read_records(binary_file, fmt)  # header problems surface here, before the database
+    return import_records(user_id, records)
+
+
+def import_sqlite_growth_journal(path: str) -> Dict[str, ImportReport]:
+    """
+    Move the old SQLite app's growth_journal table (app/user_auth.py) into
+    journal_entries, one import per user. Safe to re-run: entries already
+    copied are skipped. Old sentiment values are dropped and re-scored.
+    """
+    import sqlite3
+    from itertools import groupby
+
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    try:
+        rows = conn.execute("SELECT rowid AS line, * FROM growth_journal ORDER BY user_id, rowid")
+        return {
+            str(user_id): import_records(str(user_id), ((r["line"], dict(r)) for r in user_rows))
+            for user_id, user_rows in groupby(rows, key=lambda r: r["user_id"])
+        }
+    finally:
+        conn.close()
+
+
+def export_journal(out, user_id: Optional[str] = None, fmt: str = "csv"):
+    """Write one user's entries (or, with user_id None, everyone's) to the file object `out`."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    db.copy_journal_entries_out(out, user_id=user_id, fmt=fmt)
@@ -0,0 +1,242 @@
+# modules/llm_client.py
+"""
+Shared, resilient LLM client.
+
+One LLMClient is meant to live for the whole process (the UI holds it with
+st.cache_resource). It wraps the OpenAI SDK with:
+  - a pooled httpx client, so HTTP connections are reused across reruns and sessions
+  - per-call connect/read timeouts
+  - retries with jittered exponential backoff (streams only retry before the first token)
+  - a process-wide concurrency limit shared by all sessions
+  - per-call metrics: time-to-first-token, total latency, prompt/completion tokens
+
+`base_url` can point at any OpenAI-compatible server (e.g. the local stub in
+scripts/stub_llm_server.py) for load tests.
+"""
+from __future__ import annotations
+
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterator, List, Optional
+
+import httpx
+import openai
+from openai import OpenAI
+
+from modules.chat_context import count_message_tokens, count_tokens
+
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_BASE = 0.5
+DEFAULT_BACKOFF_MAX = 8.0
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_QUEUE_TIMEOUT = 20.0
+METRICS_WINDOW = 500
+
+
+class LLMBusyError(RuntimeError):
+    """Raised when no concurrency slot frees up within the queue timeout."""
+
+
+@dataclass
+class CallMetrics:
+    model: str
+    stream: bool
+    started_at: float
+    ttft: Optional[float] = None
+    latency: Optional[float] = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    tokens_estimated: bool = False
+    attempts: int = 0
+    ok: bool = False
+    error: Optional[str] = None
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    idx = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return values[idx]
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if isinstance(exc, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code >= 500 or exc.status_code == 429
+    return isinstance(exc, (httpx.TimeoutException, httpx.TransportError))
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMClient:
+    def __init__(
+        self,
+        api_key: str,
+        base_url: Optional[str] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_base: float = DEFAULT_BACKOFF_BASE,
+        backoff_max: float = DEFAULT_BACKOFF_MAX,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        queue_timeout: float = DEFAULT_QUEUE_TIMEOUT,
+    ):
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.queue_timeout = queue_timeout
+        self._http = httpx.Client(
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=max_concurrency * 2,
+                max_keepalive_connections=max_concurrency,
+            ),
+        )
+        # Retries are handled here so they can be jittered and counted
+        self._client = OpenAI(api_key=api_key, base_url=base_url, http_client=self._http, max_retries=0)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._metrics = deque(maxlen=METRICS_WINDOW)
+        self._metrics_lock = threading.Lock()
+
+    # ---- internals ----
+    def _backoff(self, attempt: int, exc: Exception) -> float:
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        hinted = _retry_after(exc)
+        return max(delay, min(hinted, self.backoff_max)) if hinted else delay
+
+    def _acquire(self):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise LLMBusyError("BibleBot is busy right now. Please try again in a moment.")
+
+    def _record(self, m: CallMetrics):
+        with self._metrics_lock:
+            self._metrics.append(m)
+
+    def _create(self, m: CallMetrics, **kwargs):
+        """chat.completions.create with retries; returns the response (or the open stream)."""
+        attempt = 0
+        while True:
+            m.attempts = attempt + 1
+            try:
+                return self._client.chat.completions.create(**kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                time.sleep(self._backoff(attempt, e))
+                attempt += 1
+
+    # ---- public API ----
+    def complete(self, messages: List[dict], model: str, **kwargs):
+        """Non-streaming completion (used for summaries)."""
+        m = CallMetrics(model=model, stream=False, started_at=time.time())
+        self._acquire()
+        t0 = time.perf_counter()
+        try:
+            resp = self._create(m, model=model, messages=messages, **kwargs)
+            m.latency = m.ttft = time.perf_counter() - t0
+            usage = getattr(resp, "usage", None)
+            if usage is not None:
+                m.prompt_tokens, m.completion_tokens = usage.prompt_tokens, usage.completion_tokens
+            else:
+                m.tokens_estimated = True
+                m.prompt_tokens = count_message_tokens(messages, model)
+                m.completion_tokens = count_tokens(resp.choices[0].message.content or "", model)
+            m.ok = True
+            return resp
+        except Exception as e:
+            m.error = type(e).__name__
+            m.latency = time.perf_counter() - t0
+            raise
+        finally:
+            self._slots.release()
+            self._record(m)
+
+    def stream(self, messages: List[dict], model: str, **kwargs) -> Iterator:
+        """
+        Streaming completion. Yields ChatCompletionChunk objects.
+        The concurrency slot is held until the stream is exhausted or closed.
+        """
+        m = CallMetrics(model=model, stream=True, started_at=time.time())
+        self._acquire()
+        t0 = time.perf_counter()
+        parts = []
+        try:
+            try:
+                stream = self._create(
+                    m, model=model, messages=messages, stream=True,
+                    stream_options={"include_usage": True}, **kwargs
+                )
+            except openai.BadRequestError:
+                # Some OpenAI-compatible servers reject stream_options
+                stream = self._create(m, model=model, messages=messages, stream=True, **kwargs)
+
+            try:
+                for chunk in stream:
+                    usage = getattr(chunk, "usage", None)
+                    if usage is not None:
+                        m.prompt_tokens, m.completion_tokens = usage.prompt_tokens, usage.completion_tokens
+                    if chunk.choices:
+                        text = chunk.choices[0].delta.content or ""
+                        if text:
+                            if m.ttft is None:
+                                m.ttft = time.perf_counter() - t0
+                            parts.append(text)
+                    yield chunk
+            finally:
+                # Hand the connection back to the pool even if the reader stops early
+                stream.close()
+            m.ok = True
+        except GeneratorExit:
+            m.error = "cancelled"
+            raise
+        except Exception as e:
+            m.error = type(e).__name__
+            raise
+        finally:
+            m.latency = time.perf_counter() - t0
+            if not m.prompt_tokens and not m.completion_tokens:
+                m.tokens_estimated = True
+                m.prompt_tokens = count_message_tokens(messages, model)
+                m.completion_tokens = count_tokens("".join(parts), model)
+            self._slots.release()
+            self._record(m)
+
+    def recent_calls(self, limit: int = 50) -> List[Dict]:
+        with self._metrics_lock:
+            return [asdict(m) for m in list(self._metrics)[-limit:]]
+
+    def metrics_summary(self) -> Dict[str, Optional[float]]:
+        with self._metrics_lock:
+            calls = list(self._metrics)
+        ttfts = [m.ttft for m in calls if m.ttft is not None]
+        latencies = [m.latency for m in calls if m.latency is not None]
+        return {
+            "calls": len(calls),
+            "errors": sum(1 for m in calls if not m.ok),
+            "retries": sum(max(0, m.attempts - 1) for m in calls),
+            "ttft_p50": _percentile(ttfts, 50),
+            "ttft_p95": _percentile(ttfts, 95),
+            "latency_p50": _percentile(latencies, 50),
+            "latency_p95": _percentile(latencies, 95),
+            "prompt_tokens": sum(m.prompt_tokens for m in calls),
+            "completion_tokens": sum(m.completion_tokens for m in calls),
+        }
+
+    def close(self):
+        self._http.close()
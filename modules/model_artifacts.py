@@ -0,0 +1,483 @@
+# modules/model_artifacts.py
+"""
+Pickle-free, memory-mappable artifacts for the bundled scikit-learn models.
+
+Each model is a directory under models/artifacts/<name>/ holding:
+  manifest.json   kind, params, classes, feature names, scikit-learn version
+                  at export, hashes of the source pickle and training data,
+                  and a SHA-256 per array file
+  *.npy           weights, opened with np.load(mmap_mode="r") so every process
+                  shares one copy through the OS page cache
+  vocab.bin       TF-IDF vocabulary as sorted UTF-8 terms, indexed by
+                  vocab_offsets.npy / vocab_columns.npy (binary search);
+                  hashing vectorizers need no vocabulary, only their params
+
+The Mapped* classes reimplement just the inference the app uses
+(transform / predict / predict_proba) with NumPy, so loading needs neither
+pickle nor a matching scikit-learn. `load_artifact()` caches each model by
+its manifest's mtime: it loads once per process and reloads after re-export.
+`export_artifact()` builds a model in a staging directory and swaps it into
+place, so readers never see a half-written export and processes that still
+map the old files keep working.
+
+    python scripts/export_model_artifacts.py     # (re)build from models/*.pkl
+"""
+from __future__ import annotations
+
+import bisect
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+ARTIFACTS_DIR = os.path.join(REPO_ROOT, "models", "artifacts")
+FORMAT = "tukuza-model/1"
+MANIFEST = "manifest.json"
+
+
+def sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# ---------------------------
+# 📤 Export (needs scikit-learn)
+# ---------------------------
+def _write_arrays(out_dir: str, arrays: Dict[str, np.ndarray]) -> Dict[str, Dict]:
+    entries = {}
+    for key, arr in arrays.items():
+        path = os.path.join(out_dir, f"{key}.npy")
+        np.save(path, np.ascontiguousarray(arr))
+        entries[key] = {"file": f"{key}.npy", "dtype": str(arr.dtype), "shape": list(arr.shape),
+                        "sha256": sha256_file(path)}
+    return entries
+
+
+def _write_manifest(out_dir: str, kind: str, model, arrays: Dict[str, Dict], params: Dict,
+                    training_data: Optional[str] = None, extra: Optional[Dict] = None):
+    import sklearn
+
+    manifest = {
+        "format": FORMAT,
+        "kind": kind,
+        "sklearn_version": sklearn.__version__,
+        "exported_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "params": params,
+        "classes": [str(c) for c in getattr(model, "classes_", [])],
+        "feature_names": [str(f) for f in getattr(model, "feature_names_in_", [])],
+        "training_data": os.path.relpath(training_data, REPO_ROOT) if training_data else None,
+        "training_data_sha256": sha256_file(training_data) if training_data else None,
+        "arrays": arrays,
+    }
+    manifest.update(extra or {})
+    tmp = os.path.join(out_dir, MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    # The manifest is written last, so a half-written export is never picked up
+    os.replace(tmp, os.path.join(out_dir, MANIFEST))
+    return manifest
+
+
+def _text_params(vectorizer, keys: Sequence[str]) -> Dict:
+    all_params = vectorizer.get_params()
+    params = {k: v for k, v in all_params.items()
+              if k in ("lowercase", "token_pattern", "ngram_range", "norm", "binary", "analyzer",
+                       "strip_accents", *keys)}
+    if params["analyzer"] != "word" or all_params.get("tokenizer") or all_params.get("preprocessor") \
+            or params["strip_accents"]:
+        raise ValueError("Only word analyzers with the default tokenizer can be exported")
+    params["ngram_range"] = list(params["ngram_range"])
+    params["stop_words"] = sorted(vectorizer.get_stop_words() or [])
+    return params
+
+
+def export_tfidf(vectorizer, out_dir: str, training_data: Optional[str] = None) -> Dict:
+    params = _text_params(vectorizer, ("use_idf", "smooth_idf", "sublinear_tf"))
+    os.makedirs(out_dir, exist_ok=True)
+    terms = sorted(vectorizer.vocabulary_)
+    encoded = [t.encode("utf-8") for t in terms]
+    with open(os.path.join(out_dir, "vocab.bin"), "wb") as f:
+        f.write(b"".join(encoded))
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    arrays = {
+        "vocab_offsets": offsets,
+        "vocab_columns": np.array([vectorizer.vocabulary_[t] for t in terms], dtype=np.int32),
+    }
+    if params["use_idf"]:
+        arrays["idf"] = np.asarray(vectorizer.idf_, dtype=np.float64)
+    entries = _write_arrays(out_dir, arrays)
+    entries["vocab"] = {"file": "vocab.bin", "dtype": "utf-8", "shape": [len(terms)],
+                        "sha256": sha256_file(os.path.join(out_dir, "vocab.bin"))}
+    return _write_manifest(out_dir, "tfidf", vectorizer, entries, params, training_data,
+                           {"n_features": len(terms)})
+
+
+def export_hashing(vectorizer, out_dir: str, training_data: Optional[str] = None) -> Dict:
+    """Stateless: the params are the whole model."""
+    params = _text_params(vectorizer, ("n_features", "alternate_sign"))
+    os.makedirs(out_dir, exist_ok=True)
+    return _write_manifest(out_dir, "hashing", vectorizer, {}, params, training_data,
+                           {"n_features": int(params["n_features"])})
+
+
+def export_logreg(model, out_dir: str, training_data: Optional[str] = None) -> Dict:
+    """LogisticRegression (softmax) or a log-loss SGDClassifier (one-vs-rest, normalized)."""
+    if type(model).__name__ == "SGDClassifier":
+        if model.loss != "log_loss":
+            raise ValueError("Only log_loss SGDClassifiers have probabilities to export")
+        multi_class = "ovr"
+    else:
+        multi_class = "ovr" if getattr(model, "multi_class", None) == "ovr" else "multinomial"
+    os.makedirs(out_dir, exist_ok=True)
+    entries = _write_arrays(out_dir, {"coef": model.coef_.astype(np.float64),
+                                      "intercept": model.intercept_.astype(np.float64)})
+    return _write_manifest(out_dir, "logistic_regression", model, entries, {"multi_class": multi_class},
+                           training_data)
+
+
+def export_forest(model, out_dir: str, training_data: Optional[str] = None) -> Dict:
+    """All trees flattened into shared node arrays; child indices are global."""
+    if getattr(model, "n_outputs_", 1) != 1:
+        raise ValueError("Only single-output forests can be exported")
+    os.makedirs(out_dir, exist_ok=True)
+    left, right, feature, threshold, value, roots = [], [], [], [], [], []
+    offset = 0
+    for est in model.estimators_:
+        t = est.tree_
+        roots.append(offset)
+        leaf = t.children_left == -1
+        left.append(np.where(leaf, -1, t.children_left + offset))
+        right.append(np.where(leaf, -1, t.children_right + offset))
+        feature.append(t.feature)
+        threshold.append(t.threshold)
+        v = t.value[:, 0, :].astype(np.float64)
+        value.append(v / np.maximum(v.sum(axis=1, keepdims=True), 1e-12))
+        offset += t.node_count
+    entries = _write_arrays(out_dir, {
+        "left": np.concatenate(left).astype(np.int32),
+        "right": np.concatenate(right).astype(np.int32),
+        "feature": np.concatenate(feature).astype(np.int32),
+        "threshold": np.concatenate(threshold).astype(np.float64),
+        "value": np.concatenate(value),
+        "roots": np.array(roots, dtype=np.int64),
+    })
+    return _write_manifest(out_dir, "random_forest", model, entries,
+                           {"n_estimators": len(model.estimators_)}, training_data,
+                           {"n_features": int(model.n_features_in_), "n_nodes": offset})
+
+
+_EXPORTERS = {
+    "TfidfVectorizer": export_tfidf,
+    "HashingVectorizer": export_hashing,
+    "LogisticRegression": export_logreg,
+    "SGDClassifier": export_logreg,
+    "RandomForestClassifier": export_forest,
+}
+
+
+def export_model(model, out_dir: str, training_data: Optional[str] = None) -> Dict:
+    exporter = _EXPORTERS.get(type(model).__name__)
+    if exporter is None:
+        raise ValueError(f"No artifact exporter for {type(model).__name__}")
+    return exporter(model, out_dir, training_data)
+
+
+def export_artifact(name: str, model, training_data: Optional[str] = None, root: str = ARTIFACTS_DIR,
+                    source: Optional[str] = None) -> Dict:
+    """
+    Export into a staging directory, then swap it in for models/artifacts/<name>.
+    Old files are unlinked rather than overwritten, so live memory maps of them stay valid.
+    `source` is the pickle the model came from; its hash lets the registry tell a
+    stale export from a current one (git does not keep mtimes).
+    """
+    target = artifact_dir(name, root)
+    staging, retired = target + ".staging", target + ".old"
+    for leftover in (staging, retired):
+        shutil.rmtree(leftover, ignore_errors=True)
+    manifest = export_model(model, staging, training_data)
+    if source:
+        manifest.update(source=os.path.relpath(source, REPO_ROOT), source_sha256=sha256_file(source))
+        with open(os.path.join(staging, MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+    if os.path.exists(target):
+        os.replace(target, retired)
+    os.replace(staging, target)
+    shutil.rmtree(retired, ignore_errors=True)
+    return manifest
+
+
+# ---------------------------
+# 📥 Runtime (NumPy only)
+# ---------------------------
+class _Vocabulary:
+    """Sorted terms in one mmap'd blob; lookups are a binary search over the offsets."""
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray, columns: np.ndarray):
+        self._blob = blob
+        self._offsets = offsets
+        self._columns = columns
+
+    def __len__(self):
+        return len(self._columns)
+
+    def __getitem__(self, i: int) -> str:
+        return bytes(self._blob[self._offsets[i]:self._offsets[i + 1]]).decode("utf-8")
+
+    def get(self, term: str) -> Optional[int]:
+        i = bisect.bisect_left(self, term)
+        if i < len(self) and self[i] == term:
+            return int(self._columns[i])
+        return None
+
+
+class _Artifact:
+    def __init__(self, path: str, manifest: Dict, arrays: Dict[str, np.ndarray]):
+        self.path = path
+        self.manifest = manifest
+        self.arrays = arrays
+        self.classes_ = np.array(manifest.get("classes", []), dtype=object)
+        if manifest.get("feature_names"):
+            self.feature_names_in_ = np.array(manifest["feature_names"], dtype=object)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the mapped files (shared page cache, not per-process heap)."""
+        return int(sum(a.nbytes for a in self.arrays.values()))
+
+
+class _TextArtifact(_Artifact, ABC):
+    def __init__(self, path, manifest, arrays):
+        super().__init__(path, manifest, arrays)
+        p = manifest["params"]
+        self._token = re.compile(p["token_pattern"])
+        self._stop = frozenset(p.get("stop_words") or ())
+        self._ngrams = tuple(p["ngram_range"])
+        self.n_features = manifest["n_features"]
+
+    def _terms(self, text: str) -> List[str]:
+        p = self.manifest["params"]
+        if p["lowercase"]:
+            text = text.lower()
+        tokens = [t for t in self._token.findall(text) if t not in self._stop]
+        lo, hi = self._ngrams
+        terms = []
+        for n in range(lo, hi + 1):
+            terms += tokens if n == 1 else [" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1)]
+        return terms
+
+    @abstractmethod
+    def _counts(self, text: str) -> Dict[int, float]:
+        """Column -> raw term count for one text."""
+
+    def _weigh(self, v: np.ndarray, c: np.ndarray) -> np.ndarray:
+        return v
+
+    def transform(self, texts: Sequence[str]):
+        """Same matrix as the scikit-learn vectorizer's transform (scipy CSR)."""
+        from scipy.sparse import csr_matrix
+
+        p = self.manifest["params"]
+        rows, cols, vals = [], [], []
+        for r, text in enumerate(texts):
+            counts = self._counts(text)
+            if not counts:
+                continue
+            c = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+            v = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+            if p.get("binary"):
+                v = np.ones_like(v)
+            v = self._weigh(v, c)
+            if p["norm"] == "l2":
+                v = v / max(np.sqrt((v * v).sum()), 1e-12)
+            elif p["norm"] == "l1":
+                v = v / max(np.abs(v).sum(), 1e-12)
+            rows.append(np.full(len(c), r))
+            cols.append(c)
+            vals.append(v)
+        if rows:
+            data = (np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols)))
+        else:
+            data = (np.array([]), (np.array([], dtype=np.int64), np.array([], dtype=np.int64)))
+        return csr_matrix(data, shape=(len(texts), self.n_features))
+
+
+class MappedTfidf(_TextArtifact):
+    def __init__(self, path, manifest, arrays, blob):
+        super().__init__(path, manifest, arrays)
+        self.vocabulary = _Vocabulary(blob, arrays["vocab_offsets"], arrays["vocab_columns"])
+
+    @property
+    def nbytes(self) -> int:
+        return super().nbytes + int(self.vocabulary._blob.nbytes)
+
+    def _counts(self, text: str) -> Dict[int, float]:
+        counts: Dict[int, float] = {}
+        for term in self._terms(text):
+            col = self.vocabulary.get(term)
+            if col is not None:
+                counts[col] = counts.get(col, 0.0) + 1.0
+        return counts
+
+    def _weigh(self, v: np.ndarray, c: np.ndarray) -> np.ndarray:
+        if self.manifest["params"]["sublinear_tf"]:
+            v = np.log(v) + 1.0
+        idf = self.arrays.get("idf")
+        return v * idf[c] if idf is not None else v
+
+
+def murmurhash3_32(data: bytes, seed: int = 0) -> int:
+    """Signed MurmurHash3 (x86, 32-bit) — the hash behind scikit-learn's HashingVectorizer."""
+    c1, c2, mask = 0xCC9E2D51, 0x1B873593, 0xFFFFFFFF
+    h = seed & mask
+    body = len(data) - len(data) % 4
+    for i in range(0, body, 4):
+        k = (int.from_bytes(data[i:i + 4], "little") * c1) & mask
+        k = (((k << 15) | (k >> 17)) & mask) * c2 & mask
+        h ^= k
+        h = ((((h << 13) | (h >> 19)) & mask) * 5 + 0xE6546B64) & mask
+    tail = data[body:]
+    if tail:
+        k = int.from_bytes(tail, "little")
+        k = (k * c1) & mask
+        k = (((k << 15) | (k >> 17)) & mask) * c2 & mask
+        h ^= k
+    h ^= len(data)
+    h ^= h >> 16
+    h = (h * 0x85EBCA6B) & mask
+    h ^= h >> 13
+    h = (h * 0xC2B2AE35) & mask
+    h ^= h >> 16
+    return h - (1 << 32) if h & 0x80000000 else h
+
+
+class MappedHashing(_TextArtifact):
+    def _counts(self, text: str) -> Dict[int, float]:
+        n, signed = self.n_features, self.manifest["params"]["alternate_sign"]
+        counts: Dict[int, float] = {}
+        for term in self._terms(text):
+            h = murmurhash3_32(term.encode("utf-8"))
+            # scikit-learn maps INT32_MIN specially since abs() of it overflows in C
+            col = (2**31 - 1 - (n - 1)) % n if h == -2**31 else abs(h) % n
+            counts[col] = counts.get(col, 0.0) + (-1.0 if signed and h < 0 else 1.0)
+        return counts
+
+
+class MappedLogisticRegression(_Artifact):
+    def decision_function(self, X) -> np.ndarray:
+        return np.asarray(X @ self.arrays["coef"].T) + self.arrays["intercept"]
+
+    def predict_proba(self, X) -> np.ndarray:
+        scores = self.decision_function(X)
+        if scores.shape[1] == 1:  # binary
+            pos = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+            return np.column_stack([1.0 - pos, pos])
+        if self.manifest["params"].get("multi_class") == "ovr":
+            pos = 1.0 / (1.0 + np.exp(-scores))
+            return pos / pos.sum(axis=1, keepdims=True)
+        scores = scores - scores.max(axis=1, keepdims=True)
+        e = np.exp(scores)
+        return e / e.sum(axis=1, keepdims=True)
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+class MappedRandomForest(_Artifact):
+    @property
+    def n_features_in_(self) -> int:
+        return self.manifest["n_features"]
+
+    def _as_matrix(self, X) -> np.ndarray:
+        if hasattr(X, "columns") and hasattr(self, "feature_names_in_"):
+            X = X[list(self.feature_names_in_)]
+        X = np.asarray(X, dtype=np.float64)
+        return X.reshape(1, -1) if X.ndim == 1 else X
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Every row walks every tree together, one tree level per step."""
+        X = self._as_matrix(X)
+        a = self.arrays
+        left, right, feature, threshold = a["left"], a["right"], a["feature"], a["threshold"]
+        n_rows, roots = X.shape[0], a["roots"]
+        # Flat (row, tree) walkers; only those not yet at a leaf are advanced each step.
+        # Gathers use take() on flat arrays, which is markedly cheaper than 2-D fancy indexing.
+        flat_x = np.ascontiguousarray(X).ravel()
+        nodes = np.tile(np.asarray(roots), n_rows)
+        row_base = np.repeat(np.arange(n_rows) * X.shape[1], len(roots))
+        active = np.flatnonzero(left.take(nodes) != -1)
+        while active.size:
+            current = nodes[active]
+            go_left = flat_x.take(row_base.take(active) + feature.take(current)) <= threshold.take(current)
+            following = np.where(go_left, left.take(current), right.take(current))
+            nodes[active] = following
+            active = active[left.take(following) != -1]
+        return a["value"][nodes].reshape(n_rows, len(roots), -1).mean(axis=1)
+
+    def predict(self, X) -> np.ndarray:
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+_KINDS = {"hashing": MappedHashing, "logistic_regression": MappedLogisticRegression,
+          "random_forest": MappedRandomForest}
+_cache: Dict[str, Tuple[float, _Artifact]] = {}
+_cache_lock = threading.Lock()
+
+
+def artifact_dir(name: str, root: str = ARTIFACTS_DIR) -> str:
+    return os.path.join(root, name)
+
+
+def has_artifact(name: str, root: str = ARTIFACTS_DIR) -> bool:
+    return os.path.exists(os.path.join(artifact_dir(name, root), MANIFEST))
+
+
+def exported_from(name: str, source: str, root: str = ARTIFACTS_DIR) -> bool:
+    """Whether the artifact was exported from `source` as it is now (same SHA-256)."""
+    with open(os.path.join(artifact_dir(name, root), MANIFEST), encoding="utf-8") as f:
+        recorded = json.load(f).get("source_sha256")
+    return recorded is not None and recorded == sha256_file(source)
+
+
+def _open(path: str, verify: bool = False) -> _Artifact:
+    with open(os.path.join(path, MANIFEST), encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT:
+        raise ValueError(f"{path}: unsupported artifact format {manifest.get('format')!r}")
+    if verify:
+        bad = [k for k, e in manifest["arrays"].items() if sha256_file(os.path.join(path, e["file"])) != e["sha256"]]
+        if bad:
+            raise ValueError(f"{path}: checksum mismatch for {', '.join(bad)}")
+    arrays = {k: np.load(os.path.join(path, e["file"]), mmap_mode="r")
+              for k, e in manifest["arrays"].items() if e["file"].endswith(".npy")}
+    if manifest["kind"] == "tfidf":
+        blob = np.memmap(os.path.join(path, "vocab.bin"), dtype=np.uint8, mode="r") \
+            if os.path.getsize(os.path.join(path, "vocab.bin")) else np.zeros(0, dtype=np.uint8)
+        return MappedTfidf(path, manifest, arrays, blob)
+    return _KINDS[manifest["kind"]](path, manifest, arrays)
+
+
+def load_artifact(name: str, root: str = ARTIFACTS_DIR, verify: bool = False) -> _Artifact:
+    """Load once per process; reloaded only when the manifest's mtime changes (re-export)."""
+    path = artifact_dir(name, root)
+    mtime = os.path.getmtime(os.path.join(path, MANIFEST))
+    cached = _cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with _cache_lock:
+        cached = _cache.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, _open(path, verify))
+            _cache[path] = cached
+    return cached[1]
@@ -0,0 +1,146 @@
+# modules/model_cache.py
+"""
+Pinned local cache for the Hugging Face models in the model registry.
+
+scripts/warmup_models.py downloads every registry model into CACHE_DIR at
+build time and writes a manifest recording, per model, the exact hub commit
+that was fetched and a SHA-256 for every file. Later warmups reuse the pinned
+commit unless asked to refresh, so every container serves the same weights.
+
+At runtime the registry loads from the snapshot in the manifest whenever it
+is present. With MODEL_OFFLINE=1 the hub is never contacted: HF_HUB_OFFLINE
+and TRANSFORMERS_OFFLINE are set before transformers is imported, and a
+model missing from the cache is an error rather than a download.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CACHE_DIR = os.getenv("MODEL_CACHE_DIR", os.path.join(REPO_ROOT, "models", "hf_cache"))
+MANIFEST_FILE = "manifest.json"
+# Config, tokenizer and safetensors weights are all a pipeline needs
+ALLOW_PATTERNS = ["*.json", "*.txt", "*.model", "*.safetensors"]
+FALLBACK_WEIGHTS = ["pytorch_model.bin"]
+
+_manifest_lock = threading.Lock()
+
+
+class ModelCacheError(RuntimeError):
+    """A model is missing from the offline cache or its files fail verification."""
+
+
+def offline_mode() -> bool:
+    return os.getenv("MODEL_OFFLINE", "").lower() in ("1", "true", "yes")
+
+
+def prepare_environment():
+    """Call before importing transformers/huggingface_hub so offline mode takes effect."""
+    if offline_mode():
+        os.environ["HF_HUB_OFFLINE"] = "1"
+        os.environ["TRANSFORMERS_OFFLINE"] = "1"
+
+
+def manifest_path(cache_dir: str = CACHE_DIR) -> str:
+    return os.path.join(cache_dir, MANIFEST_FILE)
+
+
+def load_manifest(cache_dir: str = CACHE_DIR) -> Dict:
+    try:
+        with open(manifest_path(cache_dir), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(manifest: Dict, cache_dir: str = CACHE_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = manifest_path(cache_dir) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, manifest_path(cache_dir))
+
+
+def sha256_file(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _checksums(snapshot: str) -> Dict[str, str]:
+    sums = {}
+    for root, _, files in os.walk(snapshot):
+        for name in files:
+            full = os.path.join(root, name)
+            sums[os.path.relpath(full, snapshot)] = sha256_file(full)
+    return sums
+
+
+def pinned_revision(name: str, default: Optional[str] = None, cache_dir: str = CACHE_DIR) -> Optional[str]:
+    """MODEL_REVISION_<NAME> overrides; otherwise the commit recorded by the last warmup."""
+    return (os.getenv(f"MODEL_REVISION_{name.upper()}")
+            or load_manifest(cache_dir).get(name, {}).get("revision")
+            or default)
+
+
+def fetch(name: str, model_id: str, revision: Optional[str] = None, cache_dir: str = CACHE_DIR) -> Dict:
+    """Download (or reuse) a snapshot of `model_id`, checksum it and record it in the manifest."""
+    from huggingface_hub import snapshot_download
+
+    if offline_mode():
+        raise ModelCacheError("MODEL_OFFLINE is set; warmup needs network access to fetch models")
+    t0 = time.perf_counter()
+    snapshot = snapshot_download(model_id, revision=revision, cache_dir=cache_dir, allow_patterns=ALLOW_PATTERNS)
+    if not any(f.endswith(".safetensors") for f in os.listdir(snapshot)):
+        snapshot = snapshot_download(model_id, revision=revision, cache_dir=cache_dir,
+                                     allow_patterns=ALLOW_PATTERNS + FALLBACK_WEIGHTS)
+    entry = {
+        "model_id": model_id,
+        # snapshots/<commit sha> — the resolved commit, even when `revision` was a branch
+        "revision": os.path.basename(os.path.normpath(snapshot)),
+        "snapshot": os.path.relpath(snapshot, cache_dir),
+        "files": _checksums(snapshot),
+        "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "fetch_seconds": round(time.perf_counter() - t0, 2),
+    }
+    with _manifest_lock:
+        manifest = load_manifest(cache_dir)
+        manifest[name] = entry
+        _save_manifest(manifest, cache_dir)
+    return entry
+
+
+def verify(name: str, cache_dir: str = CACHE_DIR) -> List[str]:
+    """Problems with the cached copy of `name`; an empty list means every checksum matches."""
+    entry = load_manifest(cache_dir).get(name)
+    if entry is None:
+        return [f"{name}: not in {manifest_path(cache_dir)}"]
+    snapshot = os.path.join(cache_dir, entry["snapshot"])
+    problems = []
+    for rel, expected in entry["files"].items():
+        path = os.path.join(snapshot, rel)
+        if not os.path.exists(path):
+            problems.append(f"{name}: missing {rel}")
+        elif sha256_file(path) != expected:
+            problems.append(f"{name}: checksum mismatch for {rel}")
+    return problems
+
+
+def local_path(name: str, cache_dir: str = CACHE_DIR) -> Optional[str]:
+    """Snapshot directory for `name`, or None if it was never warmed. Raises in offline mode."""
+    entry = load_manifest(cache_dir).get(name)
+    path = os.path.join(cache_dir, entry["snapshot"]) if entry else None
+    if path and os.path.isdir(path):
+        return path
+    if offline_mode():
+        raise ModelCacheError(
+            f"Model '{name}' is not in the offline cache ({cache_dir}). Run scripts/warmup_models.py first."
+        )
+    return None
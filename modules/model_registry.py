@@ -0,0 +1,356 @@
+# modules/model_registry.py
+"""
+Process-wide registry for Hugging Face pipelines.
+
+Each named model is loaded at most once per process, even when several
+Streamlit sessions ask for it at the same time, and inference on a shared
+pipeline is serialized with a per-model lock (pipelines are not safe to call
+from several threads at once). The registry records how long each load took
+and roughly how much memory the model holds.
+
+Each model runs on the PyTorch backend unless config selects the quantized
+ONNX export (see modules/onnx_backend.py). The scikit-learn models load from
+their memory-mapped .npy exports (modules/model_artifacts.py) when present.
+
+Nothing heavy is imported until a model is first requested: `transformers`
+and `torch` load inside the loader. `heavy_modules_loaded()` backs the
+import-time budget check in scripts/test_import.py.
+
+With MODEL_MEMORY_BUDGET_MB set, the registry also keeps the models it holds
+within that budget: before and after each load it evicts the least recently
+used models of the lowest priority (they reload on next use). Each model's
+priority is declared in MODEL_SPECS; models at PINNED priority are never
+evicted.
+
+    from modules.model_registry import get_registry
+    result = get_registry().run("zero_shot", verse, candidate_labels=labels)
+"""
+from __future__ import annotations
+
+import gc
+import os
+import pickle
+import sys
+import threading
+import time
+import warnings
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Libraries that must not be imported until a tool that needs them is opened
+HEAVY_MODULES = ("torch", "transformers", "sentence_transformers", "onnxruntime", "optimum")
+
+
+def heavy_modules_loaded() -> List[str]:
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+
+PINNED = 100
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    task: str
+    model_id: str  # hub id for "hf" models, path under the repo for "joblib" models
+    kind: str = "hf"
+    priority: int = 0  # higher stays loaded longer; PINNED is never evicted
+    size_hint_mb: Optional[float] = None  # used to make room before the first load
+
+
+MODEL_SPECS: Dict[str, ModelSpec] = {
+    # Journal sentiment runs on every save: keep it warm
+    "sentiment": ModelSpec("sentiment-analysis", "distilbert-base-uncased-finetuned-sst-2-english",
+                           priority=10, size_hint_mb=260),
+    # Journal "related entries": a small sentence encoder, run in the background on save
+    "embedding": ModelSpec("feature-extraction", "sentence-transformers/all-MiniLM-L6-v2",
+                           priority=5, size_hint_mb=90),
+    # Only the cascade's uncertain verses reach zero-shot
+    "zero_shot": ModelSpec("zero-shot-classification", "facebook/bart-large-mnli",
+                           priority=0, size_hint_mb=1600),
+    "gift_model": ModelSpec("gift-classification", "models/gift_model.pkl", kind="joblib",
+                            priority=5, size_hint_mb=10),
+    "verse_vectorizer": ModelSpec("tfidf", "models/vectorizer.pkl", kind="joblib", priority=PINNED),
+    "verse_model": ModelSpec("tfidf-logreg", "models/model.pkl", kind="joblib", priority=PINNED),
+}
+
+
+def hf_specs(specs: Optional[Dict[str, ModelSpec]] = None) -> Dict[str, ModelSpec]:
+    """The Hugging Face models (what warmup and ONNX export work on)."""
+    return {name: spec for name, spec in (specs or MODEL_SPECS).items() if spec.kind == "hf"}
+
+
+@dataclass
+class LoadedModel:
+    name: str
+    spec: ModelSpec
+    model: Any
+    backend: str
+    load_seconds: float
+    param_bytes: Optional[int]
+    rss_delta_bytes: Optional[int]
+    loaded_at: float = field(default_factory=time.time)
+    last_used: float = field(default_factory=time.monotonic)
+    calls: int = 0
+    infer_seconds: float = 0.0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def memory_bytes(self) -> int:
+        """Best available estimate of what this model keeps resident."""
+        if self.param_bytes:
+            return self.param_bytes
+        # RSS deltas also count first-time library imports, so prefer the hint when there is one
+        if self.spec.size_hint_mb:
+            return int(self.spec.size_hint_mb * 2**20)
+        return max(self.rss_delta_bytes or 0, 0)
+
+
+@dataclass
+class RegistryStats:
+    hits: int = 0
+    misses: int = 0
+    loads: int = 0
+    evictions: int = 0
+    load_seconds: float = 0.0
+
+
+def _rss_bytes() -> Optional[int]:
+    """Resident set size of this process (Linux /proc); None where unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _param_bytes(pipe: Any) -> Optional[int]:
+    """Bytes held by the model's weights and buffers (torch), its mapped arrays, or its pickled size (scikit-learn)."""
+    if isinstance(getattr(pipe, "arrays", None), dict):  # memory-mapped artifact
+        return pipe.nbytes
+    model = getattr(pipe, "model", None)
+    if model is None or not hasattr(model, "parameters"):
+        if hasattr(pipe, "get_params"):
+            try:
+                return len(pickle.dumps(pipe, protocol=pickle.HIGHEST_PROTOCOL))
+            except Exception:
+                return None
+        return None
+    try:
+        total = sum(p.numel() * p.element_size() for p in model.parameters())
+        total += sum(b.numel() * b.element_size() for b in model.buffers())
+        return int(total)
+    except Exception:
+        return None
+
+
+def load_pipeline(name: str, spec: ModelSpec, backend: str = "torch"):
+    """
+    Build the pipeline for `name` on the requested backend; returns (pipeline, backend used).
+    Weights come from the pinned local cache when warmed (required in offline mode).
+    """
+    from modules.model_cache import local_path, prepare_environment
+    prepare_environment()
+    if backend == "onnx":
+        from modules.onnx_backend import has_onnx, load_onnx_pipeline
+        if has_onnx(name):
+            return load_onnx_pipeline(name, spec), "onnx"
+        warnings.warn(f"No ONNX export for '{name}'; run scripts/export_onnx.py. Using torch.")
+    from transformers import pipeline
+    return pipeline(spec.task, model=local_path(name) or spec.model_id), "torch"
+
+
+def load_sklearn(name: str, spec: ModelSpec):
+    """
+    The memory-mapped .npy export (modules/model_artifacts.py) when it was
+    exported from the pickle as it is now (by hash); the pickle via joblib otherwise.
+    """
+    from modules.model_artifacts import exported_from, has_artifact, load_artifact
+    pickle_path = os.path.join(REPO_ROOT, spec.model_id)
+    if has_artifact(name):
+        if not os.path.exists(pickle_path) or exported_from(name, pickle_path):
+            return load_artifact(name), "mmap"
+        warnings.warn(f"'{name}' artifact was not exported from the current {spec.model_id}; "
+                      "run scripts/export_model_artifacts.py. Using joblib.")
+    import joblib
+    return joblib.load(pickle_path), "joblib"
+
+
+def _default_loader(name: str, spec: ModelSpec):
+    if spec.kind == "joblib":
+        return load_sklearn(name, spec)
+    from modules.onnx_backend import backend_for
+    return load_pipeline(name, spec, backend_for(name))
+
+
+def budget_from_env() -> Optional[int]:
+    value = os.getenv("MODEL_MEMORY_BUDGET_MB")
+    return int(float(value) * 2**20) if value else None
+
+
+class ModelRegistry:
+    def __init__(self, specs: Optional[Dict[str, ModelSpec]] = None,
+                 loader: Callable[[str, ModelSpec], Tuple[Any, str]] = _default_loader,
+                 budget_bytes: Optional[int] = None):
+        self.specs = dict(specs or MODEL_SPECS)
+        self.budget_bytes = budget_bytes
+        self._loader = loader
+        self._models: Dict[str, LoadedModel] = {}
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._known_sizes: Dict[str, int] = {}  # measured sizes survive eviction
+        self._evictions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.totals = RegistryStats()
+
+    # ---- memory budget ----
+    def used_bytes(self) -> int:
+        return sum(m.memory_bytes for m in list(self._models.values()))
+
+    def _expected_bytes(self, name: str) -> int:
+        if name in self._known_sizes:
+            return self._known_sizes[name]
+        return int((self.specs[name].size_hint_mb or 0) * 2**20)
+
+    def _make_room(self, needed: int, keep: str):
+        """Evict lowest-priority, least-recently-used models until `needed` more bytes fit."""
+        if self.budget_bytes is None:
+            return
+        evicted = False
+        with self._lock:
+            while self.used_bytes() + needed > self.budget_bytes:
+                candidates = [m for n, m in self._models.items()
+                              if n != keep and self.specs[n].priority < PINNED]
+                if not candidates:
+                    break
+                victim = min(candidates, key=lambda m: (self.specs[m.name].priority, m.last_used))
+                # Calls already running keep their reference; memory is freed once they finish
+                del self._models[victim.name]
+                self._evictions[victim.name] = self._evictions.get(victim.name, 0) + 1
+                self.totals.evictions += 1
+                evicted = True
+        if evicted:
+            gc.collect()
+
+    def evict(self, name: str) -> bool:
+        with self._lock:
+            if self._models.pop(name, None) is None:
+                return False
+            self._evictions[name] = self._evictions.get(name, 0) + 1
+            self.totals.evictions += 1
+        gc.collect()
+        return True
+
+    # ---- loading ----
+    def get(self, name: str) -> LoadedModel:
+        """Load `name` on first use (or after eviction); concurrent callers wait for the same load."""
+        model = self._models.get(name)
+        if model is not None:
+            model.last_used = time.monotonic()
+            with self._lock:
+                self.totals.hits += 1
+            return model
+        if name not in self.specs:
+            raise KeyError(f"Unknown model '{name}'. Known: {', '.join(sorted(self.specs))}")
+        with self._lock:
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+        with load_lock:
+            model = self._models.get(name)
+            if model is not None:
+                with self._lock:
+                    self.totals.hits += 1
+                return model
+            with self._lock:
+                self.totals.misses += 1
+            self._make_room(self._expected_bytes(name), keep=name)
+
+            spec = self.specs[name]
+            rss_before = _rss_bytes()
+            t0 = time.perf_counter()
+            obj, backend = self._loader(name, spec)
+            load_seconds = time.perf_counter() - t0
+            rss_after = _rss_bytes()
+            model = LoadedModel(
+                name=name,
+                spec=spec,
+                model=obj,
+                backend=backend,
+                load_seconds=load_seconds,
+                param_bytes=_param_bytes(obj),
+                rss_delta_bytes=(rss_after - rss_before) if rss_before is not None and rss_after is not None else None,
+            )
+            with self._lock:
+                self._models[name] = model
+                self._known_sizes[name] = model.memory_bytes
+                self.totals.loads += 1
+                self.totals.load_seconds += load_seconds
+            # The measured size may be larger than the estimate
+            self._make_room(0, keep=name)
+        return model
+
+    def run(self, name: str, *args, **kwargs):
+        """Call the shared pipeline; one inference per model at a time."""
+        model = self.get(name)
+        with model.lock:
+            t0 = time.perf_counter()
+            try:
+                return model.model(*args, **kwargs)
+            finally:
+                model.infer_seconds += time.perf_counter() - t0
+                model.calls += 1
+
+    def predictor(self, name: str) -> Callable:
+        """A callable with the pipeline's signature that goes through `run` (reloading after eviction)."""
+        self.get(name)
+        return lambda *args, **kwargs: self.run(name, *args, **kwargs)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    # ---- reporting ----
+    def stats(self) -> List[Dict]:
+        rows = []
+        for model in list(self._models.values()):
+            rows.append({
+                "name": model.name,
+                "task": model.spec.task,
+                "model_id": model.spec.model_id,
+                "backend": model.backend,
+                "priority": self.specs[model.name].priority,
+                "load_seconds": round(model.load_seconds, 3),
+                "memory_mb": round(model.memory_bytes / 2**20, 1),
+                "param_mb": round(model.param_bytes / 2**20, 1) if model.param_bytes is not None else None,
+                "rss_delta_mb": round(model.rss_delta_bytes / 2**20, 1) if model.rss_delta_bytes is not None else None,
+                "calls": model.calls,
+                "avg_infer_ms": round(model.infer_seconds / model.calls * 1000, 1) if model.calls else None,
+                "evictions": self._evictions.get(model.name, 0),
+            })
+        return rows
+
+    def summary(self) -> Dict:
+        with self._lock:
+            t = self.totals
+            return {
+                "budget_mb": round(self.budget_bytes / 2**20, 1) if self.budget_bytes is not None else None,
+                "used_mb": round(self.used_bytes() / 2**20, 1),
+                "loaded": sorted(self._models),
+                "hits": t.hits,
+                "misses": t.misses,
+                "loads": t.loads,
+                "evictions": t.evictions,
+                "load_seconds": round(t.load_seconds, 2),
+            }
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> ModelRegistry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry(budget_bytes=budget_from_env())
+    return _registry
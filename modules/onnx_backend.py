@@ -0,0 +1,117 @@
+# modules/onnx_backend.py
+"""
+Quantized ONNX backend for the Hugging Face pipelines in the model registry.
+
+`export_quantized()` converts a registry model to ONNX (via optimum) and
+applies dynamic int8 quantization to its weights with onnxruntime. The result
+lives in models/onnx/<name>/ next to the tokenizer and config, and
+`load_onnx_pipeline()` wraps it in a normal transformers pipeline, so callers
+(cascade classifier, growth tracker) do not change.
+
+Which backend a model uses is chosen by config — MODEL_BACKEND_<NAME> (e.g.
+MODEL_BACKEND_ZERO_SHOT=onnx), then MODEL_BACKEND, then "torch". A model set
+to "onnx" without exported artifacts falls back to torch.
+
+Requires `optimum[onnxruntime]` for both export and runtime.
+"""
+from __future__ import annotations
+
+import os
+import statistics
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+ONNX_DIR = os.path.join(REPO_ROOT, "models", "onnx")
+FP32_FILE = "model.onnx"
+QUANTIZED_FILE = "model_quantized.onnx"
+BACKENDS = ("torch", "onnx")
+
+
+def backend_for(name: str) -> str:
+    backend = (os.getenv(f"MODEL_BACKEND_{name.upper()}") or os.getenv("MODEL_BACKEND") or "torch").lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown model backend '{backend}' for {name}; expected one of {BACKENDS}")
+    return backend
+
+
+def model_dir(name: str, root: str = ONNX_DIR) -> str:
+    return os.path.join(root, name)
+
+
+def has_onnx(name: str, root: str = ONNX_DIR) -> bool:
+    return os.path.exists(os.path.join(model_dir(name, root), QUANTIZED_FILE))
+
+
+def export_quantized(name: str, spec, root: str = ONNX_DIR) -> Dict[str, int]:
+    """Export `spec.model_id` to ONNX and write a dynamically int8-quantized copy; returns file sizes."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+    from transformers import AutoTokenizer
+
+    from modules.model_cache import local_path
+
+    source = local_path(name) or spec.model_id  # the pinned snapshot when warmed
+    out = model_dir(name, root)
+    os.makedirs(out, exist_ok=True)
+    ORTModelForSequenceClassification.from_pretrained(source, export=True).save_pretrained(out)
+    AutoTokenizer.from_pretrained(source).save_pretrained(out)
+
+    fp32, int8 = os.path.join(out, FP32_FILE), os.path.join(out, QUANTIZED_FILE)
+    quantize_dynamic(fp32, int8, weight_type=QuantType.QInt8, per_channel=False)
+    return {"fp32_bytes": os.path.getsize(fp32), "int8_bytes": os.path.getsize(int8)}
+
+
+def load_onnx_pipeline(name: str, spec, root: str = ONNX_DIR, file_name: str = QUANTIZED_FILE):
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+    from transformers import AutoTokenizer, pipeline
+
+    path = model_dir(name, root)
+    model = ORTModelForSequenceClassification.from_pretrained(path, file_name=file_name)
+    return pipeline(spec.task, model=model, tokenizer=AutoTokenizer.from_pretrained(path))
+
+
+# ---------------------------
+# 📏 Parity and benchmark
+# ---------------------------
+def _top(output) -> tuple:
+    """(label, score) from either a text-classification or a zero-shot output."""
+    if isinstance(output, list):
+        output = output[0]
+    if "labels" in output:
+        return output["labels"][0], float(output["scores"][0])
+    return output["label"], float(output["score"])
+
+
+def time_calls(pipe: Callable, texts: Sequence[str], **kwargs) -> tuple:
+    """Run `pipe` on each text; returns (top (label, score) per text, latency ms per text)."""
+    answers, latencies = [], []
+    for text in texts:
+        t0 = time.perf_counter()
+        answers.append(_top(pipe(text, **kwargs)))
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return answers, latencies
+
+
+def compare(reference: List[tuple], candidate: List[tuple]) -> Dict[str, Optional[float]]:
+    """Label agreement and score drift of `candidate` against `reference`."""
+    if not reference:
+        return {"samples": 0, "label_agreement": None, "max_score_diff": None, "mean_score_diff": None}
+    diffs = [abs(r[1] - c[1]) for r, c in zip(reference, candidate)]
+    return {
+        "samples": len(reference),
+        "label_agreement": round(sum(r[0] == c[0] for r, c in zip(reference, candidate)) / len(reference), 4),
+        "max_score_diff": round(max(diffs), 4),
+        "mean_score_diff": round(statistics.mean(diffs), 4),
+    }
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, Optional[float]]:
+    if not latencies:
+        return {"p50_ms": None, "p95_ms": None, "mean_ms": None}
+    ordered = sorted(latencies)
+    return {
+        "p50_ms": round(ordered[len(ordered) // 2], 2),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(0.95 * (len(ordered) - 1) + 0.5))], 2),
+        "mean_ms": round(statistics.mean(latencies), 2),
+    }
@@ -0,0 +1,194 @@
+# modules/rate_limit.py
+"""
+Rate limiting and request coalescing for BibleBot's LLM calls.
+
+RateLimiter
+    Token buckets per user and one global bucket. A call must get a token
+    from both; if the global bucket is empty the user's token is refunded.
+    `acquire()` never raises: it returns how long the caller should wait.
+
+RequestCoalescer
+    Identical requests that are in flight at the same time share one
+    upstream call. The first caller's producer runs on a background thread
+    and every chunk is fanned out to all waiters (late joiners first receive
+    the chunks already produced).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Defaults: a user may burst 3 questions, then 1 every 6 seconds; the whole
+# process may send 2 requests per second with bursts of 10.
+DEFAULT_USER_RATE = 1 / 6.0
+DEFAULT_USER_BURST = 3
+DEFAULT_GLOBAL_RATE = 2.0
+DEFAULT_GLOBAL_BURST = 10
+IDLE_BUCKET_SECONDS = 3600
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, n: float = 1.0) -> float:
+        """Take n tokens if available; returns 0.0 on success, else seconds until they would be."""
+        now = time.monotonic()
+        self._refill(now)
+        if self.tokens >= n:
+            self.tokens -= n
+            return 0.0
+        return (n - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+    def refund(self, n: float = 1.0):
+        self.tokens = min(self.capacity, self.tokens + n)
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        user_rate: float = DEFAULT_USER_RATE,
+        user_burst: float = DEFAULT_USER_BURST,
+        global_rate: float = DEFAULT_GLOBAL_RATE,
+        global_burst: float = DEFAULT_GLOBAL_BURST,
+    ):
+        self.user_rate = user_rate
+        self.user_burst = user_burst
+        self._global = TokenBucket(global_rate, global_burst)
+        self._users: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.throttled_user = 0
+        self.throttled_global = 0
+
+    def acquire(self, user_key: str) -> float:
+        """0.0 if the call may proceed now, otherwise the number of seconds to wait."""
+        with self._lock:
+            bucket = self._users.get(user_key)
+            if bucket is None:
+                bucket = self._users[user_key] = TokenBucket(self.user_rate, self.user_burst)
+                self._prune()
+            wait = bucket.try_take()
+            if wait:
+                self.throttled_user += 1
+                return wait
+            wait = self._global.try_take()
+            if wait:
+                bucket.refund()
+                self.throttled_global += 1
+                return wait
+            self.allowed += 1
+            return 0.0
+
+    def _prune(self):
+        cutoff = time.monotonic() - IDLE_BUCKET_SECONDS
+        for key in [k for k, b in self._users.items() if b.updated < cutoff]:
+            del self._users[key]
+
+    def metrics(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "allowed": self.allowed,
+                "throttled_user": self.throttled_user,
+                "throttled_global": self.throttled_global,
+                "tracked_users": len(self._users),
+            }
+
+
+def limiter_from_env() -> RateLimiter:
+    """Configured by BIBLEBOT_USER_RATE / _USER_BURST / _GLOBAL_RATE / _GLOBAL_BURST (requests per second)."""
+    return RateLimiter(
+        user_rate=float(os.getenv("BIBLEBOT_USER_RATE", DEFAULT_USER_RATE)),
+        user_burst=float(os.getenv("BIBLEBOT_USER_BURST", DEFAULT_USER_BURST)),
+        global_rate=float(os.getenv("BIBLEBOT_GLOBAL_RATE", DEFAULT_GLOBAL_RATE)),
+        global_burst=float(os.getenv("BIBLEBOT_GLOBAL_BURST", DEFAULT_GLOBAL_BURST)),
+    )
+
+
+# ---------------------------
+# 🔀 Coalescing
+# ---------------------------
+def request_key(model: str, messages: List[dict]) -> str:
+    payload = json.dumps([model, [[m.get("role"), m.get("content")] for m in messages]], ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    def __init__(self):
+        self.chunks: List[object] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.cond = threading.Condition()
+
+
+class RequestCoalescer:
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+
+    def _run(self, key: str, flight: _Flight, producer: Callable[[], Iterable]):
+        try:
+            for chunk in producer():
+                with flight.cond:
+                    flight.chunks.append(chunk)
+                    flight.cond.notify_all()
+        except BaseException as e:  # handed to every waiter
+            flight.error = e
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            with flight.cond:
+                flight.done = True
+                flight.cond.notify_all()
+
+    def stream(self, key: str, producer: Callable[[], Iterable]) -> Tuple[Iterator, bool]:
+        """
+        Returns (iterator over chunks, joined_existing).
+        The producer is only called if no identical request is already in flight.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            joined = flight is not None
+            if joined:
+                self.followers += 1
+            else:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+                threading.Thread(target=self._run, args=(key, flight, producer), daemon=True).start()
+        return self._follow(flight), joined
+
+    @staticmethod
+    def _follow(flight: _Flight) -> Iterator:
+        i = 0
+        while True:
+            with flight.cond:
+                while i >= len(flight.chunks) and not flight.done:
+                    flight.cond.wait()
+                pending = flight.chunks[i:]
+                finished = flight.done
+                error = flight.error
+            for chunk in pending:
+                yield chunk
+            i += len(pending)
+            if finished and i >= len(flight.chunks):
+                if error is not None:
+                    raise error
+                return
+
+    def metrics(self) -> Dict[str, int]:
+        with self._lock:
+            return {"leaders": self.leaders, "followers": self.followers, "in_flight": len(self._flights)}
@@ -0,0 +1,461 @@
+# modules/scripture.py
+"""
+Local scripture store.
+
+A public-domain Bible text (TSV: book, chapter, verse, text) is compiled once
+into an on-disk inverted index:
+
+    index/meta.json          corpus stats + source checksum
+    index/terms.json         term -> [postings offset, document frequency]
+    index/postings_doc.npy   int32  verse ids, grouped by term
+    index/postings_tf.npy    uint16 term frequency per posting
+    index/doc_len.npy        uint16 tokens per verse
+    index/ref_keys.npy       int32  book*1_000_000 + chapter*1000 + verse (sorted)
+    index/text_offsets.npy   int64  byte offsets into verses.bin
+    index/verses.bin         utf-8 verse texts, back to back
+
+The arrays and the text blob are memory-mapped, so loading is instant and
+every Streamlit process shares the same pages. Search is BM25; references
+such as "Jn 3:16" or "Psalm 118:24" are parsed and looked up directly.
+"""
+from __future__ import annotations
+
+import csv
+import datetime as dt
+import hashlib
+import json
+import math
+import mmap
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+SCRIPTURE_DIR = os.path.join(REPO_ROOT, "data", "scripture")
+# Drop a full public-domain text (same TSV layout) at data/scripture/kjv.tsv to
+# index the whole Bible; otherwise the bundled selection is used.
+FULL_SOURCE = os.path.join(SCRIPTURE_DIR, "kjv.tsv")
+BUNDLED_SOURCE = os.path.join(SCRIPTURE_DIR, "kjv_selected.tsv")
+INDEX_DIR = os.path.join(SCRIPTURE_DIR, "index")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# ---------------------------
+# 📚 Books and reference parsing
+# ---------------------------
+# (canonical name, abbreviations)
+BOOKS: List[Tuple[str, List[str]]] = [
+    ("Genesis", ["gen", "ge", "gn"]),
+    ("Exodus", ["exod", "exo", "ex"]),
+    ("Leviticus", ["lev", "le", "lv"]),
+    ("Numbers", ["num", "nu", "nm", "nb"]),
+    ("Deuteronomy", ["deut", "deu", "dt"]),
+    ("Joshua", ["josh", "jos", "jsh"]),
+    ("Judges", ["judg", "jdg", "jg"]),
+    ("Ruth", ["rth", "ru"]),
+    ("1 Samuel", ["1 sam", "1 sa", "1sm"]),
+    ("2 Samuel", ["2 sam", "2 sa", "2sm"]),
+    ("1 Kings", ["1 kgs", "1 ki", "1 kin"]),
+    ("2 Kings", ["2 kgs", "2 ki", "2 kin"]),
+    ("1 Chronicles", ["1 chron", "1 chr", "1 ch"]),
+    ("2 Chronicles", ["2 chron", "2 chr", "2 ch"]),
+    ("Ezra", ["ezr"]),
+    ("Nehemiah", ["neh", "ne"]),
+    ("Esther", ["esth", "est", "es"]),
+    ("Job", ["jb"]),
+    ("Psalms", ["psalm", "ps", "psa", "pss", "psm"]),
+    ("Proverbs", ["prov", "pro", "prv", "pr"]),
+    ("Ecclesiastes", ["eccles", "eccl", "ecc", "ec", "qoh"]),
+    ("Song of Solomon", ["song of songs", "song", "sos", "so", "canticles"]),
+    ("Isaiah", ["isa", "is"]),
+    ("Jeremiah", ["jer", "je", "jr"]),
+    ("Lamentations", ["lam", "la"]),
+    ("Ezekiel", ["ezek", "eze", "ezk"]),
+    ("Daniel", ["dan", "da", "dn"]),
+    ("Hosea", ["hos", "ho"]),
+    ("Joel", ["jl"]),
+    ("Amos", ["am"]),
+    ("Obadiah", ["obad", "ob"]),
+    ("Jonah", ["jnh", "jon"]),
+    ("Micah", ["mic", "mc"]),
+    ("Nahum", ["nah", "na"]),
+    ("Habakkuk", ["hab", "hb"]),
+    ("Zephaniah", ["zeph", "zep", "zp"]),
+    ("Haggai", ["hag", "hg"]),
+    ("Zechariah", ["zech", "zec", "zc"]),
+    ("Malachi", ["mal", "ml"]),
+    ("Matthew", ["matt", "mat", "mt"]),
+    ("Mark", ["mrk", "mar", "mk", "mr"]),
+    ("Luke", ["luk", "lk"]),
+    ("John", ["jhn", "jn", "joh"]),
+    ("Acts", ["act", "ac"]),
+    ("Romans", ["rom", "ro", "rm"]),
+    ("1 Corinthians", ["1 cor", "1 co"]),
+    ("2 Corinthians", ["2 cor", "2 co"]),
+    ("Galatians", ["gal", "ga"]),
+    ("Ephesians", ["eph", "ephes"]),
+    ("Philippians", ["phil", "php", "pp"]),
+    ("Colossians", ["col", "co"]),
+    ("1 Thessalonians", ["1 thess", "1 thes", "1 th"]),
+    ("2 Thessalonians", ["2 thess", "2 thes", "2 th"]),
+    ("1 Timothy", ["1 tim", "1 ti"]),
+    ("2 Timothy", ["2 tim", "2 ti"]),
+    ("Titus", ["tit", "ti"]),
+    ("Philemon", ["philem", "phm", "pm"]),
+    ("Hebrews", ["heb"]),
+    ("James", ["jas", "jm"]),
+    ("1 Peter", ["1 pet", "1 pe", "1 pt"]),
+    ("2 Peter", ["2 pet", "2 pe", "2 pt"]),
+    ("1 John", ["1 jn", "1 jhn", "1 joh"]),
+    ("2 John", ["2 jn", "2 jhn", "2 joh"]),
+    ("3 John", ["3 jn", "3 jhn", "3 joh"]),
+    ("Jude", ["jud", "jd"]),
+    ("Revelation", ["rev", "re", "revelations"]),
+]
+
+BOOK_NAMES: List[str] = [name for name, _ in BOOKS]
+
+
+def _book_key(text: str) -> str:
+    text = text.lower().replace(".", "").strip()
+    text = re.sub(r"^(iii|ii|i|first|second|third|1st|2nd|3rd)\s+", lambda m: {
+        "i": "1", "first": "1", "1st": "1",
+        "ii": "2", "second": "2", "2nd": "2",
+        "iii": "3", "third": "3", "3rd": "3",
+    }[m.group(1)] + " ", text)
+    text = re.sub(r"^([123])\s*", r"\1 ", text)
+    return re.sub(r"\s+", " ", text)
+
+
+_BOOK_LOOKUP: Dict[str, int] = {}
+for _i, (_name, _abbrevs) in enumerate(BOOKS):
+    for _alias in [_name] + _abbrevs:
+        _BOOK_LOOKUP.setdefault(_book_key(_alias), _i)
+
+_FULL_NAMES = {_book_key(name) for name in BOOK_NAMES} | {"psalm"}
+_BOOK_PATTERN = "|".join(
+    sorted((re.escape(k).replace("\\ ", " ").replace(" ", r"\s*") for k in _BOOK_LOOKUP), key=len, reverse=True)
+)
+_REF_RE = re.compile(
+    r"(?<![A-Za-z0-9])(" + _BOOK_PATTERN + r")\.?\s*"
+    r"(\d{1,3})(?:\s*[:.]\s*(\d{1,3})(?:\s*[-–]\s*(\d{1,3}))?)?(?![A-Za-z0-9])",
+    re.IGNORECASE,
+)
+_ROMAN_PREFIX = re.compile(r"\b(III|II)\s+(?=[A-Z])")
+
+
+@dataclass
+class Reference:
+    book: int          # index into BOOKS
+    chapter: int
+    verse_start: Optional[int] = None
+    verse_end: Optional[int] = None
+
+    @property
+    def book_name(self) -> str:
+        return BOOK_NAMES[self.book]
+
+    def __str__(self) -> str:
+        out = f"{self.book_name} {self.chapter}"
+        if self.verse_start is not None:
+            out += f":{self.verse_start}"
+            if self.verse_end is not None and self.verse_end != self.verse_start:
+                out += f"-{self.verse_end}"
+        return out
+
+
+def _match_book(text: str) -> Optional[int]:
+    return _BOOK_LOOKUP.get(_book_key(text))
+
+
+def find_references(text: str) -> List[Reference]:
+    """All scripture references mentioned in free text ("What does Jn 3:16 mean?")."""
+    text = _ROMAN_PREFIX.sub(lambda m: "3 " if m.group(1) == "III" else "2 ", text or "")
+    refs = []
+    for m in _REF_RE.finditer(text):
+        book = _match_book(m.group(1))
+        if book is None:
+            continue
+        # "Is 3" or "Am 5" alone is too ambiguous; chapter-only needs the full book name
+        if m.group(3) is None and _book_key(m.group(1)) not in _FULL_NAMES:
+            continue
+        refs.append(Reference(
+            book=book,
+            chapter=int(m.group(2)),
+            verse_start=int(m.group(3)) if m.group(3) else None,
+            verse_end=int(m.group(4)) if m.group(4) else None,
+        ))
+    return refs
+
+
+def parse_reference(text: str) -> Optional[Reference]:
+    refs = find_references(text)
+    return refs[0] if refs else None
+
+
+# ---------------------------
+# 🔤 Tokenizer
+# ---------------------------
+_WORD_RE = re.compile(r"[a-z]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "from", "he", "him", "his",
+    "i", "in", "is", "it", "me", "my", "not", "of", "on", "or", "that", "the", "them", "they",
+    "thee", "thou", "thy", "to", "unto", "upon", "was", "we", "with", "ye", "you", "shall",
+    "hath", "have", "what", "who", "does", "do", "did", "which", "this", "these", "mean",
+    "bible", "verse", "say", "says", "about",
+}
+# Archaic and common English endings folded together so "loveth"/"loved"/"loves" meet "love".
+_SUFFIXES = ("eth", "est", "ing", "ed", "es", "s")
+
+
+def _stem(word: str) -> str:
+    for suffix in _SUFFIXES:
+        if len(word) > len(suffix) + 2 and word.endswith(suffix):
+            return word[: -len(suffix)]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    return [_stem(w) for w in _WORD_RE.findall((text or "").lower()) if w not in STOPWORDS]
+
+
+# ---------------------------
+# 🏗️ Index build
+# ---------------------------
+def _ref_key(book: int, chapter: int, verse: int) -> int:
+    return book * 1_000_000 + chapter * 1000 + verse
+
+
+def _file_sha1(path: str) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def default_source() -> str:
+    return os.getenv("SCRIPTURE_SOURCE") or (FULL_SOURCE if os.path.exists(FULL_SOURCE) else BUNDLED_SOURCE)
+
+
+def build_index(source: Optional[str] = None, out_dir: str = INDEX_DIR) -> dict:
+    """Compile a TSV Bible text into the memory-mappable index. Returns meta."""
+    source = source or default_source()
+    rows = []
+    with open(source, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f, delimiter="\t"):
+            book = _match_book(row["book"])
+            if book is None:
+                raise ValueError(f"Unknown book in {source}: {row['book']!r}")
+            rows.append((_ref_key(book, int(row["chapter"]), int(row["verse"])), row["text"].strip()))
+    rows.sort(key=lambda r: r[0])
+
+    postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+    doc_len = np.zeros(len(rows), dtype=np.uint16)
+    offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    blob = bytearray()
+    for doc_id, (_, text) in enumerate(rows):
+        counts = Counter(tokenize(text))
+        doc_len[doc_id] = min(sum(counts.values()), 65535)
+        for term, tf in counts.items():
+            postings[term].append((doc_id, min(tf, 65535)))
+        offsets[doc_id] = len(blob)
+        blob += text.encode("utf-8")
+    offsets[len(rows)] = len(blob)
+
+    terms, post_doc, post_tf = {}, [], []
+    for term in sorted(postings):
+        plist = postings[term]
+        terms[term] = [len(post_doc), len(plist)]
+        post_doc.extend(d for d, _ in plist)
+        post_tf.extend(t for _, t in plist)
+
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, "postings_doc.npy"), np.asarray(post_doc, dtype=np.int32))
+    np.save(os.path.join(out_dir, "postings_tf.npy"), np.asarray(post_tf, dtype=np.uint16))
+    np.save(os.path.join(out_dir, "doc_len.npy"), doc_len)
+    np.save(os.path.join(out_dir, "ref_keys.npy"), np.asarray([k for k, _ in rows], dtype=np.int32))
+    np.save(os.path.join(out_dir, "text_offsets.npy"), offsets)
+    with open(os.path.join(out_dir, "verses.bin"), "wb") as f:
+        f.write(bytes(blob))
+    with open(os.path.join(out_dir, "terms.json"), "w", encoding="utf-8") as f:
+        json.dump(terms, f, separators=(",", ":"))
+
+    meta = {
+        "source": os.path.relpath(source, REPO_ROOT),
+        "source_sha1": _file_sha1(source),
+        "verses": len(rows),
+        "terms": len(terms),
+        "avg_doc_len": float(doc_len.mean()) if len(rows) else 0.0,
+    }
+    # meta.json is written last; its presence marks a complete index
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+# ---------------------------
+# 🔎 Index load + search
+# ---------------------------
+@dataclass
+class Verse:
+    ref: Reference
+    text: str
+    score: float = 0.0
+
+    def __str__(self) -> str:
+        return f"{self.ref} — {self.text}"
+
+
+class ScriptureIndex:
+    def __init__(self, index_dir: str = INDEX_DIR):
+        with open(os.path.join(index_dir, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        with open(os.path.join(index_dir, "terms.json"), encoding="utf-8") as f:
+            self.terms: Dict[str, List[int]] = json.load(f)
+
+        def arr(name):
+            return np.load(os.path.join(index_dir, name), mmap_mode="r")
+
+        self.post_doc = arr("postings_doc.npy")
+        self.post_tf = arr("postings_tf.npy")
+        self.doc_len = arr("doc_len.npy")
+        self.ref_keys = arr("ref_keys.npy")
+        self.text_offsets = arr("text_offsets.npy")
+        self._blob_file = open(os.path.join(index_dir, "verses.bin"), "rb")
+        self._blob = mmap.mmap(self._blob_file.fileno(), 0, access=mmap.ACCESS_READ) if self.text_offsets[-1] else b""
+        self.n_docs = int(self.meta["verses"])
+        self.avg_doc_len = float(self.meta["avg_doc_len"]) or 1.0
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    def _text(self, doc_id: int) -> str:
+        start, end = int(self.text_offsets[doc_id]), int(self.text_offsets[doc_id + 1])
+        return self._blob[start:end].decode("utf-8")
+
+    def _verse(self, doc_id: int, score: float = 0.0) -> Verse:
+        key = int(self.ref_keys[doc_id])
+        ref = Reference(book=key // 1_000_000, chapter=(key // 1000) % 1000, verse_start=key % 1000)
+        return Verse(ref=ref, text=self._text(doc_id), score=score)
+
+    def lookup(self, ref: Reference) -> List[Verse]:
+        """Verses for a reference; a chapter-only reference returns the whole chapter."""
+        first = ref.verse_start if ref.verse_start is not None else 0
+        last = ref.verse_end if ref.verse_end is not None else (first if ref.verse_start is not None else 999)
+        lo = np.searchsorted(self.ref_keys, _ref_key(ref.book, ref.chapter, first), side="left")
+        hi = np.searchsorted(self.ref_keys, _ref_key(ref.book, ref.chapter, last), side="right")
+        return [self._verse(i) for i in range(int(lo), int(hi))]
+
+    def search(self, query: str, k: int = 5) -> List[Verse]:
+        """BM25 ranked verses for a free-text query."""
+        q_terms = set(tokenize(query))
+        if not q_terms or not self.n_docs:
+            return []
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for term in q_terms:
+            entry = self.terms.get(term)
+            if entry is None:
+                continue
+            start, df = entry
+            docs = self.post_doc[start:start + df]
+            tf = self.post_tf[start:start + df].astype(np.float32)
+            idf = math.log(1.0 + (self.n_docs - df + 0.5) / (df + 0.5))
+            norm = BM25_K1 * (1.0 - BM25_B + BM25_B * self.doc_len[docs] / self.avg_doc_len)
+            scores[docs] += idf * tf * (BM25_K1 + 1.0) / (tf + norm)
+        k = min(k, self.n_docs)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [self._verse(int(i), float(scores[i])) for i in top if scores[i] > 0]
+
+    def retrieve(self, question: str, k: int = 4) -> List[Verse]:
+        """Verses explicitly referenced in the question first, then BM25 matches."""
+        out, seen = [], set()
+        for ref in find_references(question):
+            for v in self.lookup(ref)[:10]:
+                key = str(v.ref)
+                if key not in seen:
+                    seen.add(key)
+                    out.append(v)
+        for v in self.search(question, k=k):
+            key = str(v.ref)
+            if key not in seen:
+                seen.add(key)
+                out.append(v)
+        return out
+
+
+def _index_is_current(index_dir: str, source: str) -> bool:
+    meta_path = os.path.join(index_dir, "meta.json")
+    if not os.path.exists(meta_path):
+        return False
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+    except Exception:
+        return False
+    # By content, not mtime: a fresh checkout gives every file the same arbitrary mtime
+    return (meta.get("source") == os.path.relpath(source, REPO_ROOT)
+            and meta.get("source_sha1") == _file_sha1(source))
+
+
+_index: Optional[ScriptureIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> ScriptureIndex:
+    """Process-wide index, compiled on first use if missing or built from a different source text."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                source = default_source()
+                if not _index_is_current(INDEX_DIR, source):
+                    build_index(source, INDEX_DIR)
+                _index = ScriptureIndex(INDEX_DIR)
+    return _index
+
+
+def format_context(verses: List[Verse]) -> str:
+    """Retrieved verses as a system-prompt block for BibleBot."""
+    if not verses:
+        return ""
+    lines = "\n".join(f"- {v}" for v in verses)
+    return (
+        "Relevant scripture (KJV) retrieved from the local Bible index. "
+        "Quote these exactly when they answer the question:\n" + lines
+    )
+
+
+# ---------------------------
+# 🌅 Daily verse
+# ---------------------------
+DAILY_VERSE_REFS = [
+    "Psalm 118:24", "Lamentations 3:22-23", "Isaiah 40:31", "Philippians 4:13", "Proverbs 3:5-6",
+    "Joshua 1:9", "Psalm 46:1", "Jeremiah 29:11", "Matthew 11:28", "Romans 8:28",
+    "Psalm 119:105", "2 Corinthians 5:17", "Isaiah 41:10", "Philippians 4:6-7", "Psalm 23:1",
+    "John 14:27", "Hebrews 11:1", "Matthew 5:16", "2 Timothy 1:7", "1 Peter 5:7",
+    "Micah 6:8", "Galatians 5:22-23", "Numbers 6:24-26", "John 3:16", "Romans 12:2",
+]
+
+
+def daily_verse(day: Optional[dt.date] = None) -> Optional[str]:
+    """Verse of the day from the local index, rotating by date; None if unavailable."""
+    day = day or dt.date.today()
+    try:
+        index = get_index()
+    except Exception:
+        return None
+    for offset in range(len(DAILY_VERSE_REFS)):
+        ref = parse_reference(DAILY_VERSE_REFS[(day.toordinal() + offset) % len(DAILY_VERSE_REFS)])
+        verses = index.lookup(ref) if ref else []
+        if verses:
+            text = " ".join(v.text for v in verses)
+            return f"“{text}” – {ref}"
+    return None
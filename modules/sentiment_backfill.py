@@ -0,0 +1,144 @@
+# modules/sentiment_backfill.py
+"""
+Resumable sentiment (re)scoring of the whole journal for one model version.
+
+Every entry records the model version that scored it (journal_entries.
+sentiment_model, see sentiment_worker.model_version). The backfill walks the
+table in id order, a chunk at a time, picking entries that have no score, a
+failed one, or one from a different version (`missing_only` skips that last
+group). The chunk is split into batches for the worker threads, which score
+each batch with one pipeline call and write it with one execute_values
+UPDATE. Meanwhile the next chunk is read. The registry runs one inference at
+a time per model, so the extra threads overlap the database work with
+inference rather than running inference in parallel.
+
+After each chunk the last id is checkpointed in sentiment_backfill_runs, so
+an interrupted run picks up where it stopped. `restart=True` starts the
+version over. Entries claimed by the live worker pool ('scoring') are left
+to it.
+
+    from modules.sentiment_backfill import run_backfill
+    progress = run_backfill(get_registry().predictor("sentiment"), on_progress=print)
+"""
+from __future__ import annotations
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from modules import db
+from modules.sentiment_worker import model_version, score_texts
+
+DEFAULT_CHUNK_SIZE = 512
+DEFAULT_BATCH_SIZE = 32
+DEFAULT_WORKERS = 2
+
+
+@dataclass
+class BackfillProgress:
+    version: str
+    total: int  # entries needing a score past the checkpoint when the run started
+    last_id: int = 0
+    scored: int = 0  # this run
+    failed: int = 0
+    scored_before: int = 0  # earlier runs of the same version
+    seconds: float = 0.0
+    finished: bool = False
+
+    @property
+    def processed(self) -> int:
+        return self.scored + self.failed
+
+    @property
+    def rate(self) -> float:
+        return self.processed / self.seconds if self.seconds else 0.0
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        return max(self.total - self.processed, 0) / self.rate if self.rate else None
+
+
+def _score_batch(analyzer: Callable, version: str, rows: List[Dict]) -> Tuple[int, List[Dict]]:
+    """Score and store one batch; returns (stored, rows that failed even on their own)."""
+    try:
+        results = score_texts(analyzer, [r["entry_text"] for r in rows])
+        ok, failed = list(zip(rows, results)), []
+    except Exception:
+        # Find the entries that break the model instead of losing the whole batch
+        ok, failed = [], []
+        for row in rows:
+            try:
+                ok.append((row, score_texts(analyzer, [row["entry_text"]])[0]))
+            except Exception:
+                failed.append(row)
+    db.update_journal_sentiments((r["id"], score, label, version) for r, (score, label) in ok)
+    return len(ok), failed
+
+
+def run_backfill(
+    analyzer: Callable,
+    version: Optional[str] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    workers: int = DEFAULT_WORKERS,
+    missing_only: bool = False,
+    restart: bool = False,
+    limit: Optional[int] = None,
+    on_progress: Optional[Callable[[BackfillProgress], None]] = None,
+) -> BackfillProgress:
+    """Score entries until none are left (or `limit` have been processed); `on_progress` sees every chunk."""
+    version = version or model_version()
+    state = db.start_sentiment_backfill(version, restart=restart)
+    progress = BackfillProgress(
+        version=version,
+        total=db.count_sentiment_backfill(version, state["last_id"], missing_only),
+        last_id=state["last_id"],
+        scored_before=state["scored"],
+    )
+    failed_before = state["failed"]
+    t0 = time.perf_counter()
+
+    def fetch(after_id: int) -> List[Dict]:
+        size = chunk_size if limit is None else min(chunk_size, limit - progress.processed)
+        return db.fetch_sentiment_backfill_chunk(version, after_id, size, missing_only) if size > 0 else []
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sentiment-backfill") as pool, \
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="sentiment-backfill-reader") as reader:
+        rows = fetch(progress.last_id)
+        while rows:
+            # Read ahead while this chunk is scored; `limit` is re-checked when it arrives
+            next_rows = reader.submit(db.fetch_sentiment_backfill_chunk, version, rows[-1]["id"],
+                                      chunk_size, missing_only)
+            batches = [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+            outcomes = list(pool.map(lambda batch: _score_batch(analyzer, version, batch), batches))
+            scored = sum(n for n, _ in outcomes)
+            failed = [r for _, rows_failed in outcomes for r in rows_failed]
+            if failed and not scored:
+                # Nothing in the chunk could be scored: the model is broken, not the entries.
+                # The checkpoint stays put so the next run retries this chunk.
+                raise RuntimeError(f"Every entry after id {progress.last_id} failed to score; stopping")
+            # A stale score stays as it is; only entries with no score become 'error'
+            unscored = [r["id"] for r in failed if r.get("sentiment_status") != "done"]
+            if unscored:
+                db.mark_journal_sentiment_failed(unscored)
+
+            progress.scored += scored
+            progress.failed += len(failed)
+            progress.last_id = rows[-1]["id"]
+            progress.seconds = time.perf_counter() - t0
+            db.save_sentiment_backfill(version, progress.last_id, progress.scored_before + progress.scored,
+                                       failed_before + progress.failed)
+            if on_progress:
+                on_progress(progress)
+            rows = next_rows.result()
+            if limit is not None:
+                if rows and progress.processed >= limit:
+                    break  # more to do: the run stays unfinished
+                rows = rows[:limit - progress.processed]
+
+    progress.seconds = time.perf_counter() - t0
+    progress.finished = not rows
+    db.save_sentiment_backfill(version, progress.last_id, progress.scored_before + progress.scored,
+                               failed_before + progress.failed, finished=progress.finished)
+    return progress
@@ -0,0 +1,181 @@
+# modules/sentiment_worker.py
+"""
+Background sentiment scoring for journal entries.
+
+Entries are saved with sentiment_status = 'pending'. A small pool of daemon
+threads claims pending rows from Postgres in micro-batches, runs them through
+the shared sentiment pipeline in one call, and writes back a signed score
+(-1..1, stored in the FLOAT `sentiment` column), the model's label and the
+model version (see `model_version()`; scripts/backfill_sentiment.py rescores
+entries from any other version).
+
+`notify()` wakes a worker right after a save; workers linger `max_wait`
+seconds before claiming so entries saved close together share a batch. With
+nothing to do they fall back to polling every `poll_interval` seconds, which
+also picks up rows left behind by another process.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from modules import db
+
+DEFAULT_WORKERS = 2
+DEFAULT_BATCH_SIZE = 16
+DEFAULT_MAX_WAIT = 0.25
+DEFAULT_POLL_INTERVAL = 5.0
+MAX_CHARS = 2000  # keep long entries within the model's input length
+
+
+def signed_score(output: Dict) -> float:
+    """Map a pipeline output ({'label': 'POSITIVE'|'NEGATIVE', 'score': p}) onto -1..1."""
+    score = float(output["score"])
+    return score if output["label"].upper().startswith("POS") else -score
+
+
+def score_texts(analyzer: Callable, texts: List[str]) -> List[Tuple[float, str]]:
+    """(signed score, label) per text, from one batched pipeline call."""
+    outputs = analyzer([t[:MAX_CHARS] for t in texts], batch_size=len(texts), truncation=True)
+    return [(round(signed_score(o), 4), o["label"]) for o in outputs]
+
+
+def model_version(name: str = "sentiment") -> str:
+    """Identifies what produces the scores: '<hub id>@<pinned revision or latest>/<backend>'."""
+    from modules.model_cache import pinned_revision
+    from modules.model_registry import MODEL_SPECS
+    from modules.onnx_backend import backend_for, has_onnx
+    revision = pinned_revision(name)
+    # As in model_registry.load_pipeline: ONNX only when the export exists
+    backend = "onnx" if backend_for(name) == "onnx" and has_onnx(name) else "torch"
+    return f"{MODEL_SPECS[name].model_id}@{revision[:12] if revision else 'latest'}/{backend}"
+
+
+@dataclass
+class WorkerStats:
+    scored: int = 0
+    failed: int = 0
+    batches: int = 0
+    last_batch_size: int = 0
+    last_batch_ms: float = 0.0
+    last_error: Optional[str] = None
+
+
+class SentimentWorkerPool:
+    """Subclasses reuse the claim/score/store loop by overriding `_claim`, `_store`, `_fail` and `score`."""
+
+    thread_name = "sentiment-worker"
+
+    def __init__(
+        self,
+        analyzer_factory: Callable[[], Callable],
+        workers: int = DEFAULT_WORKERS,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_wait: float = DEFAULT_MAX_WAIT,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+    ):
+        self._analyzer_factory = analyzer_factory
+        self._analyzer = None
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.poll_interval = poll_interval
+        self.version: Optional[str] = None  # model_version(), taken when the first batch is stored
+        self.stats = WorkerStats()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        for i in range(self.workers):
+            t = threading.Thread(target=self._loop, name=f"{self.thread_name}-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout)
+
+    def notify(self):
+        """Call after saving an entry so it is scored without waiting for the next poll."""
+        self._wake.set()
+
+    # ---- internals ----
+    def _analyzer_fn(self) -> Callable:
+        if self._analyzer is None:
+            with self._lock:
+                if self._analyzer is None:
+                    self._analyzer = self._analyzer_factory()
+        return self._analyzer
+
+    def _loop(self):
+        while not self._stop.is_set():
+            woke = self._wake.wait(self.poll_interval)
+            if self._stop.is_set():
+                return
+            if woke:
+                self._wake.clear()
+                time.sleep(self.max_wait)  # let entries saved together share a batch
+            # Drain: keep claiming full batches until the queue is empty
+            while not self._stop.is_set() and self.run_once() >= self.batch_size:
+                pass
+
+    def run_once(self) -> int:
+        """Claim and score one micro-batch; returns how many rows were claimed."""
+        try:
+            rows = self._claim()
+        except Exception as e:
+            self._record(0, 0, 0.0, f"claim: {e}")
+            return 0
+        if not rows:
+            return 0
+
+        t0 = time.perf_counter()
+        try:
+            self._store(rows, self.score([self._text(r) for r in rows]))
+            self._record(len(rows), 0, (time.perf_counter() - t0) * 1000)
+        except Exception as e:
+            try:
+                self._fail([r["id"] for r in rows])
+            except Exception:
+                pass  # rows stay 'scoring' and are reclaimed once stale
+            self._record(0, len(rows), (time.perf_counter() - t0) * 1000, str(e))
+        return len(rows)
+
+    def _claim(self) -> List[Dict]:
+        return db.claim_pending_sentiment(self.batch_size)
+
+    def _text(self, row: Dict) -> str:
+        return row["entry_text"]
+
+    def _store(self, rows: List[Dict], results: List[Tuple[float, str]]):
+        if self.version is None:
+            self.version = model_version()
+        db.update_journal_sentiments((r["id"], score, label, self.version) for r, (score, label) in zip(rows, results))
+
+    def _fail(self, entry_ids: List[int]):
+        db.mark_journal_sentiment_failed(entry_ids)
+
+    def score(self, texts: List[str]) -> List[Tuple[float, str]]:
+        return score_texts(self._analyzer_fn(), texts)
+
+    def _record(self, scored: int, failed: int, ms: float, error: Optional[str] = None):
+        with self._lock:
+            self.stats.scored += scored
+            self.stats.failed += failed
+            if scored or failed:
+                self.stats.batches += 1
+                self.stats.last_batch_size = scored + failed
+                self.stats.last_batch_ms = round(ms, 1)
+            if error:
+                self.stats.last_error = error
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            return asdict(self.stats)
@@ -0,0 +1,131 @@
+# modules/stream_translate.py
+"""
+Sentence-by-sentence translation of a streamed LLM reply.
+
+The English token stream is split into sentences as soon as each one is
+complete. Every sentence is translated on a small thread pool while the model
+keeps generating, and translated sentences are yielded strictly in order, so
+the reader sees their own language roughly one sentence behind the model.
+"""
+from __future__ import annotations
+
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from deep_translator import GoogleTranslator
+
+# A sentence ends at . ! ? (optionally followed by closing quotes/brackets)
+# and whitespace, or at a blank line / list break.
+_BOUNDARY = re.compile(r"(?<=[.!?])[\"'”’)\]]*\s+|\n+")
+
+# Periods that do not end a sentence: titles and scripture abbreviations
+# (matched case-sensitively, so "with me." and "for us." still split), verse
+# references ("3:16.") and a list marker alone at the start of a line ("1.").
+_ABBREVIATIONS = (
+    "Mr", "Mrs", "Ms", "Dr", "St", "Jr", "Sr", "Rev", "v", "vv", "ch", "chs", "cf",
+    "Gen", "Ex", "Lev", "Num", "Deut", "Josh", "Judg", "Sam", "Kgs", "Chr", "Neh", "Esth", "Ps", "Prov",
+    "Eccl", "Isa", "Jer", "Lam", "Ezek", "Hos", "Obad", "Mic", "Hab", "Zeph", "Hag", "Zech",
+    "Matt", "Mt", "Mk", "Lk", "Jn", "Rom", "Cor", "Gal", "Eph", "Phil", "Col", "Thess", "Heb", "Jas", "Pet",
+)
+_NOT_A_SENTENCE = re.compile(
+    r"(?:^\s*\d+|\d+:\d+(?:[-–]\d+)?|(?:^|[\s(])(?:" + "|".join(_ABBREVIATIONS) + r"))\.$"
+)
+
+MAX_WORKERS = 4
+
+
+def chunk_text(chunk) -> str:
+    """Text carried by a stream chunk (plain str or an OpenAI ChatCompletionChunk)."""
+    if chunk is None:
+        return ""
+    if isinstance(chunk, str):
+        return chunk
+    try:
+        if not chunk.choices:
+            return ""
+        return chunk.choices[0].delta.content or ""
+    except Exception:
+        return ""
+
+
+def text_stream(stream: Iterable) -> Iterator[str]:
+    for chunk in stream:
+        text = chunk_text(chunk)
+        if text:
+            yield text
+
+
+def split_sentences(pieces: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """
+    Yield (sentence, trailing_whitespace) pairs as soon as each sentence is complete.
+    The final, unterminated remainder is yielded when the stream ends.
+    """
+    buf = ""
+    for piece in pieces:
+        buf += piece
+        pos = 0
+        while True:
+            m = _BOUNDARY.search(buf, pos)
+            if not m:
+                break
+            # keep closing quotes with the sentence, whitespace as the separator
+            end = m.end()
+            sep_start = end
+            while sep_start > m.start() and buf[sep_start - 1].isspace():
+                sep_start -= 1
+            sentence, sep = buf[:sep_start], buf[sep_start:end]
+            if "\n" not in sep and _NOT_A_SENTENCE.search(sentence):
+                pos = end
+                continue
+            buf = buf[end:]
+            pos = 0
+            if sentence.strip():
+                yield sentence, sep
+            elif sep:
+                yield "", sep
+    if buf.strip():
+        yield buf, ""
+
+
+def _translate(sentence: str, target_lang: str) -> str:
+    if not sentence.strip():
+        return sentence
+    try:
+        return GoogleTranslator(source="en", target=target_lang).translate(sentence) or sentence
+    except Exception:
+        # Show the English sentence rather than dropping it
+        return sentence
+
+
+def translate_stream(
+    stream: Iterable,
+    target_lang: str,
+    english_sink: Optional[List[str]] = None,
+    max_workers: int = MAX_WORKERS,
+) -> Iterator[str]:
+    """
+    stream: LLM stream (ChatCompletionChunk objects or str pieces)
+    target_lang: language code to translate into
+    english_sink: optional list that receives the original English pieces
+    yields: translated sentences (with their separators), in order
+    """
+
+    def english_pieces():
+        for piece in text_stream(stream):
+            if english_sink is not None:
+                english_sink.append(piece)
+            yield piece
+
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for sentence, sep in split_sentences(english_pieces()):
+            pending.append((pool.submit(_translate, sentence, target_lang), sep))
+            # Flush every sentence at the head of the queue that is already translated
+            while pending and pending[0][0].done():
+                fut, s = pending.popleft()
+                yield fut.result() + s
+        while pending:
+            fut, s = pending.popleft()
+            yield fut.result() + s
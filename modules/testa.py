@@ -1,9 +1,6 @@
 import streamlit as st
 from openai import OpenAI
 import os
-import joblib
-import numpy as np
-import pandas as pd
 from streamlit_webrtc import webrtc_streamer
 import av
 import queue
@@ -12,6 +9,8 @@ import sys
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from modules.biblebot_ui import biblebot_ui # Ensure this file is also updated!
+from modules.gift_inference import get_gift_service
+from modules.model_registry import get_registry
 from langdetect import detect
 from deep_translator import GoogleTranslator
 
@@ -87,16 +86,14 @@ if tool == "📖 BibleBot":
 elif tool == "🔖 Verse Classifier":
     st.subheader("Classify a Bible Verse")
 
-    model_path = os.path.join("models", "model.pkl")
-    vectorizer_path = os.path.join("models", "vectorizer.pkl")
-
-    if not os.path.exists(model_path) or not os.path.exists(vectorizer_path):
+    try:
+        registry = get_registry()
+        model = registry.get("verse_model").model
+        vectorizer = registry.get("verse_vectorizer").model
+    except FileNotFoundError:
         st.error("Model files not found. Please ensure 'model.pkl' and 'vectorizer.pkl' are in the 'models' directory.")
         st.stop()
 
-    model = joblib.load(model_path)
-    vectorizer = joblib.load(vectorizer_path)
-
     st.write("🧠 Model can detect these topics:", model.classes_)
 
     verse = st.text_area("Paste a Bible verse here:", key="verse_classifier_input")
@@ -124,13 +121,13 @@ elif tool == "🧪 Spiritual Gifts Assessment":
         st.warning("⚠️ Please create your discipleship profile before continuing.")
         st.stop()
 
-    model_path = os.path.join("models", "gift_model.pkl")
-    if not os.path.exists(model_path):
+    gift_service = get_gift_service()
+    try:
+        gift_service.classes  # loads the model on first use
+    except FileNotFoundError:
         st.error("Spiritual gifts model file not found. Please ensure 'gift_model.pkl' is in the 'models' directory.")
         st.stop()
 
-    model = joblib.load(model_path)
-
     # Check if results exist and display them first, along with the clear button
     if "gift_results" in st.session_state.user_profile:
         gr = st.session_state.user_profile["gift_results"]
@@ -238,12 +235,8 @@ elif tool == "🧪 Spiritual Gifts Assessment":
             # Process submission directly within the form's context
             if submitted:
                 try:
-                    input_data = pd.DataFrame([responses], columns=[f"Q{i+1}" for i in range(len(responses))])
-                    probs = model.predict_proba(input_data)[0]
-                    top2 = np.argsort(probs)[-2:][::-1]
-
-                    primary = model.classes_[top2[0]]
-                    secondary = model.classes_[top2[1]]
+                    prediction = gift_service.predict(responses)
+                    primary, secondary = prediction.primary, prediction.secondary
 
                     primary_role = gift_to_fivefold.get(primary, "Undetermined")
                     secondary_role = gift_to_fivefold.get(secondary, "Undetermined")
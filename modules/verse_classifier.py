@@ -0,0 +1,308 @@
+# modules/verse_classifier.py
+"""
+Two-tier cascade verse classifier.
+
+Tier 1 is the bundled TF-IDF + LogisticRegression model (models/vectorizer.pkl,
+models/model.pkl, trained by scripts/train_vectorizer.py). It answers whenever
+its top predict_proba score reaches the threshold. Only uncertain verses go to
+tier 2, the zero-shot pipeline, which is loaded on first fallback rather than
+up front.
+
+Users see the app's topic list (TOPICS), which zero-shot uses as candidate
+labels. The TF-IDF model was trained on different classes, so its answers go
+through TFIDF_TO_TOPIC; a class with no topic counterpart always falls back
+to zero-shot. Both tiers then answer in the same label space and can be
+compared. A small fraction of confident answers can also be audited by
+zero-shot (`audit_rate`) so agreement is measured on the verses the fast tier
+keeps, not only on those it hands off.
+
+The threshold comes from models/cascade.json (written by
+scripts/calibrate_cascade.py), then VERSE_CASCADE_THRESHOLD, then the default.
+The bundled model was trained on ten verses and does not reach the target
+agreement on the held-out set (app/verse_calibration_data.csv), so the
+shipped setting is OFF_THRESHOLD: every verse goes to zero-shot, and the
+TF-IDF tier saves nothing until a larger model is trained and recalibrated.
+"""
+from __future__ import annotations
+
+import json
+import os
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import joblib
+import numpy as np
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+MODELS_DIR = os.path.join(REPO_ROOT, "models")
+CASCADE_CONFIG = os.path.join(MODELS_DIR, "cascade.json")
+DEFAULT_THRESHOLD = 0.5
+OFF_THRESHOLD = 1.01  # above any probability: the TF-IDF tier never answers alone
+OBSERVATION_WINDOW = 2000
+
+# The topics the Verse Classifier has always offered
+TOPICS = ["faith", "love", "hope", "salvation", "guidance", "suffering", "peace", "justice", "community", "forgiveness"]
+# TF-IDF class (app/verse_training_data.csv) -> topic; None: no counterpart, zero-shot decides
+TFIDF_TO_TOPIC: Dict[str, Optional[str]] = {
+    "faith": "faith",
+    "salvation": "salvation",
+    "peace": "peace",
+    "anxiety": "peace",       # "cast all your anxiety on Him"
+    "comfort": "hope",        # "the Lord is my shepherd"
+    "strength": "hope",       # "I can do all things through Christ"
+    "priority": "guidance",   # "seek first the kingdom of God"
+    "evangelism": "salvation",  # "go and make disciples"
+    "worship": None,
+    "joy": None,
+}
+
+
+@dataclass
+class CascadeResult:
+    label: str
+    score: float
+    tier: str  # "tfidf" or "zero_shot"
+    tfidf_label: str
+    tfidf_score: float
+    latency_ms: float
+    audited_label: Optional[str] = None
+
+
+@dataclass
+class CascadeStats:
+    total: int = 0
+    tfidf_answers: int = 0
+    fallbacks: int = 0
+    audits: int = 0
+    agreements: int = 0  # zero-shot calls (fallback or audit) that matched the TF-IDF label
+    compared: int = 0
+    tfidf_ms: float = 0.0
+    zero_shot_ms: float = 0.0
+
+    @property
+    def fallback_rate(self) -> float:
+        return self.fallbacks / self.total if self.total else 0.0
+
+    @property
+    def agreement_rate(self) -> Optional[float]:
+        return self.agreements / self.compared if self.compared else None
+
+
+def load_tfidf(models_dir: str = MODELS_DIR):
+    """(vectorizer, model) from the bundled joblib artifacts (held by the model registry by default)."""
+    if os.path.abspath(models_dir) == MODELS_DIR:
+        from modules.model_registry import get_registry
+        registry = get_registry()
+        return registry.get("verse_vectorizer").model, registry.get("verse_model").model
+    vectorizer = joblib.load(os.path.join(models_dir, "vectorizer.pkl"))
+    model = joblib.load(os.path.join(models_dir, "model.pkl"))
+    return vectorizer, model
+
+
+def load_threshold(path: str = CASCADE_CONFIG) -> float:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return float(json.load(f)["threshold"])
+    except (OSError, ValueError, KeyError):
+        return float(os.getenv("VERSE_CASCADE_THRESHOLD", DEFAULT_THRESHOLD))
+
+
+def save_threshold(threshold: float, details: Dict, path: str = CASCADE_CONFIG):
+    payload = dict(details, threshold=round(float(threshold), 4), calibrated_at=time.strftime("%Y-%m-%dT%H:%M:%S"))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+
+
+class CascadeClassifier:
+    def __init__(
+        self,
+        vectorizer,
+        model,
+        zero_shot_factory: Optional[Callable[[], Callable]] = None,
+        threshold: float = DEFAULT_THRESHOLD,
+        audit_rate: float = 0.0,
+        zero_shot_batch_size: int = 8,
+        labels: Optional[Sequence[str]] = None,
+        label_map: Optional[Dict[str, Optional[str]]] = None,
+    ):
+        self.vectorizer = vectorizer
+        self.model = model
+        self.model_labels: List[str] = [str(c) for c in model.classes_]
+        # What users see and zero-shot chooses from; by default the model's own classes
+        self.labels: List[str] = list(labels) if labels is not None else self.model_labels
+        self.label_map = dict(label_map) if label_map is not None else {c: c for c in self.model_labels}
+        self.threshold = threshold
+        self.audit_rate = audit_rate
+        self.zero_shot_batch_size = zero_shot_batch_size
+        self._zero_shot_factory = zero_shot_factory
+        self._zero_shot = None
+        self.stats = CascadeStats()
+        # (tfidf_score, agreed) for every zero-shot comparison, used to tune the threshold
+        self.observations = deque(maxlen=OBSERVATION_WINDOW)
+        self._lock = threading.Lock()
+
+    # ---- tiers ----
+    def tfidf_scores(self, texts: Sequence[str]) -> Tuple[List[str], np.ndarray]:
+        """Top model class (not yet mapped to a topic) and its probability for each text, in one call."""
+        proba = self.model.predict_proba(self.vectorizer.transform(list(texts)))
+        best = proba.argmax(axis=1)
+        return [self.model_labels[i] for i in best], proba[np.arange(len(best)), best]
+
+    def topic(self, model_label: str) -> Optional[str]:
+        return self.label_map.get(model_label)
+
+    def _zero_shot_labels(self, texts: List[str]) -> Tuple[List[Tuple[str, float]], float]:
+        """Zero-shot top label/score for each text in one pipeline call; returns (answers, ms per text)."""
+        if self._zero_shot is None:
+            with self._lock:
+                if self._zero_shot is None:
+                    self._zero_shot = self._zero_shot_factory()
+        t0 = time.perf_counter()
+        if len(texts) == 1:
+            outputs = [self._zero_shot(texts[0], candidate_labels=self.labels, multi_label=False)]
+        else:
+            outputs = self._zero_shot(texts, candidate_labels=self.labels, multi_label=False,
+                                      batch_size=min(len(texts), self.zero_shot_batch_size))
+        per_item_ms = (time.perf_counter() - t0) * 1000 / len(texts)
+        return [(o["labels"][0], float(o["scores"][0])) for o in outputs], per_item_ms
+
+    # ---- public API ----
+    def classify(self, text: str) -> CascadeResult:
+        return self.classify_many([text])[0]
+
+    def classify_many(self, texts: Sequence[str]) -> List[CascadeResult]:
+        """
+        TF-IDF scores the whole batch in one call; the uncertain items (and any
+        sampled for audit) then go to zero-shot together as a single batch.
+        """
+        if not texts:
+            return []
+        t0 = time.perf_counter()
+        tf_labels, tf_scores = self.tfidf_scores(texts)
+        tfidf_ms = (time.perf_counter() - t0) * 1000
+        per_item_ms = tfidf_ms / len(texts)
+
+        results, audited, to_zero_shot = [], [], []
+        for i, (tf_label, tf_score) in enumerate(zip(tf_labels, tf_scores)):
+            tf_score = float(tf_score)
+            topic = self.topic(tf_label)
+            # Without zero-shot the raw class is the best answer there is
+            label = topic or tf_label
+            results.append(CascadeResult(label, tf_score, "tfidf", label, tf_score, per_item_ms))
+            confident = (topic is not None and tf_score >= self.threshold) or not self.zero_shot_available
+            audit = confident and self.zero_shot_available and random.random() < self.audit_rate
+            if not confident or audit:
+                to_zero_shot.append(i)
+                audited.append(audit)
+
+        zs_ms = 0.0
+        if to_zero_shot:
+            answers, zs_ms = self._zero_shot_labels([texts[i] for i in to_zero_shot])
+            for i, audit, (zs_label, zs_score) in zip(to_zero_shot, audited, answers):
+                result = results[i]
+                if audit:
+                    result.audited_label = zs_label
+                else:
+                    result.label, result.score, result.tier = zs_label, zs_score, "zero_shot"
+                result.latency_ms += zs_ms
+                if self.topic(tf_labels[i]) is not None:  # unmapped classes cannot agree
+                    self._observe(result.tfidf_score, zs_label == result.tfidf_label)
+
+        with self._lock:
+            self.stats.total += len(results)
+            self.stats.tfidf_ms += tfidf_ms
+            self.stats.zero_shot_ms += zs_ms * len(to_zero_shot)
+            self.stats.audits += sum(audited)
+            for result in results:
+                if result.tier == "tfidf":
+                    self.stats.tfidf_answers += 1
+                else:
+                    self.stats.fallbacks += 1
+        return results
+
+    @property
+    def zero_shot_available(self) -> bool:
+        return self._zero_shot_factory is not None
+
+    # ---- metrics ----
+    def _observe(self, tf_score: float, agreed: bool):
+        with self._lock:
+            self.observations.append((tf_score, agreed))
+            self.stats.compared += 1
+            self.stats.agreements += int(agreed)
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            s = self.stats
+            zs_calls = s.fallbacks + s.audits
+            return {
+                "threshold": self.threshold,
+                "total": s.total,
+                "tfidf_answers": s.tfidf_answers,
+                "fallbacks": s.fallbacks,
+                "fallback_rate": round(s.fallback_rate, 3),
+                "audits": s.audits,
+                "agreement_rate": round(s.agreement_rate, 3) if s.agreement_rate is not None else None,
+                "avg_tfidf_ms": round(s.tfidf_ms / s.total, 3) if s.total else None,
+                "avg_zero_shot_ms": round(s.zero_shot_ms / zs_calls, 1) if zs_calls else None,
+                "suggested_threshold": suggest_threshold(list(self.observations)),
+            }
+
+
+def suggest_threshold(observations: List[Tuple[float, bool]], target_agreement: float = 0.9,
+                      min_support: int = 5) -> Optional[float]:
+    """
+    Lowest threshold at which TF-IDF answers at or above it agree with the
+    reference (zero-shot or gold labels) at least `target_agreement` of the time.
+    `observations` are (tfidf_score, agreed) pairs.
+    """
+    if len(observations) < min_support:
+        return None
+    ranked = sorted(observations, key=lambda o: o[0], reverse=True)
+    best = None
+    agreed = 0
+    for n, (score, ok) in enumerate(ranked, 1):
+        agreed += int(ok)
+        if n >= min_support and agreed / n >= target_agreement:
+            best = score
+    return round(best, 4) if best is not None else None
+
+
+def calibrate(clf: CascadeClassifier, texts: Sequence[str], reference: Sequence[str],
+              target_agreement: float = 0.9, topics: bool = False) -> Dict:
+    """
+    Score `texts` with TF-IDF against reference labels and pick a threshold.
+    `reference` holds model classes (gold labels), or topics with topics=True
+    (zero-shot answers); in both cases only verses whose class maps to a topic
+    count, since the others always fall back.
+    """
+    tf_labels, tf_scores = clf.tfidf_scores(texts)
+    observations = [(float(s), (clf.topic(l) if topics else l) == r)
+                    for l, s, r in zip(tf_labels, tf_scores, reference) if clf.topic(l) is not None]
+    threshold = suggest_threshold(observations, target_agreement)
+    kept = [ok for s, ok in observations if threshold is not None and s >= threshold]
+    return {
+        "threshold": threshold,
+        "samples": len(observations),
+        "target_agreement": target_agreement,
+        "tfidf_coverage": round(len(kept) / len(observations), 3) if observations else 0.0,
+        "agreement_above_threshold": round(sum(kept) / len(kept), 3) if kept else None,
+        "overall_agreement": round(sum(ok for _, ok in observations) / len(observations), 3) if observations else None,
+    }
+
+
+def cascade_from_artifacts(zero_shot_factory: Optional[Callable[[], Callable]] = None,
+                           models_dir: str = MODELS_DIR) -> CascadeClassifier:
+    vectorizer, model = load_tfidf(models_dir)
+    return CascadeClassifier(
+        vectorizer, model,
+        zero_shot_factory=zero_shot_factory,
+        threshold=load_threshold(os.path.join(models_dir, "cascade.json")),
+        audit_rate=float(os.getenv("VERSE_CASCADE_AUDIT_RATE", "0")),
+        labels=TOPICS,
+        label_map=TFIDF_TO_TOPIC,
+    )
@@ -0,0 +1,362 @@
+# modules/verse_training.py
+"""
+Streaming, incremental training for the verse topic model.
+
+Labeled verses (CSV with `verse` and `label` columns) are read in chunks and
+fed through a stateless HashingVectorizer into SGDClassifier.partial_fit
+(log loss, so the cascade still gets predict_proba). Nothing holds the whole
+dataset in memory, and a trained model can keep learning from newly labeled
+rows without starting over:
+
+    full    fit from scratch on every training row
+    update  continue the champion on rows it has not seen yet (ledger of row hashes)
+
+Every run writes a version under models/verse_versions/<version>/ with the
+two pickles, metrics.json (evaluation, config, data checksums, parent) and
+the trained-row ledger. Evaluation is a deterministic holdout — a verse is
+held out by its hash, so it stays out of training across runs — plus any
+--eval files, scored for the candidate and the current champion on the same
+rows in one streaming pass.
+
+A version is promoted only when it beats the champion's macro F1 (see
+`beats()`). `promote()` replaces the pickles with os.replace, swaps in the
+memory-mapped artifacts as whole directories and writes the CHAMPION pointer
+last. Running app processes keep the model they already loaded until restart.
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from modules.batch_classify import verse_hash
+from modules.model_artifacts import export_artifact, sha256_file
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+MODELS_DIR = os.path.join(REPO_ROOT, "models")
+VERSIONS_DIR = os.path.join(MODELS_DIR, "verse_versions")
+CHAMPION_FILE = "CHAMPION"
+LEDGER_FILE = "trained_rows.txt"
+DEFAULT_DATA = os.path.join(REPO_ROOT, "app", "verse_training_data.csv")
+LEGACY = "legacy"  # the champion before any promotion: whatever models/*.pkl holds
+
+
+@dataclass
+class TrainingConfig:
+    n_features: int = 2**17
+    ngram_range: Tuple[int, int] = (1, 2)
+    alpha: float = 1e-4
+    epochs: int = 5
+    chunk_size: int = 5000
+    holdout_pct: int = 20
+    seed: int = 0
+
+
+@dataclass
+class Metrics:
+    rows: int = 0
+    accuracy: Optional[float] = None
+    macro_f1: Optional[float] = None
+    per_label_f1: Dict[str, float] = field(default_factory=dict)
+
+
+# ---------------------------
+# 📥 Streaming data
+# ---------------------------
+def iter_chunks(paths: Sequence[str], chunk_size: int) -> Iterator[pd.DataFrame]:
+    """(verse, label) chunks from each CSV in turn; blank rows dropped."""
+    for path in paths:
+        for chunk in pd.read_csv(path, usecols=["verse", "label"], dtype=str, chunksize=chunk_size):
+            chunk = chunk.dropna()
+            chunk = chunk[(chunk["verse"].str.strip() != "") & (chunk["label"].str.strip() != "")]
+            if len(chunk):
+                yield chunk.assign(label=chunk["label"].str.strip())
+
+
+def row_key(verse: str, label: str) -> str:
+    """Ledger key; a relabeled verse counts as a new row."""
+    return f"{verse_hash(verse)}:{label}"
+
+
+def is_holdout(verse: str, pct: int) -> bool:
+    return int(verse_hash(verse)[:8], 16) % 100 < pct
+
+
+def split(chunk: pd.DataFrame, pct: int) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    held = chunk["verse"].map(lambda v: is_holdout(v, pct)).to_numpy(dtype=bool)
+    return chunk[~held], chunk[held]
+
+
+def scan_labels(paths: Sequence[str], chunk_size: int) -> List[str]:
+    labels: Set[str] = set()
+    for chunk in iter_chunks(paths, chunk_size):
+        labels.update(chunk["label"])
+    return sorted(labels)
+
+
+def data_checksums(paths: Sequence[str]) -> Dict[str, str]:
+    return {os.path.relpath(p, REPO_ROOT): sha256_file(p) for p in paths}
+
+
+# ---------------------------
+# 🏋️ Training
+# ---------------------------
+def make_vectorizer(cfg: TrainingConfig):
+    from sklearn.feature_extraction.text import HashingVectorizer
+    return HashingVectorizer(n_features=cfg.n_features, ngram_range=tuple(cfg.ngram_range),
+                             alternate_sign=False, norm="l2")
+
+
+def make_model(cfg: TrainingConfig):
+    from sklearn.linear_model import SGDClassifier
+    return SGDClassifier(loss="log_loss", alpha=cfg.alpha, random_state=cfg.seed)
+
+
+def fit_stream(vectorizer, model, paths: Sequence[str], cfg: TrainingConfig, classes: Sequence[str],
+               skip: Optional[Set[str]] = None) -> Set[str]:
+    """
+    `cfg.epochs` passes of partial_fit over the non-holdout rows not in `skip`;
+    each chunk is shuffled. Returns the ledger keys of the rows trained on.
+    """
+    rng = np.random.default_rng(cfg.seed)
+    trained: Set[str] = set()
+    for _ in range(cfg.epochs):
+        for chunk in iter_chunks(paths, cfg.chunk_size):
+            train, _held = split(chunk, cfg.holdout_pct)
+            keys = [row_key(v, l) for v, l in zip(train["verse"], train["label"])]
+            if skip:
+                keep = np.array([k not in skip for k in keys], dtype=bool)
+                train, keys = train[keep], [k for k, kept in zip(keys, keep) if kept]
+            if not len(train):
+                continue
+            order = rng.permutation(len(train))
+            model.partial_fit(vectorizer.transform(train["verse"].iloc[order]),
+                              train["label"].iloc[order].to_numpy(), classes=list(classes))
+            trained.update(keys)
+    return trained
+
+
+# ---------------------------
+# 📏 Evaluation
+# ---------------------------
+@dataclass
+class _Tally:
+    rows: int = 0
+    correct: int = 0
+    tp: Dict[str, int] = field(default_factory=dict)
+    fp: Dict[str, int] = field(default_factory=dict)
+    fn: Dict[str, int] = field(default_factory=dict)
+
+    def add(self, truth: Sequence[str], predicted: Sequence[str]):
+        for t, p in zip(truth, predicted):
+            self.rows += 1
+            if t == p:
+                self.correct += 1
+                self.tp[t] = self.tp.get(t, 0) + 1
+            else:
+                self.fp[p] = self.fp.get(p, 0) + 1
+                self.fn[t] = self.fn.get(t, 0) + 1
+
+    def metrics(self) -> Metrics:
+        if not self.rows:
+            return Metrics()
+        labels = sorted(set(self.tp) | set(self.fp) | set(self.fn))
+        f1 = {}
+        for label in labels:
+            tp = self.tp.get(label, 0)
+            f1[label] = round(2 * tp / (2 * tp + self.fp.get(label, 0) + self.fn.get(label, 0)), 4)
+        return Metrics(rows=self.rows, accuracy=round(self.correct / self.rows, 4),
+                       macro_f1=round(sum(f1.values()) / len(f1), 4), per_label_f1=f1)
+
+
+def iter_eval_chunks(train_paths: Sequence[str], eval_paths: Sequence[str],
+                     cfg: TrainingConfig) -> Iterator[pd.DataFrame]:
+    for chunk in iter_chunks(train_paths, cfg.chunk_size):
+        _train, held = split(chunk, cfg.holdout_pct)
+        if len(held):
+            yield held
+    yield from iter_chunks(eval_paths, cfg.chunk_size)
+
+
+def evaluate(models: Dict[str, Tuple[object, object]], chunks: Iterable[pd.DataFrame]) -> Dict[str, Metrics]:
+    """Score several (vectorizer, model) pairs on the same rows in one pass (macro F1 over seen labels)."""
+    tallies = {name: _Tally() for name in models}
+    for chunk in chunks:
+        truth = chunk["label"].tolist()
+        for name, (vectorizer, model) in models.items():
+            predicted = [str(p) for p in model.predict(vectorizer.transform(chunk["verse"].tolist()))]
+            tallies[name].add(truth, predicted)
+    return {name: tally.metrics() for name, tally in tallies.items()}
+
+
+def beats(candidate: Metrics, champion: Optional[Metrics], min_gain: float = 0.0) -> bool:
+    """Macro F1 first (accuracy breaks ties); no evaluation rows means no promotion."""
+    if candidate.macro_f1 is None:
+        return False
+    if champion is None or champion.macro_f1 is None:
+        return True
+    if candidate.macro_f1 != champion.macro_f1:
+        return candidate.macro_f1 > champion.macro_f1 + min_gain
+    return (candidate.accuracy or 0.0) > (champion.accuracy or 0.0) + min_gain
+
+
+# ---------------------------
+# 🗂️ Versions and promotion
+# ---------------------------
+def version_dir(version: str, root: str = VERSIONS_DIR) -> str:
+    return os.path.join(root, version)
+
+
+def _write_json_atomic(path: str, payload: Dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp, path)
+
+
+def champion(root: str = VERSIONS_DIR) -> str:
+    try:
+        with open(os.path.join(root, CHAMPION_FILE), encoding="utf-8") as f:
+            return json.load(f)["version"]
+    except FileNotFoundError:
+        return LEGACY
+
+
+def list_versions(root: str = VERSIONS_DIR) -> List[Dict]:
+    if not os.path.isdir(root):
+        return []
+    versions = []
+    for name in sorted(os.listdir(root)):
+        path = os.path.join(root, name, "metrics.json")
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                versions.append(json.load(f))
+    return versions
+
+
+def load_version(version: str, root: str = VERSIONS_DIR):
+    """(vectorizer, model, ledger keys); LEGACY is the installed models/*.pkl with no ledger."""
+    if version == LEGACY:
+        return (joblib.load(os.path.join(MODELS_DIR, "vectorizer.pkl")),
+                joblib.load(os.path.join(MODELS_DIR, "model.pkl")), set())
+    path = version_dir(version, root)
+    with open(os.path.join(path, LEDGER_FILE), encoding="utf-8") as f:
+        ledger = {line.strip() for line in f if line.strip()}
+    return joblib.load(os.path.join(path, "vectorizer.pkl")), joblib.load(os.path.join(path, "model.pkl")), ledger
+
+
+def save_version(vectorizer, model, ledger: Set[str], info: Dict, root: str = VERSIONS_DIR) -> str:
+    """Written to a temp dir and renamed, so a listed version is always complete."""
+    version = time.strftime("%Y%m%d-%H%M%S")
+    while os.path.exists(version_dir(version, root)):
+        time.sleep(1)
+        version = time.strftime("%Y%m%d-%H%M%S")
+    tmp = version_dir(f".{version}.tmp", root)
+    os.makedirs(tmp, exist_ok=True)
+    joblib.dump(vectorizer, os.path.join(tmp, "vectorizer.pkl"))
+    joblib.dump(model, os.path.join(tmp, "model.pkl"))
+    with open(os.path.join(tmp, LEDGER_FILE), "w", encoding="utf-8") as f:
+        f.writelines(f"{key}\n" for key in sorted(ledger))
+    _write_json_atomic(os.path.join(tmp, "metrics.json"), {"version": version, "promoted": False, **info})
+    os.replace(tmp, version_dir(version, root))
+    return version
+
+
+def _install_pickle(src: str, dst: str):
+    tmp = dst + ".tmp"
+    shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+def promote(version: str, root: str = VERSIONS_DIR) -> Dict:
+    """
+    Install `version` as the app's verse model. Pickles go first and artifacts
+    second; until the new artifacts land, the registry sees their source hash
+    mismatch and loads the pickles.
+    """
+    path = version_dir(version, root)
+    vectorizer, model, _ledger = load_version(version, root)
+    _install_pickle(os.path.join(path, "vectorizer.pkl"), os.path.join(MODELS_DIR, "vectorizer.pkl"))
+    _install_pickle(os.path.join(path, "model.pkl"), os.path.join(MODELS_DIR, "model.pkl"))
+    export_artifact("verse_vectorizer", vectorizer, source=os.path.join(MODELS_DIR, "vectorizer.pkl"))
+    export_artifact("verse_model", model, source=os.path.join(MODELS_DIR, "model.pkl"))
+
+    metrics_path = os.path.join(path, "metrics.json")
+    with open(metrics_path, encoding="utf-8") as f:
+        info = json.load(f)
+    info.update(promoted=True, promoted_at=time.strftime("%Y-%m-%dT%H:%M:%S"), replaced=champion(root))
+    _write_json_atomic(metrics_path, info)
+    _write_json_atomic(os.path.join(root, CHAMPION_FILE), {"version": version, "promoted_at": info["promoted_at"]})
+    return info
+
+
+# ---------------------------
+# 🚂 Runs
+# ---------------------------
+def run(mode: str, train_paths: Sequence[str], eval_paths: Sequence[str] = (), cfg: Optional[TrainingConfig] = None,
+        base: Optional[str] = None, root: str = VERSIONS_DIR) -> Dict:
+    """
+    Train ("full" or "update"), evaluate against the champion and save a version.
+    Returns its metrics.json contents, with `beats_champion` set; promotion is separate.
+    """
+    cfg = cfg or TrainingConfig()
+    current = champion(root)
+    base = base or current
+    classes = scan_labels(list(train_paths), cfg.chunk_size)
+    if not classes:
+        raise ValueError("No labeled rows in the training data")
+
+    t0 = time.perf_counter()
+    if mode == "full":
+        vectorizer, model, ledger = make_vectorizer(cfg), make_model(cfg), set()
+        new_rows = fit_stream(vectorizer, model, train_paths, cfg, classes)
+    elif mode == "update":
+        if base == LEGACY:
+            raise ValueError("The installed model was not trained by this pipeline; run a full training first")
+        vectorizer, model, ledger = load_version(base, root)
+        unknown = sorted(set(classes) - {str(c) for c in model.classes_})
+        if unknown:
+            raise ValueError(f"New labels {unknown} need a full retrain (partial_fit cannot add classes)")
+        with open(os.path.join(version_dir(base, root), "metrics.json"), encoding="utf-8") as f:
+            base_cfg = json.load(f)["config"]
+        # The vectorizer and holdout split must stay those the base was trained with
+        cfg = TrainingConfig(**{**base_cfg, "epochs": cfg.epochs, "chunk_size": cfg.chunk_size})
+        new_rows = fit_stream(vectorizer, model, train_paths, cfg, list(model.classes_), skip=ledger)
+    else:
+        raise ValueError(f"Unknown training mode '{mode}'")
+    train_seconds = time.perf_counter() - t0
+
+    contenders = {"candidate": (vectorizer, model)}
+    if current != LEGACY or os.path.exists(os.path.join(MODELS_DIR, "model.pkl")):
+        champ_vec, champ_model, _ = load_version(current, root)
+        contenders["champion"] = (champ_vec, champ_model)
+    scores = evaluate(contenders, iter_eval_chunks(train_paths, eval_paths, cfg))
+
+    candidate, champ = scores["candidate"], scores.get("champion")
+    info = {
+        "mode": mode,
+        "parent": base if mode == "update" else None,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": asdict(cfg),
+        "classes": [str(c) for c in model.classes_],
+        "train_data": data_checksums(train_paths),
+        "eval_data": data_checksums(eval_paths),
+        "rows_trained_total": len(ledger | new_rows),
+        "rows_trained_this_run": len(new_rows),
+        "train_seconds": round(train_seconds, 2),
+        "metrics": asdict(candidate),
+        "champion": {"version": current, "metrics": asdict(champ) if champ else None},
+        "beats_champion": beats(candidate, champ),
+    }
+    if mode == "update" and not new_rows:
+        info["version"] = None  # nothing new to learn; no version written
+        return info
+    info["version"] = save_version(vectorizer, model, ledger | new_rows, info, root)
+    return info
@@ -0,0 +1,77 @@
+"""
+Score journal entries whose sentiment is missing, failed, or from another model.
+
+    python scripts/backfill_sentiment.py                    # resume (or start) for the current model
+    python scripts/backfill_sentiment.py --missing-only     # leave scores from older models alone
+    python scripts/backfill_sentiment.py --restart --workers 4 --batch-size 64
+    python scripts/backfill_sentiment.py --sqlite app/discipleship_agent.db   # migrate growth_journal first
+    python scripts/backfill_sentiment.py --status
+
+The current model version is '<hub id>@<pinned revision>/<backend>' (see
+modules/sentiment_worker.py), so re-pinning the model or switching it to ONNX
+makes earlier scores stale. Progress is checkpointed after every chunk: stop
+it at any time and run it again to continue. The app's background workers
+keep scoring new entries meanwhile.
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from modules.sentiment_backfill import (DEFAULT_BATCH_SIZE, DEFAULT_CHUNK_SIZE, DEFAULT_WORKERS, run_backfill)
+
+
+def show(progress):
+    pct = 100.0 * progress.processed / progress.total if progress.total else 100.0
+    eta = progress.eta_seconds
+    print(f"[{pct:5.1f}%] {progress.processed}/{progress.total}  scored {progress.scored}  "
+          f"failed {progress.failed}  {progress.rate:,.0f} entries/s  "
+          f"eta {f'{eta:.0f}s' if eta is not None else '-'}  last id {progress.last_id}", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resumable sentiment backfill for journal entries")
+    parser.add_argument("--missing-only", action="store_true", help="only entries with no score")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint for this model version")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="entries read per query")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="entries per inference call")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--limit", type=int, help="stop after this many entries")
+    parser.add_argument("--sqlite", help="first import growth_journal from the old SQLite database")
+    parser.add_argument("--status", action="store_true", help="list backfill runs and exit")
+    args = parser.parse_args()
+
+    from modules.db import list_sentiment_backfills, run_schema_upgrades
+    run_schema_upgrades()
+    if args.status:
+        for run in list_sentiment_backfills():
+            state = "finished" if run["finished_at"] else "in progress"
+            print(f"{run['model_version']}  {state:11}  last id {run['last_id']}  scored {run['scored']}  "
+                  f"failed {run['failed']}  updated {run['updated_at']:%Y-%m-%d %H:%M}")
+        return
+
+    if args.sqlite:
+        from modules.journal_io import import_sqlite_growth_journal
+        reports = import_sqlite_growth_journal(args.sqlite)
+        for user_id, report in reports.items():
+            print(f"growth_journal {user_id}: {report.inserted} imported, {report.duplicates} already there, "
+                  f"{report.invalid} invalid")
+
+    from modules.model_registry import get_registry
+    analyzer = get_registry().predictor("sentiment")
+    try:
+        progress = run_backfill(
+            analyzer, chunk_size=args.chunk_size, batch_size=args.batch_size, workers=args.workers,
+            missing_only=args.missing_only, restart=args.restart, limit=args.limit, on_progress=show,
+        )
+    except KeyboardInterrupt:
+        sys.exit("Interrupted; run again to resume from the last checkpoint.")
+    except RuntimeError as exc:
+        sys.exit(str(exc))
+    print(f"{progress.version}: {progress.scored} scored, {progress.failed} failed in {progress.seconds:.1f}s"
+          f" ({progress.rate:,.0f} entries/s){'' if progress.finished else ' — not finished, run again'}")
+
+
+if __name__ == "__main__":
+    main()
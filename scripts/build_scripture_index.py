@@ -0,0 +1,21 @@
+"""
+Compile the local scripture index.
+
+    python scripts/build_scripture_index.py                 # bundled text or data/scripture/kjv.tsv
+    python scripts/build_scripture_index.py path/to/kjv.tsv
+
+The source is a TSV with columns: book, chapter, verse, text.
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from modules.scripture import INDEX_DIR, build_index, default_source
+
+source = sys.argv[1] if len(sys.argv) > 1 else default_source()
+t0 = time.perf_counter()
+meta = build_index(source, INDEX_DIR)
+print(f"Indexed {meta['verses']} verses / {meta['terms']} terms from {meta['source']} "
+      f"in {time.perf_counter() - t0:.2f}s -> {INDEX_DIR}")
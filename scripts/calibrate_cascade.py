@@ -0,0 +1,66 @@
+"""
+Calibrate the cascade verse classifier's TF-IDF confidence threshold.
+
+    python scripts/calibrate_cascade.py                           # held-out CSV (verse,topic)
+    python scripts/calibrate_cascade.py --data verses.csv --zero-shot
+    python scripts/calibrate_cascade.py --target 0.95 --dry-run
+
+The default data is app/verse_calibration_data.csv: verses the model was not
+trained on, hand-labeled with the app's topics. A `topic` column (or a
+`label` column of TF-IDF classes) is the gold reference; with --zero-shot (or
+neither column) the zero-shot model's answers are, which is what the cascade
+falls back to. Do not calibrate on the training CSV: the model has seen those
+verses and agrees with itself. The chosen threshold is written to
+models/cascade.json; if none reaches the target, OFF_THRESHOLD is written so
+every verse goes to zero-shot.
+"""
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from modules.verse_classifier import CASCADE_CONFIG, OFF_THRESHOLD, calibrate, cascade_from_artifacts, save_threshold
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+parser = argparse.ArgumentParser(description="Pick the TF-IDF confidence threshold for the cascade classifier")
+parser.add_argument("--data", default=os.path.join(REPO_ROOT, "app", "verse_calibration_data.csv"),
+                    help="CSV with a 'verse' column and optional 'topic' or 'label'")
+parser.add_argument("--zero-shot", action="store_true", help="use zero-shot answers as the reference labels")
+parser.add_argument("--target", type=float, default=0.9, help="required agreement for verses TF-IDF keeps")
+parser.add_argument("--dry-run", action="store_true", help="print the result without writing models/cascade.json")
+args = parser.parse_args()
+
+data = pd.read_csv(args.data)
+texts = data["verse"].astype(str).tolist()
+
+if args.zero_shot or not {"topic", "label"} & set(data.columns):
+    from modules.model_registry import get_registry
+    clf = cascade_from_artifacts(lambda: get_registry().predictor("zero_shot"))
+    zero_shot = get_registry().predictor("zero_shot")
+    reference = [zero_shot(t, candidate_labels=clf.labels, multi_label=False)["labels"][0] for t in texts]
+    source = "zero_shot"
+elif "topic" in data.columns:
+    clf = cascade_from_artifacts()
+    reference = data["topic"].astype(str).tolist()
+    source = "topics"
+else:
+    clf = cascade_from_artifacts()
+    reference = data["label"].astype(str).tolist()
+    source = "labels"
+
+report = calibrate(clf, texts, reference, target_agreement=args.target, topics=source != "labels")
+report.update(reference=source, data=os.path.relpath(args.data, REPO_ROOT))
+for key, value in report.items():
+    print(f"{key:26}: {value}")
+
+threshold = report.pop("threshold")
+if threshold is None:
+    print("No threshold reaches the target agreement; the TF-IDF tier is switched off.")
+    threshold = OFF_THRESHOLD
+if not args.dry_run:
+    save_threshold(threshold, report)
+    print(f"Saved -> {CASCADE_CONFIG}")
@@ -0,0 +1,65 @@
+"""
+Tag a list of verses by theme with the cascade verse classifier.
+
+    python scripts/classify_verses.py romans.csv -o romans_tagged.csv
+    python scripts/classify_verses.py series.jsonl --batch-size 64 > tagged.jsonl
+    python scripts/classify_verses.py verses.csv --fast-only --no-cache
+
+Input is CSV with a `verse` (or `text`) column, or JSONL with the same key;
+other columns are copied through. Results are written as each batch finishes.
+Per-verse results are cached by content hash in data/cache/verse_labels.jsonl.
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from modules.batch_classify import (
+    DEFAULT_BATCH_SIZE, BatchStats, ResultCache, ResultWriter, classify_records, detect_format, read_records,
+)
+from modules.verse_classifier import cascade_from_artifacts
+
+DEFAULT_CACHE = os.path.join(os.path.dirname(__file__), "..", "data", "cache", "verse_labels.jsonl")
+
+parser = argparse.ArgumentParser(description="Batch verse classification (CSV/JSONL in, CSV/JSONL out)")
+parser.add_argument("input", help="CSV or JSONL file, or '-' for stdin")
+parser.add_argument("-o", "--output", help="output file (default: stdout)")
+parser.add_argument("--format", choices=["csv", "jsonl"], help="input format (default: from the file extension)")
+parser.add_argument("--output-format", choices=["csv", "jsonl"], help="default: same as the input")
+parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+parser.add_argument("--fast-only", action="store_true", help="TF-IDF only; never load the zero-shot model")
+parser.add_argument("--cache", default=DEFAULT_CACHE, help="result cache file")
+parser.add_argument("--no-cache", action="store_true", help="do not read or write the result cache")
+args = parser.parse_args()
+
+in_fmt = args.format or ("csv" if args.input == "-" else detect_format(args.input))
+out_fmt = args.output_format or (detect_format(args.output) if args.output else in_fmt)
+
+zero_shot_factory = None
+if not args.fast_only:
+    from modules.model_registry import get_registry
+    zero_shot_factory = lambda: get_registry().predictor("zero_shot")
+clf = cascade_from_artifacts(zero_shot_factory)
+cache = ResultCache(None if args.no_cache else args.cache)
+stats = BatchStats()
+
+source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8", newline="")
+sink = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+try:
+    writer = ResultWriter(sink, out_fmt)
+    for row in classify_records(read_records(source, in_fmt), clf, args.batch_size, cache, stats):
+        writer.write(row)
+        if stats.verses % 500 == 0:
+            print(f"... {stats.verses} verses, {stats.verses_per_sec:.1f} verses/s", file=sys.stderr)
+finally:
+    if source is not sys.stdin:
+        source.close()
+    if sink is not sys.stdout:
+        sink.close()
+
+print(
+    f"Classified {stats.verses} verses in {stats.seconds:.2f}s ({stats.verses_per_sec:.1f} verses/s); "
+    f"{stats.cached} from cache, {stats.zero_shot} via zero-shot, {stats.batches} batches",
+    file=sys.stderr,
+)
@@ -0,0 +1,84 @@
+"""
+Compare the legacy gift model with the deterministic gifts engine over the
+stored assessment history.
+
+    python scripts/compare_gift_scorers.py                      # every row in gift_assessments
+    python scripts/compare_gift_scorers.py --jsonl export.jsonl   # offline: one assessment per line
+    python scripts/compare_gift_scorers.py --synthetic 100000     # random answers, no database
+    python scripts/compare_gift_scorers.py --out pairs.csv
+
+Each assessment's 50 core answers are scored by modules/gifts_engine.py and,
+projected onto the model's 30 questions, by the model through the bulk path of
+modules/gift_inference.py. Prints primary-gift agreement (model labels mapped
+onto engine labels), how often the model's pick is in the engine's top 3, the
+most common disagreements and throughput. --out writes one row per assessment.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from modules.gift_inference import MODEL_TO_ENGINE, compare_with_engine, get_gift_service
+from modules.gifts_engine import QUESTIONS_EN
+
+
+def records_from(args):
+    if args.synthetic:
+        rng = np.random.default_rng(0)
+        for i, row in enumerate(rng.integers(1, 6, size=(args.synthetic, len(QUESTIONS_EN)))):
+            yield {"id": i, "session_id": "synthetic", "answers": {"responses": row.tolist()}}
+    elif args.jsonl:
+        with open(args.jsonl, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        from modules.db import iter_gift_assessments
+        yield from iter_gift_assessments()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gift model vs deterministic engine over stored assessments")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--jsonl", help="assessments exported one JSON object per line")
+    source.add_argument("--synthetic", type=int, help="score N random assessments instead")
+    parser.add_argument("--out", help="CSV of (id, session_id, engine_primary, model_primary)")
+    parser.add_argument("--top", type=int, default=5, help="disagreements to list")
+    args = parser.parse_args()
+
+    service = get_gift_service()
+    writer, out = None, None
+    if args.out:
+        out = open(args.out, "w", newline="", encoding="utf-8")
+        writer = csv.writer(out)
+        writer.writerow(["id", "session_id", "engine_primary", "model_primary"])
+    try:
+        on_pair = (lambda r, e, m: writer.writerow([r.get("id"), r.get("session_id"), e, m])) if writer else None
+        report = compare_with_engine(records_from(args), service, on_pair=on_pair)
+    finally:
+        if out:
+            out.close()
+
+    print(f"assessments      : {report.assessments} ({report.compared} compared, {report.skipped} skipped)")
+    if report.compared:
+        print(f"primary agreement: {report.agreement:.3f}")
+        print(f"model in top 3   : {report.top3_rate:.3f}")
+        print(f"model unmapped   : {report.model_gift_unmapped} (gift with no engine counterpart)")
+        print(f"throughput       : {report.compared / max(report.seconds, 1e-9):,.0f} assessments/s "
+              f"({report.seconds}s)")
+        # The two scorers name gifts differently: compare through the model -> engine mapping
+        disagreements = [((engine, model), n) for (engine, model), n in report.confusion.most_common()
+                         if MODEL_TO_ENGINE.get(model) != engine]
+        if disagreements:
+            print("most common (engine -> model):")
+            for (engine, model), n in disagreements[:args.top]:
+                print(f"  {engine:12} -> {model:12} {n}")
+
+
+if __name__ == "__main__":
+    main()
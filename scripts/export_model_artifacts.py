@@ -0,0 +1,78 @@
+"""
+Convert the bundled scikit-learn pickles into memory-mappable artifacts.
+
+    python scripts/export_model_artifacts.py
+    python scripts/export_model_artifacts.py --check-only     # parity of existing artifacts
+
+Reads models/vectorizer.pkl, models/model.pkl and models/gift_model.pkl,
+writes models/artifacts/<name>/ and checks that the NumPy implementations
+match scikit-learn on the training verses and on random gift answers.
+scripts/train_vectorizer.py re-exports the verse models itself when it
+promotes a new version; this is for the gift model or a hand-edited pickle.
+"""
+import argparse
+import os
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+
+from modules.model_artifacts import export_artifact, load_artifact
+
+MODELS = os.path.join(REPO_ROOT, "models")
+VERSE_DATA = os.path.join(REPO_ROOT, "app", "verse_training_data.csv")
+TOLERANCE = 1e-9
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export pickled models to .npy artifacts")
+    parser.add_argument("--check-only", action="store_true")
+    args = parser.parse_args()
+
+    pickles = {name: os.path.join(MODELS, f) for name, f in
+               (("verse_vectorizer", "vectorizer.pkl"), ("verse_model", "model.pkl"), ("gift_model", "gift_model.pkl"))}
+    vectorizer = joblib.load(pickles["verse_vectorizer"])
+    verse_model = joblib.load(pickles["verse_model"])
+    gift_model = joblib.load(pickles["gift_model"])
+
+    if not args.check_only:
+        export_artifact("verse_vectorizer", vectorizer, VERSE_DATA, source=pickles["verse_vectorizer"])
+        export_artifact("verse_model", verse_model, VERSE_DATA, source=pickles["verse_model"])
+        # The gift model's training data is not in the repo, so no hash is recorded for it
+        export_artifact("gift_model", gift_model, source=pickles["gift_model"])
+
+    failures = []
+
+    verses = pd.read_csv(VERSE_DATA)["verse"].astype(str).tolist() + ["Love is patient, love is kind.", ""]
+    mapped_vec = load_artifact("verse_vectorizer", verify=True)
+    mapped_lr = load_artifact("verse_model", verify=True)
+    X_ref, X_map = vectorizer.transform(verses), mapped_vec.transform(verses)
+    diff = abs(X_ref - X_map).max()
+    print(f"verse_vectorizer : max |diff| {diff:.2e}")
+    failures += ["verse_vectorizer"] if diff > TOLERANCE else []
+    diff = np.abs(verse_model.predict_proba(X_ref) - mapped_lr.predict_proba(X_map)).max()
+    print(f"verse_model      : max |diff| {diff:.2e}")
+    failures += ["verse_model"] if diff > TOLERANCE else []
+
+    rng = np.random.default_rng(0)
+    answers = pd.DataFrame(rng.integers(1, 6, size=(500, gift_model.n_features_in_)),
+                           columns=gift_model.feature_names_in_)
+    mapped_rf = load_artifact("gift_model", verify=True)
+    ref = gift_model.predict_proba(answers)
+    got = mapped_rf.predict_proba(answers)
+    diff = np.abs(ref - got).max()
+    agree = (ref.argmax(axis=1) == got.argmax(axis=1)).mean()
+    print(f"gift_model       : max |diff| {diff:.2e}, label agreement {agree:.3f}")
+    failures += ["gift_model"] if diff > 1e-6 else []
+
+    if failures:
+        sys.exit(f"Parity check failed for: {', '.join(failures)}")
+    print(f"OK -> {os.path.join(MODELS, 'artifacts')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Export the sentiment and zero-shot models to dynamically quantized int8 ONNX,
+then check accuracy parity and compare latency and memory against PyTorch.
+
+    python scripts/export_onnx.py                          # both models
+    python scripts/export_onnx.py --models sentiment --min-agreement 0.98
+    python scripts/export_onnx.py --skip-export            # re-run the report only
+
+Writes models/onnx/<name>/model_quantized.onnx and models/onnx/report.json.
+Exits non-zero if a model's label agreement with PyTorch falls below
+--min-agreement; keep MODEL_BACKEND_<NAME>=torch for that model in that case.
+Switch a model over with e.g. MODEL_BACKEND_ZERO_SHOT=onnx.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+
+from modules.model_registry import _rss_bytes, hf_specs, load_pipeline
+from modules.onnx_backend import ONNX_DIR, compare, export_quantized, latency_summary, time_calls
+from modules.verse_classifier import TOPICS
+
+# Training plus held-out verses: the parity set for zero-shot, and extra text for sentiment
+VERSE_FILES = [os.path.join(REPO_ROOT, "app", "verse_training_data.csv"),
+               os.path.join(REPO_ROOT, "app", "verse_calibration_data.csv")]
+
+# Classification heads only; the embedding model stays on torch
+HF_SPECS = {name: spec for name, spec in hf_specs().items()
+            if spec.task in ("sentiment-analysis", "zero-shot-classification")}
+
+SENTIMENT_SAMPLES = [
+    "Today I felt God's peace while praying with my family.",
+    "I am struggling to forgive my brother and it weighs on me.",
+    "Church was wonderful and the sermon gave me hope.",
+    "I feel distant from God and tired of trying.",
+    "Grateful for answered prayer and a new job this week.",
+    "Anxious about exams, but trusting the Lord.",
+    "I lost my temper again and regret it.",
+    "Bible study with friends encouraged me so much.",
+    "Nothing seems to go right lately.",
+    "I am determined to read the Psalms every morning.",
+]
+
+
+def samples_for(name):
+    verses = [v for path in VERSE_FILES for v in pd.read_csv(path)["verse"].astype(str)]
+    if name == "sentiment":
+        return SENTIMENT_SAMPLES + verses, {}
+    # The labels the app sends (see modules/verse_classifier.py)
+    return verses, {"candidate_labels": TOPICS, "multi_label": False}
+
+
+def measure(name, backend, texts, kwargs):
+    gc.collect()
+    rss0 = _rss_bytes()
+    t0 = time.perf_counter()
+    pipe, used = load_pipeline(name, HF_SPECS[name], backend)
+    load_s = time.perf_counter() - t0
+    rss1 = _rss_bytes()
+    pipe(texts[0], **kwargs)  # warm-up, not timed
+    answers, latencies = time_calls(pipe, texts, **kwargs)
+    info = {"backend": used, "load_seconds": round(load_s, 2),
+            "rss_delta_mb": round((rss1 - rss0) / 2**20, 1) if rss0 is not None and rss1 is not None else None}
+    info.update(latency_summary(latencies))
+    del pipe
+    return answers, info
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantized ONNX export with parity and benchmark report")
+    parser.add_argument("--models", nargs="+", default=list(HF_SPECS), choices=list(HF_SPECS))
+    parser.add_argument("--skip-export", action="store_true", help="reuse existing exports")
+    parser.add_argument("--min-agreement", type=float, default=0.95)
+    args = parser.parse_args()
+
+    report, failed = {}, []
+    for name in args.models:
+        spec = HF_SPECS[name]
+        entry = {"model_id": spec.model_id}
+        if not args.skip_export:
+            print(f"Exporting {name} ({spec.model_id}) ...")
+            entry["files"] = export_quantized(name, spec)
+
+        texts, kwargs = samples_for(name)
+        torch_answers, entry["torch"] = measure(name, "torch", texts, kwargs)
+        onnx_answers, entry["onnx"] = measure(name, "onnx", texts, kwargs)
+        if entry["onnx"]["backend"] != "onnx":
+            sys.exit(f"No ONNX export found for {name}; run without --skip-export first.")
+        entry["parity"] = compare(torch_answers, onnx_answers)
+        if entry["torch"]["p50_ms"] and entry["onnx"]["p50_ms"]:
+            entry["speedup_p50"] = round(entry["torch"]["p50_ms"] / entry["onnx"]["p50_ms"], 2)
+        entry["passed"] = entry["parity"]["label_agreement"] >= args.min_agreement
+        if not entry["passed"]:
+            failed.append(name)
+        report[name] = entry
+
+        print(f"\n=== {name} ===")
+        if "files" in entry:
+            print(f"size fp32 -> int8     : {entry['files']['fp32_bytes'] / 2**20:.1f} MB -> "
+                  f"{entry['files']['int8_bytes'] / 2**20:.1f} MB")
+        for backend in ("torch", "onnx"):
+            b = entry[backend]
+            print(f"{backend:6} load/rss/p50/p95: {b['load_seconds']}s / {b['rss_delta_mb']} MB / "
+                  f"{b['p50_ms']} ms / {b['p95_ms']} ms")
+        print(f"label agreement       : {entry['parity']['label_agreement']} "
+              f"(max score diff {entry['parity']['max_score_diff']})")
+        print(f"speedup (p50)         : {entry.get('speedup_p50')}x  -> {'PASS' if entry['passed'] else 'FAIL'}")
+
+    os.makedirs(ONNX_DIR, exist_ok=True)
+    with open(os.path.join(ONNX_DIR, "report.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport -> {os.path.join(ONNX_DIR, 'report.json')}")
+    if failed:
+        sys.exit(f"Parity below {args.min_agreement} for: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
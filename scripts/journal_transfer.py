@@ -0,0 +1,61 @@
+"""
+Bulk journal import and export from the command line (no upload size limit).
+
+    python scripts/journal_transfer.py import --user USER_ID old_journal.csv
+    python scripts/journal_transfer.py import --user USER_ID entries.jsonl
+    python scripts/journal_transfer.py export --user USER_ID journal.csv
+    python scripts/journal_transfer.py export --all backup.jsonl     # every user, for backups
+
+Files stream through Postgres COPY (see modules/journal_io.py), so memory
+stays flat for any size. The format follows the extension (.jsonl/.ndjson/.json
+or CSV) unless --format is given. Imported entries are scored for sentiment
+by the app's background workers.
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from modules.journal_io import FORMATS, detect_format, export_journal, import_journal
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk journal import/export (CSV or JSONL)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("import")
+    p.add_argument("--user", required=True, help="user_id that owns the imported entries")
+    p.add_argument("path")
+    p.add_argument("--format", choices=FORMATS)
+    p = sub.add_parser("export")
+    who = p.add_mutually_exclusive_group(required=True)
+    who.add_argument("--user", help="export one user's entries")
+    who.add_argument("--all", action="store_true", help="export every user's entries (with user_id)")
+    p.add_argument("path")
+    p.add_argument("--format", choices=FORMATS)
+    args = parser.parse_args()
+    fmt = args.format or detect_format(args.path)
+
+    if args.command == "export":
+        with open(args.path, "wb") as out:
+            export_journal(out, user_id=None if args.all else args.user, fmt=fmt)
+        print(f"Wrote {args.path}")
+        return
+
+    try:
+        with open(args.path, "rb") as f:
+            report = import_journal(args.user, f, fmt)
+    except ValueError as exc:
+        sys.exit(str(exc))
+    print(f"rows      : {report.rows}")
+    print(f"inserted  : {report.inserted}")
+    print(f"duplicates: {report.duplicates}")
+    print(f"invalid   : {report.invalid}")
+    for line, message in report.errors:
+        print(f"  line {line}: {message}")
+    if report.invalid > len(report.errors):
+        print(f"  ... {report.invalid - len(report.errors)} more")
+
+
+if __name__ == "__main__":
+    main()
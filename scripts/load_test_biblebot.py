@@ -0,0 +1,213 @@
+"""
+BibleBot load-test harness.
+
+Runs against the local OpenAI-compatible stub (started in-process unless
+--base-url is given) and reports throughput, time-to-first-token, latency and
+memory per session.
+
+Modes:
+  sessions  many concurrent simulated sessions driving the same client/context
+            path BibleBot uses (LLMClient + build_context), one thread each
+  apptest   drives the real biblebot_ui through Streamlit's AppTest, one
+            session after another
+
+    python scripts/load_test_biblebot.py --sessions 50 --turns 5
+    python scripts/load_test_biblebot.py --mode apptest --sessions 5 --turns 3
+    python scripts/load_test_biblebot.py --error-rate 0.1 --tokens-per-sec 80
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(REPO_ROOT)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from stub_llm_server import StubConfig, start_stub_server
+
+QUESTIONS = [
+    "Who was Moses?",
+    "What does John 3:16 mean?",
+    "What is the fruit of the Spirit?",
+    "How can I grow in prayer?",
+    "What does Psalm 23 teach about God's care?",
+    "Why did Jesus speak in parables?",
+]
+
+
+def _question(session, turn, unique):
+    q = QUESTIONS[(session + turn) % len(QUESTIONS)]
+    # Unique suffix keeps the answer cache out of the measurement unless asked for
+    return f"{q} (session {session}, turn {turn})" if unique else q
+
+
+def _pct(values, p):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+
+def _report(title, wall, turns_ok, errors, ttfts, latencies, completion_tokens, mem_per_session):
+    print(f"\n=== {title} ===")
+    print(f"wall time            : {wall:.2f}s")
+    print(f"turns completed      : {turns_ok}  (errors: {errors})")
+    print(f"throughput           : {turns_ok / wall:.2f} turns/s, {completion_tokens / wall:.1f} tokens/s")
+    if ttfts:
+        print(f"TTFT p50/p95/max     : {_pct(ttfts, 50) * 1000:.0f} / {_pct(ttfts, 95) * 1000:.0f} / {max(ttfts) * 1000:.0f} ms")
+    if latencies:
+        print(f"latency p50/p95/max  : {_pct(latencies, 50) * 1000:.0f} / {_pct(latencies, 95) * 1000:.0f} / {max(latencies) * 1000:.0f} ms")
+        print(f"latency mean         : {statistics.mean(latencies) * 1000:.0f} ms")
+    print(f"memory per session   : {mem_per_session / 1024:.1f} KiB (Python heap, tracemalloc)")
+
+
+# ---------------------------
+# Simulated sessions
+# ---------------------------
+def run_sessions(base_url, sessions, turns, concurrency, unique):
+    from modules.chat_context import build_context
+    from modules.llm_client import LLMClient
+    from modules.stream_translate import text_stream
+
+    client = LLMClient(api_key="stub-key", base_url=base_url, max_concurrency=concurrency)
+    histories = {}
+    errors = [0]
+    lock = threading.Lock()
+
+    def session_worker(s):
+        history, state = [], {"summary": "", "covered_turn": None}
+        for t in range(turns):
+            turn_id = uuid.uuid4().hex
+            history.append({"role": "user", "content": _question(s, t, unique), "turn_id": turn_id})
+            context = build_context(history, state, model="gpt-3.5-turbo")
+            try:
+                reply = "".join(text_stream(client.stream(context, model="gpt-3.5-turbo")))
+                history.append({"role": "assistant", "content": reply, "turn_id": turn_id})
+            except Exception:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            histories[s] = (history, state)
+
+    tracemalloc.start()
+    base_mem = tracemalloc.get_traced_memory()[0]
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=session_worker, args=(s,)) for s in range(sessions)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    wall = time.perf_counter() - t0
+    mem = tracemalloc.get_traced_memory()[0] - base_mem
+    tracemalloc.stop()
+
+    calls = [c for c in client.recent_calls(limit=sessions * turns * 2) if c["stream"]]
+    ok = [c for c in calls if c["ok"]]
+    _report(
+        f"sessions mode: {sessions} sessions x {turns} turns, concurrency {concurrency}",
+        wall, len(ok), errors[0],
+        [c["ttft"] for c in ok if c["ttft"] is not None],
+        [c["latency"] for c in ok if c["latency"] is not None],
+        sum(c["completion_tokens"] for c in ok),
+        mem / max(1, sessions),
+    )
+    retries = client.metrics_summary()["retries"]
+    print(f"retries              : {retries}")
+    client.close()
+
+
+# ---------------------------
+# Streamlit AppTest
+# ---------------------------
+APP_SCRIPT = f"""
+import sys
+sys.path.append({REPO_ROOT!r})
+from modules.biblebot_ui import biblebot_ui
+biblebot_ui()
+"""
+
+
+def run_apptest(base_url, sessions, turns, unique):
+    from streamlit.testing.v1 import AppTest
+
+    os.environ["OPENAI_BASE_URL"] = base_url
+    # Warm-up run so module imports are not charged to the first session
+    warm = AppTest.from_string(APP_SCRIPT, default_timeout=60)
+    warm.secrets["OPENAI_API_KEY"] = "stub-key"
+    warm.session_state["user_id"] = None
+    warm.run()
+    del warm
+
+    run_times, errors, mems = [], 0, []
+    t0 = time.perf_counter()
+    tracemalloc.start()
+    for s in range(sessions):
+        before = tracemalloc.get_traced_memory()[0]
+        at = AppTest.from_string(APP_SCRIPT, default_timeout=60)
+        at.secrets["OPENAI_API_KEY"] = "stub-key"
+        at.session_state["user_id"] = None  # memory-only history, no database needed
+        at.run()
+        for t in range(turns):
+            r0 = time.perf_counter()
+            at.text_input(key="text_question").input(_question(s, t, unique)).run()
+            run_times.append(time.perf_counter() - r0)
+            if at.exception or at.error:
+                errors += 1
+        mems.append(tracemalloc.get_traced_memory()[0] - before)
+        del at
+    wall = time.perf_counter() - t0
+    tracemalloc.stop()
+
+    from modules.biblebot_ui import get_llm_client
+    client = get_llm_client("stub-key", base_url)
+    calls = [c for c in client.recent_calls(limit=sessions * turns * 2) if c["stream"] and c["ok"]]
+    _report(
+        f"apptest mode: {sessions} sessions x {turns} turns (sequential)",
+        wall, len(run_times) - errors, errors,
+        [c["ttft"] for c in calls if c["ttft"] is not None],
+        run_times,
+        sum(c["completion_tokens"] for c in calls),
+        statistics.mean(mems) if mems else 0,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BibleBot load test against a local stub LLM")
+    parser.add_argument("--mode", choices=["sessions", "apptest"], default="sessions")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=8, help="client concurrency limit (sessions mode)")
+    parser.add_argument("--base-url", help="use an already running stub/server instead of starting one")
+    parser.add_argument("--ttft-ms", type=float, default=250.0)
+    parser.add_argument("--tokens-per-sec", type=float, default=50.0)
+    parser.add_argument("--reply-words", type=int, default=60)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--repeat-questions", action="store_true",
+                        help="reuse the same questions across sessions (exercises the answer cache)")
+    args = parser.parse_args()
+
+    base_url, server = args.base_url, None
+    if not base_url:
+        config = StubConfig(args.ttft_ms, 50.0, args.tokens_per_sec, args.reply_words,
+                            args.error_rate, args.error_status)
+        server, base_url = start_stub_server(config)
+        print(f"Started stub LLM at {base_url}")
+
+    try:
+        if args.mode == "sessions":
+            run_sessions(base_url, args.sessions, args.turns, args.concurrency, not args.repeat_questions)
+        else:
+            run_apptest(base_url, args.sessions, args.turns, not args.repeat_questions)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""
+Local OpenAI-compatible stub for BibleBot load tests.
+
+Implements POST /v1/chat/completions (streaming and non-streaming) and
+GET /v1/models with configurable time-to-first-token, token rate and error
+injection, so client and translation changes can be benchmarked offline.
+
+    python scripts/stub_llm_server.py --port 8765 --ttft-ms 300 --tokens-per-sec 40 --error-rate 0.05
+
+Point BibleBot at it with OPENAI_BASE_URL=http://127.0.0.1:8765/v1 (any API key works).
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED_REPLY = (
+    "For God so loved the world, that he gave his only begotten Son, that whosoever believeth in him "
+    "should not perish, but have everlasting life. This verse from John 3:16 summarizes the gospel. "
+    "It speaks of God's love for every person. It shows that salvation is a gift received through faith. "
+    "Many believers memorize it as a reminder of grace."
+)
+
+
+class StubConfig:
+    def __init__(self, ttft_ms=250.0, jitter_ms=50.0, tokens_per_sec=50.0, reply_words=60,
+                 error_rate=0.0, error_status=500, reply=CANNED_REPLY):
+        self.ttft_ms = ttft_ms
+        self.jitter_ms = jitter_ms
+        self.tokens_per_sec = tokens_per_sec
+        self.reply_words = reply_words
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.reply = reply
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def reply_tokens(self):
+        words = self.reply.split(" ")
+        words = (words * (self.reply_words // max(1, len(words)) + 1))[: self.reply_words]
+        return [w + " " for w in words[:-1]] + [words[-1]]
+
+
+def _prompt_tokens(messages):
+    return sum(4 + len((m.get("content") or "")) // 4 for m in messages) + 2
+
+
+def make_handler(config: StubConfig):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, fmt, *args):  # keep load-test output clean
+            pass
+
+        def handle(self):
+            # Clients drop idle keep-alive connections after errors; that is not a server fault
+            try:
+                super().handle()
+            except (ConnectionResetError, BrokenPipeError):
+                pass
+
+        def _json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip("/").endswith("/models"):
+                self._json(200, {"object": "list", "data": [{"id": "gpt-3.5-turbo", "object": "model"}]})
+            else:
+                self._json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._json(404, {"error": {"message": "not found"}})
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            req = json.loads(self.rfile.read(length) or b"{}")
+
+            with config._lock:
+                config.requests += 1
+                fail = random.random() < config.error_rate
+                if fail:
+                    config.errors += 1
+            if fail:
+                headers = {"retry-after": "1"} if config.error_status == 429 else None
+                self._json(config.error_status, {"error": {"message": "injected error", "type": "stub"}}, headers)
+                return
+
+            delay = max(0.0, config.ttft_ms + random.uniform(-config.jitter_ms, config.jitter_ms)) / 1000.0
+            time.sleep(delay)
+
+            model = req.get("model", "gpt-3.5-turbo")
+            tokens = config.reply_tokens()
+            usage = {
+                "prompt_tokens": _prompt_tokens(req.get("messages", [])),
+                "completion_tokens": len(tokens),
+                "total_tokens": 0,
+            }
+            usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+            cid = "chatcmpl-" + uuid.uuid4().hex[:12]
+            created = int(time.time())
+
+            if not req.get("stream"):
+                time.sleep(len(tokens) / config.tokens_per_sec)
+                self._json(200, {
+                    "id": cid, "object": "chat.completion", "created": created, "model": model,
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": "".join(tokens)}}],
+                    "usage": usage,
+                })
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def send(obj):
+                data = ("data: " + (obj if isinstance(obj, str) else json.dumps(obj)) + "\n\n").encode("utf-8")
+                self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def chunk(delta, finish=None):
+                return {"id": cid, "object": "chat.completion.chunk", "created": created, "model": model,
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+
+            try:
+                send(chunk({"role": "assistant", "content": ""}))
+                interval = 1.0 / config.tokens_per_sec
+                for tok in tokens:
+                    send(chunk({"content": tok}))
+                    time.sleep(interval)
+                send(chunk({}, "stop"))
+                if (req.get("stream_options") or {}).get("include_usage"):
+                    send({"id": cid, "object": "chat.completion.chunk", "created": created, "model": model,
+                          "choices": [], "usage": usage})
+                send("[DONE]")
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+
+    return Handler
+
+
+def start_stub_server(config: StubConfig, host="127.0.0.1", port=0):
+    """Start the stub on a background thread; returns (server, base_url)."""
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible streaming stub for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ttft-ms", type=float, default=250.0, help="delay before the first token")
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--tokens-per-sec", type=float, default=50.0)
+    parser.add_argument("--reply-words", type=int, default=60)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=500, help="HTTP status for injected errors")
+    args = parser.parse_args()
+
+    config = StubConfig(args.ttft_ms, args.jitter_ms, args.tokens_per_sec, args.reply_words,
+                        args.error_rate, args.error_status)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(config))
+    server.daemon_threads = True
+    print(f"Stub LLM listening on http://{args.host}:{args.port}/v1 (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nServed {config.requests} requests ({config.errors} injected errors)")
+
+
+if __name__ == "__main__":
+    main()
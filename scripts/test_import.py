@@ -0,0 +1,83 @@
+"""
+Import-time budget check for the Streamlit app.
+
+Runs app/app.py through Streamlit's AppTest in a fresh interpreter, opens the
+tools that need no ML models, and fails if `torch`/`transformers` (or any other
+module in model_registry.HEAVY_MODULES) got imported, or if the first page
+load took longer than the budget.
+
+    python scripts/test_import.py
+    IMPORT_BUDGET_SECONDS=3 python -m pytest scripts/test_import.py
+
+The database is not needed: schema upgrades are skipped for the check.
+"""
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "8"))
+LIGHT_TOOLS = ["🏠 Dashboard", "🔖 Verse Classifier", "🌅 Daily Verse"]
+
+CHECK = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+t0 = time.perf_counter()
+import modules.db as db
+db.run_schema_upgrades = lambda: None
+from streamlit.testing.v1 import AppTest
+from modules.model_registry import heavy_modules_loaded
+
+at = AppTest.from_file({app!r}, default_timeout=120)
+at.session_state["user_id"] = "import-check"
+at.session_state["user_name"] = "Import check"
+at.run()
+first_load = time.perf_counter() - t0
+after_tool = {{}}
+for tool in {tools!r}:
+    at.sidebar.selectbox[0].select(tool).run()
+    after_tool[tool] = heavy_modules_loaded()
+print(json.dumps({{
+    "first_load_seconds": first_load,
+    "heavy_after_tool": after_tool,
+    "exceptions": [e.value for e in at.exception],
+}}))
+"""
+
+
+def measure():
+    code = CHECK.format(root=REPO_ROOT, app=os.path.join(REPO_ROOT, "app", "app.py"), tools=LIGHT_TOOLS)
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=REPO_ROOT)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import check failed to run:\n{proc.stderr}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def test_light_tools_do_not_import_heavy_libraries():
+    result = measure()
+    assert not result["exceptions"], result["exceptions"]
+    for tool, heavy in result["heavy_after_tool"].items():
+        assert not heavy, f"opening {tool} imported {', '.join(heavy)}"
+
+
+def test_first_page_load_within_budget():
+    result = measure()
+    assert result["first_load_seconds"] <= BUDGET_SECONDS, (
+        f"first page load took {result['first_load_seconds']:.2f}s (budget {BUDGET_SECONDS}s)"
+    )
+
+
+if __name__ == "__main__":
+    result = measure()
+    print(f"first page load : {result['first_load_seconds']:.2f}s (budget {BUDGET_SECONDS}s)")
+    for tool, heavy in result["heavy_after_tool"].items():
+        print(f"{tool:24}: {', '.join(heavy) or 'no heavy modules'}")
+    if result["exceptions"]:
+        print("exceptions      :", *result["exceptions"], sep="\n  ")
+    failed = (
+        result["exceptions"]
+        or any(result["heavy_after_tool"].values())
+        or result["first_load_seconds"] > BUDGET_SECONDS
+    )
+    sys.exit(1 if failed else 0)
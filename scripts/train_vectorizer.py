@@ -1,23 +1,91 @@
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
-from sklearn.pipeline import Pipeline
-import joblib
+"""
+Train the verse topic model from streamed chunks, as a versioned candidate.
+
+    python scripts/train_vectorizer.py full                        # from scratch on app/verse_training_data.csv
+    python scripts/train_vectorizer.py update --data new_labels.csv  # continue the champion on unseen rows
+    python scripts/train_vectorizer.py full --eval heldout.csv --promote
+    python scripts/train_vectorizer.py promote 20261019-154700     # install a saved version
+    python scripts/train_vectorizer.py list
+
+Each run saves models/verse_versions/<version>/ with metrics against the
+current champion. With --promote the version is installed (models/*.pkl plus
+the memory-mapped artifacts) only if it beats the champion; `promote` does it
+unconditionally. The installed TF-IDF model was trained on every row, holdout
+included, so its scores on the holdout are optimistic — pass --eval with
+verses it has never seen for a fair first comparison. Re-run
+scripts/calibrate_cascade.py after a promotion.
+"""
+import argparse
 import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from modules.verse_training import (DEFAULT_DATA, TrainingConfig, champion, list_versions, promote, run)
+
+
+def show(info):
+    m, c = info["metrics"], info["champion"]
+    print(f"version      : {info.get('version') or '(none: no new rows)'}  [{info['mode']}]")
+    print(f"rows trained : {info['rows_trained_this_run']} this run, {info['rows_trained_total']} total "
+          f"in {info['train_seconds']}s")
+    print(f"candidate    : macro F1 {m['macro_f1']}  accuracy {m['accuracy']}  ({m['rows']} eval rows)")
+    if c["metrics"]:
+        print(f"champion     : macro F1 {c['metrics']['macro_f1']}  accuracy {c['metrics']['accuracy']}  "
+              f"({c['version']})")
+    print(f"beats champion: {info['beats_champion']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming, versioned training for the verse topic model")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for mode in ("full", "update"):
+        p = sub.add_parser(mode)
+        p.add_argument("--data", nargs="+", default=[DEFAULT_DATA], help="CSV files with verse,label columns")
+        p.add_argument("--eval", nargs="*", default=[], help="extra held-out CSV files")
+        p.add_argument("--epochs", type=int, default=TrainingConfig.epochs)
+        p.add_argument("--chunk-size", type=int, default=TrainingConfig.chunk_size)
+        p.add_argument("--promote", action="store_true", help="install the version if it beats the champion")
+        if mode == "full":
+            p.add_argument("--n-features", type=int, default=TrainingConfig.n_features)
+            p.add_argument("--alpha", type=float, default=TrainingConfig.alpha)
+            p.add_argument("--holdout-pct", type=int, default=TrainingConfig.holdout_pct)
+        else:
+            p.add_argument("--base", help="version to continue (default: the champion)")
+    p = sub.add_parser("promote")
+    p.add_argument("version")
+    sub.add_parser("list")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        current = champion()
+        for v in list_versions():
+            mark = "*" if v["version"] == current else " "
+            print(f"{mark} {v['version']}  {v['mode']:6}  macro F1 {v['metrics']['macro_f1']}  "
+                  f"rows {v['rows_trained_total']}  parent {v.get('parent') or '-'}")
+        print(f"champion: {current}")
+        return
+    if args.command == "promote":
+        info = promote(args.version)
+        print(f"Promoted {args.version} (replaced {info['replaced']})")
+        return
 
-# Load training data
-data = pd.read_csv("app/verse_training_data.csv")  # Make sure this file exists
-X = data["verse"]
-y = data["label"]
+    cfg = TrainingConfig(epochs=args.epochs, chunk_size=args.chunk_size)
+    if args.command == "full":
+        cfg.n_features, cfg.alpha, cfg.holdout_pct = args.n_features, args.alpha, args.holdout_pct
+    try:
+        info = run(args.command, args.data, args.eval, cfg, base=getattr(args, "base", None))
+    except ValueError as exc:
+        sys.exit(str(exc))
+    show(info)
 
-# Create pipeline
-vectorizer = TfidfVectorizer()
-X_vec = vectorizer.fit_transform(X)
+    if args.promote and info.get("version"):
+        if info["beats_champion"]:
+            promote(info["version"])
+            print(f"Promoted {info['version']}; re-run scripts/calibrate_cascade.py for its threshold.")
+        else:
+            sys.exit(f"Not promoted: {info['version']} does not beat {info['champion']['version']}.")
 
-model = LogisticRegression()
-model.fit(X_vec, y)
 
-# Save vectorizer and model
-os.makedirs("models", exist_ok=True)
-joblib.dump(vectorizer, "models/vectorizer.pkl")
-joblib.dump(model, "models/model.pkl")  # Optional if you need a different model
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Pre-fetch, verify and warm every model the app uses, at image build time.
+
+    python scripts/warmup_models.py                   # fetch pinned revisions, verify, run one inference each
+    python scripts/warmup_models.py --refresh         # re-resolve to the hub's latest commit and re-pin
+    python scripts/warmup_models.py --verify-only     # container start: checksums only, no network
+
+Models are the Hugging Face entries in modules/model_registry.MODEL_SPECS,
+which is where the Verse Classifier (app/app.py, app/hf.py) and the journal
+sentiment and embedding workers (modules/growth_tracker_ui.py) get theirs. Files land in MODEL_CACHE_DIR
+(default models/hf_cache) with a manifest of commits and SHA-256 checksums.
+Run the app with MODEL_OFFLINE=1 to load only from that cache.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from modules.model_cache import CACHE_DIR, fetch, pinned_revision, verify
+from modules.model_registry import hf_specs, load_pipeline
+
+HF_SPECS = hf_specs()
+
+WARMUP_INPUTS = {
+    "sentiment": (["Grateful for God's faithfulness this week."], {}),
+    "zero_shot": (["Trust in the Lord with all your heart."],
+                  {"candidate_labels": ["faith", "comfort", "joy"], "multi_label": False}),
+    "embedding": (["Prayed for patience with my family today."], {}),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch and warm the app's Hugging Face models")
+    parser.add_argument("--models", nargs="+", default=list(HF_SPECS), choices=list(HF_SPECS))
+    parser.add_argument("--refresh", action="store_true", help="ignore pinned revisions and fetch the latest")
+    parser.add_argument("--verify-only", action="store_true", help="only check cached files against the manifest")
+    parser.add_argument("--skip-inference", action="store_true")
+    args = parser.parse_args()
+
+    problems = []
+    for name in args.models:
+        spec = HF_SPECS[name]
+        if not args.verify_only:
+            revision = None if args.refresh else pinned_revision(name)
+            entry = fetch(name, spec.model_id, revision=revision)
+            print(f"{name:10} {spec.model_id} @ {entry['revision'][:12]} "
+                  f"({len(entry['files'])} files, {entry['fetch_seconds']}s)")
+
+        issues = verify(name)
+        problems += issues
+        print(f"{name:10} checksums: {'OK' if not issues else 'FAILED'}")
+        for issue in issues:
+            print(f"  - {issue}")
+
+        if not issues and not args.verify_only and not args.skip_inference:
+            # One pass through the pipeline so lazy weight init and kernel selection happen now
+            texts, kwargs = WARMUP_INPUTS[name]
+            t0 = time.perf_counter()
+            pipe, backend = load_pipeline(name, spec)
+            load_s = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            pipe(texts[0], **kwargs)
+            print(f"{name:10} warm ({backend}): load {load_s:.1f}s, first inference {time.perf_counter() - t0:.2f}s")
+
+    print(f"Cache: {CACHE_DIR}")
+    if problems:
+        sys.exit(f"{len(problems)} cache problem(s); re-run without --verify-only to repair")
+
+
+if __name__ == "__main__":
+    main()